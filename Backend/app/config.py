@@ -9,6 +9,8 @@ English:
 """
 
 import os
+import socket
+import uuid
 from enum import Enum
 
 class LogVerbosity(str, Enum):
@@ -36,3 +38,73 @@ PROBE_RETRY_BACKOFF_BASE = float(os.getenv("PROBE_RETRY_BACKOFF_BASE", "0.5"))
 # Redis and DB configuration
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./dev.db")
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+# Async DB connection pool (ignored for SQLite)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+# Rate limiter backend: "redis" shares limits across processes and nodes, "memory" is per process
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "redis").lower()
+
+# Account settings are cached per process for this many seconds (writes through the API invalidate immediately)
+SETTINGS_CACHE_TTL = float(os.getenv("SETTINGS_CACHE_TTL", "30"))
+
+# Compiled rule sets are cached per account for this many seconds (rule writes in this process invalidate immediately)
+RULE_CACHE_TTL = float(os.getenv("RULE_CACHE_TTL", "60"))
+
+# Client pool: max number of warm Instagram clients kept per process (LRU evicted)
+CLIENT_POOL_MAX_SIZE = int(os.getenv("CLIENT_POOL_MAX_SIZE", "256"))
+
+# Job processor: how many accounts are processed in parallel per cycle and the per-account time budget (seconds)
+JOB_ACCOUNT_CONCURRENCY = int(os.getenv("JOB_ACCOUNT_CONCURRENCY", "8"))
+JOB_ACCOUNT_TIMEOUT = float(os.getenv("JOB_ACCOUNT_TIMEOUT", "45"))
+
+# Inbound webhooks: max events per batch request and threads used to match batches off the event loop
+INBOUND_BATCH_MAX = int(os.getenv("INBOUND_BATCH_MAX", "5000"))
+INBOUND_MATCH_WORKERS = int(os.getenv("INBOUND_MATCH_WORKERS", "2"))
+
+# Job claims: how many pending jobs a processor claims per cycle and how long its lease lasts (seconds).
+# The lease must outlast one dispatch window (60 s) plus the slowest send.
+JOB_CLAIM_BATCH = int(os.getenv("JOB_CLAIM_BATCH", "100"))
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "300"))
+
+# Job archive: finished jobs move to job_archive after JOB_ARCHIVE_AFTER_HOURS and are deleted from the
+# archive after JOB_ARCHIVE_RETENTION_DAYS (0 keeps them forever); the archiver runs every JOB_ARCHIVE_INTERVAL seconds
+JOB_ARCHIVE_AFTER_HOURS = float(os.getenv("JOB_ARCHIVE_AFTER_HOURS", "24"))
+JOB_ARCHIVE_RETENTION_DAYS = float(os.getenv("JOB_ARCHIVE_RETENTION_DAYS", "90"))
+JOB_ARCHIVE_INTERVAL = float(os.getenv("JOB_ARCHIVE_INTERVAL", "600"))
+JOB_ARCHIVE_BATCH = int(os.getenv("JOB_ARCHIVE_BATCH", "1000"))
+
+# Sender queue backend: "rq" (single RQ list, worked by RQ or the async worker), "lanes" (per-account
+# lanes with round-robin scheduling) or "streams" (Redis Streams consumer group); the last two are
+# consumed by the async worker only. A lane hands out SENDER_LANE_QUANTUM sends per turn and is paused
+# for SENDER_LANE_PAUSE_SECONDS when its account is rate limited or challenged
+SENDER_QUEUE_BACKEND = os.getenv("SENDER_QUEUE_BACKEND", "rq").lower()
+SENDER_LANE_QUANTUM = int(os.getenv("SENDER_LANE_QUANTUM", "1"))
+SENDER_LANE_PAUSE_SECONDS = float(os.getenv("SENDER_LANE_PAUSE_SECONDS", "900"))
+# Streams backend: entries read per XREADGROUP, seconds an entry may stay pending before another worker
+# reclaims it (must outlast the slowest send) and how many dead entries sender:stream:dead keeps
+SENDER_STREAM_BATCH = int(os.getenv("SENDER_STREAM_BATCH", "32"))
+SENDER_STREAM_CLAIM_IDLE = float(os.getenv("SENDER_STREAM_CLAIM_IDLE", "300"))
+SENDER_STREAM_DEAD_MAXLEN = int(os.getenv("SENDER_STREAM_DEAD_MAXLEN", "100000"))
+
+# Async sender worker: sends in flight per process (one at a time per account), worker name (unique per
+# process unless set; an explicit name's in-flight list is recovered when it restarts) and the cap on the
+# retry backoff (seconds). Workers heartbeat every SENDER_WORKER_HEARTBEAT seconds; a worker silent for
+# SENDER_WORKER_DEAD_AFTER seconds is dead and a live worker requeues what it left in flight
+SENDER_WORKER_CONCURRENCY = int(os.getenv("SENDER_WORKER_CONCURRENCY", "32"))
+SENDER_WORKER_NAME = os.getenv("SENDER_WORKER_NAME") or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+SENDER_RETRY_BACKOFF_MAX = float(os.getenv("SENDER_RETRY_BACKOFF_MAX", "60"))
+SENDER_WORKER_HEARTBEAT = float(os.getenv("SENDER_WORKER_HEARTBEAT", "10"))
+SENDER_WORKER_DEAD_AFTER = float(os.getenv("SENDER_WORKER_DEAD_AFTER", "60"))
+
+# Optional per-account Bloom filter in front of reply history (for accounts with millions of replies)
+REPLY_BLOOM_ENABLED = os.getenv("REPLY_BLOOM_ENABLED", "false").lower() in ("1", "true", "yes")
+REPLY_BLOOM_CAPACITY = int(os.getenv("REPLY_BLOOM_CAPACITY", "1000000"))
+REPLY_BLOOM_ERROR_RATE = float(os.getenv("REPLY_BLOOM_ERROR_RATE", "0.001"))
+REPLY_BLOOM_PERSIST_INTERVAL = float(os.getenv("REPLY_BLOOM_PERSIST_INTERVAL", "60"))
+
+# Reply history purge: keys per SCAN batch when clearing an account
+REPLY_PURGE_SCAN_COUNT = int(os.getenv("REPLY_PURGE_SCAN_COUNT", "1000"))
@@ -3,9 +3,12 @@ Persian:
     BaseRepository: ???? ???? ???? ?????????????? ???????.
 English:
     BaseRepository: Base class for database repositories.
+    AsyncRepository: base for repositories that open one AsyncSession per unit of work.
 """
 
+from typing import Optional
 from sqlmodel import Session
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 
 class BaseRepository:
@@ -24,8 +27,15 @@ class BaseRepository:
         if self.db is None:
             raise RuntimeError('Database session not initialized for repository')
 
-    # convenience factory to create a SessionsRepository if needed
-    @classmethod
-    def sessions_repository_from(cls, db):
-        from app.database.sessions_repository import SessionsRepository
-        return SessionsRepository(db)
+
+class AsyncRepository:
+    def __init__(self, session_factory: Optional[async_sessionmaker] = None):
+        # sessions come from the shared pooled engine unless a factory is given (tests, workers)
+        if session_factory is None:
+            from app.db import AsyncSessionLocal
+            session_factory = AsyncSessionLocal
+        self._session_factory = session_factory
+
+    def session(self) -> AsyncSession:
+        """A new session for one unit of work: `async with self.session() as db: ...`"""
+        return self._session_factory()
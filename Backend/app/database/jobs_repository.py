@@ -1,89 +1,414 @@
-"""
+﻿"""
 Persian:
     ?????????? ?????? job?? ?? ??????? ?? SQLModel (sync Session) ??? API async.
 
 English:
-    Jobs repository: exposes async methods but runs sync SQLModel Session calls in a thread.
+    Jobs repository: each call runs in its own AsyncSession taken from the pooled async engine.
+    When given JobCounters, every state transition also updates the approximate per-status counts.
 """
 
-from datetime import datetime
-from typing import List, Optional
-from sqlalchemy import select, and_
-import asyncio
-from app.database.base import BaseRepository
-from app.schemas.job_schema import JobItem, JobStatus
-from app.models.job_model import Job
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+from sqlalchemy import select, update, delete, insert, and_, func, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+import json
+import uuid
+from app.database.base import AsyncRepository
+from app.schemas.job_schema import JobItem, JobOut, JobStatus
+from app.models.job_model import Job, JobArchive, FINISHED_STATUSES
+from app.services.job_counters import JobCounters
+
+class JobsRepository(AsyncRepository):
+    # rows per INSERT statement; keeps bound parameters under SQLite's limit
+    BULK_CHUNK = 500
+    # claims a job gets (each claim counts as an attempt) before an expired lease fails it
+    MAX_ATTEMPTS = 3
+
+    def __init__(self, session_factory=None, counters: Optional[JobCounters] = None):
+        super().__init__(session_factory)
+        self.counters = counters
 
-class JobsRepository(BaseRepository):
-    def __init__(self, db):
-        super().__init__(db)
+    async def _count(self, deltas: Counter):
+        """Apply (account_id, job_type, status) deltas to the counters after a committed change"""
+        if self.counters is not None:
+            await self.counters.apply(deltas)
 
     async def create_job(self, job: JobItem) -> str:
-        """Create a new job (runs sync DB work in a thread)."""
-        def _sync():
-            db_job = Job(
-                job_id=job.id,
-                job_type=job.type,
-                status=job.status,
-                rule_id=getattr(job, 'rule_id', None),
-                media_id=getattr(job, 'media_id', None),
-                target_user_id=getattr(job, 'target_user_id', None),
-                comment_id=getattr(job, 'comment_id', None),
-                payload=job.payload,
-                account_id=getattr(job, 'account_id', None),
-                session_blob=getattr(job, 'session_blob', None),
-                attempts=getattr(job, 'attempts', 0),
-                last_error=getattr(job, 'error', None),
-                created_at=getattr(job, 'created_at', datetime.utcnow()),
-                updated_at=getattr(job, 'updated_at', datetime.utcnow()),
-            )
-            self.db.add(db_job)
-            self.db.commit()
-            self.db.refresh(db_job)
-            return db_job.job_id
+        """Create a new job"""
+        async with self.session() as db:
+            db_job = Job(**self._to_row(job))
+            db.add(db_job)
+            await db.commit()
+        await self._count(Counter({(db_job.account_id, db_job.job_type, db_job.status): 1}))
+        return db_job.job_id
+
+    async def create_jobs_bulk(self, jobs: List[JobItem]) -> List[str]:
+        """
+        Create many jobs with multi-row INSERTs in one transaction and return the inserted job ids.
+        Jobs whose idempotency_key already exists are skipped (ON CONFLICT DO NOTHING), and so are
+        keys of archived jobs, which the unique index on the hot table no longer sees.
+        """
+        if not jobs:
+            return []
+
+        async with self.session() as db:
+            if db.bind.dialect.name == "postgresql":
+                from sqlalchemy.dialects.postgresql import insert
+            else:
+                from sqlalchemy.dialects.sqlite import insert
+            rows = [self._to_row(job) for job in jobs]
+            inserted: List[str] = []
+            async with db.begin():
+                archived = await self._archived_keys(db, [row["idempotency_key"] for row in rows if row["idempotency_key"]])
+                rows = [row for row in rows if row["idempotency_key"] not in archived]
+                for i in range(0, len(rows), self.BULK_CHUNK):
+                    stmt = (
+                        insert(Job)
+                        .values(rows[i:i + self.BULK_CHUNK])
+                        .on_conflict_do_nothing(index_elements=["idempotency_key"])
+                        .returning(Job.job_id)
+                    )
+                    inserted.extend((await db.execute(stmt)).scalars().all())
+        by_id = {row["job_id"]: row for row in rows}
+        await self._count(Counter(
+            (by_id[job_id]["account_id"], by_id[job_id]["job_type"], by_id[job_id]["status"]) for job_id in inserted
+        ))
+        return inserted
+
+    async def _archived_keys(self, db: AsyncSession, keys: List[str]) -> set:
+        found = set()
+        for i in range(0, len(keys), self.BULK_CHUNK):
+            chunk = keys[i:i + self.BULK_CHUNK]
+            found.update((await db.execute(
+                select(JobArchive.idempotency_key).where(JobArchive.idempotency_key.in_(chunk))
+            )).scalars().all())
+        return found
+
+    @staticmethod
+    def _to_row(job: JobItem) -> dict:
+        """Column values for a new Job row"""
+        now = datetime.utcnow()
+        return dict(
+            job_id=job.id or str(uuid.uuid4()),
+            idempotency_key=getattr(job, 'idempotency_key', None),
+            job_type=job.type,
+            status=job.status,
+            rule_id=getattr(job, 'rule_id', None),
+            media_id=getattr(job, 'media_id', None),
+            target_user_id=getattr(job, 'target_user_id', None),
+            comment_id=getattr(job, 'comment_id', None),
+            payload=json.dumps(job.payload),
+            account_id=getattr(job, 'account_id', None),
+            session_blob=getattr(job, 'session_blob', None),
+            attempts=getattr(job, 'attempts', 0),
+            last_error=getattr(job, 'error', None),
+            created_at=getattr(job, 'created_at', None) or now,
+            updated_at=getattr(job, 'updated_at', None) or now,
+        )
 
-        return await asyncio.to_thread(_sync)
+    @staticmethod
+    async def _get_db_job(db: AsyncSession, job_id: str) -> Optional[Job]:
+        return (await db.execute(select(Job).where(Job.job_id == job_id))).scalars().first()
 
     async def get_job(self, job_id: str) -> Optional[JobItem]:
         """Get a job by ID"""
-        def _sync():
-            return self.db.get(Job, job_id)
-
-        job = await asyncio.to_thread(_sync)
-        if not job:
-            return None
-        return self._to_schema(job)
-
-    async def update_job(self, job: JobItem):
-        """Update a job"""
-        def _sync():
-            db_job = self.db.get(Job, job.id)
+        async with self.session() as db:
+            job = await self._get_db_job(db, job_id)
+            if not job:
+                return None
+            return self._to_schema(job)
+
+    async def get_job_row(self, job_id: str) -> Optional[Job]:
+        """The Job row for job_id (any queue's status vocabulary), detached from its session"""
+        async with self.session() as db:
+            return await self._get_db_job(db, job_id)
+
+    async def set_job_status(self, job_id: str, status: str, error: Optional[str] = None, count_attempt: bool = False) -> Optional[Job]:
+        """
+        Set a job's status by job_id (used by the sender worker, whose statuses are plain strings),
+        optionally recording an error and counting a failed attempt. Returns the updated row.
+        """
+        async with self.session() as db:
+            db_job = await self._get_db_job(db, job_id)
             if not db_job:
-                return
+                return None
+            old_status = db_job.status
+            db_job.status = status
+            db_job.updated_at = datetime.utcnow()
+            if error is not None:
+                db_job.last_error = error
+            if count_attempt:
+                db_job.attempts = (db_job.attempts or 0) + 1
+            if status in FINISHED_STATUSES:
+                db_job.completed_at = db_job.updated_at
+            await db.commit()
+        if old_status != status:
+            await self._count(Counter({
+                (db_job.account_id, db_job.job_type, old_status): -1,
+                (db_job.account_id, db_job.job_type, status): 1,
+            }))
+        return db_job
+
+    async def update_job(self, job: JobItem, worker_id: Optional[str] = None) -> bool:
+        """
+        Update a job. With worker_id, only while that worker still holds the claim (its lease was
+        not reaped and re-claimed by another worker); returns False when the job is not updated.
+        """
+        async with self.session() as db:
+            db_job = await self._get_db_job(db, job.id)
+            if not db_job:
+                return False
+            if worker_id is not None and (db_job.claimed_by != worker_id or db_job.status != JobStatus.IN_PROGRESS):
+                return False
+            old_status = db_job.status
             db_job.status = job.status
             db_job.updated_at = datetime.utcnow()
             db_job.last_error = getattr(job, 'error', None)
             db_job.attempts = getattr(job, 'attempts', 0)
             db_job.completed_at = getattr(job, 'completed_at', None)
-            self.db.commit()
+            if job.status != JobStatus.IN_PROGRESS:
+                db_job.claimed_by = None
+                db_job.lease_expires_at = None
+            await db.commit()
+        if getattr(old_status, "value", old_status) != getattr(job.status, "value", job.status):
+            await self._count(Counter({
+                (db_job.account_id, db_job.job_type, old_status): -1,
+                (db_job.account_id, db_job.job_type, job.status): 1,
+            }))
+        return True
 
-        await asyncio.to_thread(_sync)
+    async def renew_lease(self, job_id: str, worker_id: str, lease_seconds: float) -> bool:
+        """Extend worker_id's lease on a claimed job; False if the worker no longer holds it"""
+        async with self.session() as db:
+            now = datetime.utcnow()
+            result = await db.execute(
+                update(Job)
+                .where(and_(Job.job_id == job_id, Job.claimed_by == worker_id, Job.status == JobStatus.IN_PROGRESS))
+                .values(lease_expires_at=now + timedelta(seconds=lease_seconds), updated_at=now)
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+        return bool(result.rowcount)
 
     async def get_pending_jobs(self, limit: int = 100) -> List[JobItem]:
         """Get pending jobs"""
-        def _sync():
+        async with self.session() as db:
             query = select(Job).where(
                 and_(
                     Job.status == JobStatus.PENDING,
-                    Job.attempts < 3
+                    Job.attempts < self.MAX_ATTEMPTS
                 )
             ).order_by(Job.created_at).limit(limit)
-            result = self.db.execute(query)
-            jobs = result.scalars().all()
-            return jobs
+            jobs = (await db.execute(query)).scalars().all()
+            return [self._to_schema(job) for job in jobs]
+
+    async def list_jobs(
+        self,
+        status: Optional[str] = None,
+        job_type: Optional[str] = None,
+        account_id: Optional[str] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+        limit: int = 20,
+        after: Optional[Tuple[datetime, int]] = None,
+    ) -> Tuple[List[JobOut], Optional[Tuple[datetime, int]]]:
+        """
+        Return (jobs, next_after): up to limit jobs newest first, seeking past after, the
+        (created_at, id) of the previous page's last row. next_after is None on the last page.
+        """
+        query = select(Job)
+        if status:
+            query = query.where(Job.status == status)
+        if job_type:
+            query = query.where(Job.job_type == job_type)
+        if account_id:
+            query = query.where(Job.account_id == account_id)
+        if created_from:
+            query = query.where(Job.created_at >= created_from)
+        if created_to:
+            query = query.where(Job.created_at < created_to)
+        if after is not None:
+            query = query.where(tuple_(Job.created_at, Job.id) < tuple_(*after))
+        query = query.order_by(Job.created_at.desc(), Job.id.desc()).limit(limit)
+        async with self.session() as db:
+            rows = (await db.execute(query)).scalars().all()
+        next_after = (rows[-1].created_at, rows[-1].id) if len(rows) == limit else None
+        return [self._to_out(job) for job in rows], next_after
 
-        jobs = await asyncio.to_thread(_sync)
-        return [self._to_schema(job) for job in jobs]
+    async def claim_jobs(self, worker_id: str, n: int = 100, lease_seconds: float = 300) -> List[JobItem]:
+        """
+        Atomically claim up to n pending jobs for worker_id and lease them for lease_seconds.
+        Postgres picks rows with FOR UPDATE SKIP LOCKED so concurrent workers never wait on or
+        share a row; SQLite serializes writers, so the guarded UPDATE ... RETURNING is enough.
+        Each claim counts as an attempt.
+        """
+        async with self.session() as db:
+            now = datetime.utcnow()
+            candidates = select(Job.id).where(
+                and_(
+                    Job.status == JobStatus.PENDING,
+                    Job.attempts < self.MAX_ATTEMPTS
+                )
+            ).order_by(Job.created_at).limit(n)
+            if db.bind.dialect.name == "postgresql":
+                candidates = candidates.with_for_update(skip_locked=True)
+            stmt = (
+                update(Job)
+                .where(and_(Job.id.in_(candidates.scalar_subquery()), Job.status == JobStatus.PENDING))
+                .values(
+                    status=JobStatus.IN_PROGRESS,
+                    claimed_by=worker_id,
+                    lease_expires_at=now + timedelta(seconds=lease_seconds),
+                    attempts=Job.attempts + 1,
+                    updated_at=now
+                )
+                .returning(Job)
+                .execution_options(synchronize_session=False)
+            )
+            claimed = [self._to_schema(job) for job in (await db.execute(stmt)).scalars().all()]
+            await db.commit()
+        deltas = Counter()
+        for job in claimed:
+            deltas[(job.account_id, job.type, JobStatus.PENDING)] -= 1
+            deltas[(job.account_id, job.type, JobStatus.IN_PROGRESS)] += 1
+        await self._count(deltas)
+        return sorted(claimed, key=lambda job: job.created_at)
+
+    async def release_job(self, job: JobItem, worker_id: Optional[str] = None):
+        """Give an unstarted claim (worker_id's, if given) back to the pending pool (the claim's attempt is not counted)"""
+        async with self.session() as db:
+            owned = [Job.claimed_by == worker_id] if worker_id is not None else []
+            result = await db.execute(
+                update(Job)
+                .where(and_(Job.job_id == job.id, Job.status == JobStatus.IN_PROGRESS, *owned))
+                .values(
+                    status=JobStatus.PENDING,
+                    claimed_by=None,
+                    lease_expires_at=None,
+                    attempts=Job.attempts - 1,
+                    updated_at=datetime.utcnow()
+                )
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+        if result.rowcount:
+            await self._count(Counter({
+                (job.account_id, job.type, JobStatus.IN_PROGRESS): -1,
+                (job.account_id, job.type, JobStatus.PENDING): 1,
+            }))
+
+    async def reap_expired_leases(self) -> int:
+        """
+        Return jobs whose worker's lease ran out (crashed or stuck worker) to pending; returns how
+        many. Jobs that already used MAX_ATTEMPTS claims would never be claimed again, so they fail.
+        """
+        async with self.session() as db:
+            now = datetime.utcnow()
+            expired = and_(Job.status == JobStatus.IN_PROGRESS, Job.lease_expires_at < now)
+            failed = (await db.execute(
+                update(Job)
+                .where(and_(expired, Job.attempts >= self.MAX_ATTEMPTS))
+                .values(status=JobStatus.FAILED, claimed_by=None, lease_expires_at=None, updated_at=now,
+                        completed_at=now, last_error=f"lease expired on all {self.MAX_ATTEMPTS} attempts")
+                .returning(Job.account_id, Job.job_type)
+                .execution_options(synchronize_session=False)
+            )).all()
+            reaped = (await db.execute(
+                update(Job)
+                .where(expired)
+                .values(status=JobStatus.PENDING, claimed_by=None, lease_expires_at=None, updated_at=now)
+                .returning(Job.account_id, Job.job_type)
+                .execution_options(synchronize_session=False)
+            )).all()
+            await db.commit()
+        deltas = Counter()
+        for rows, status in ((failed, JobStatus.FAILED), (reaped, JobStatus.PENDING)):
+            for account_id, job_type in rows:
+                deltas[(account_id, job_type, JobStatus.IN_PROGRESS)] -= 1
+                deltas[(account_id, job_type, status)] += 1
+        await self._count(deltas)
+        return len(failed) + len(reaped)
+
+    async def archive_finished_jobs(self, older_than: timedelta, batch_size: int = 1000) -> int:
+        """
+        Move finished jobs last updated before now - older_than into job_archive, batch by batch
+        (INSERT ... SELECT then DELETE in one transaction per batch). Returns how many moved.
+        """
+        cutoff = datetime.utcnow() - older_than
+        columns = [c.name for c in Job.__table__.columns]
+        moved = 0
+        while True:
+            async with self.session() as db:
+                async with db.begin():
+                    batch = (await db.execute(
+                        select(Job.id, Job.account_id, Job.job_type, Job.status)
+                        .where(and_(Job.status.in_(FINISHED_STATUSES), Job.updated_at < cutoff))
+                        .order_by(Job.id)
+                        .limit(batch_size)
+                    )).all()
+                    if not batch:
+                        return moved
+                    ids = [row.id for row in batch]
+                    await db.execute(
+                        insert(JobArchive).from_select(
+                            columns,
+                            select(*[Job.__table__.c[name] for name in columns]).where(Job.id.in_(ids))
+                        )
+                    )
+                    await db.execute(delete(Job).where(Job.id.in_(ids)).execution_options(synchronize_session=False))
+            archived = Counter()
+            for row in batch:
+                archived[(row.account_id, row.job_type, row.status)] -= 1
+            await self._count(archived)
+            moved += len(ids)
+            if len(ids) < batch_size:
+                return moved
+
+    async def purge_archive(self, older_than: timedelta) -> int:
+        """Delete archived jobs archived before now - older_than; returns how many"""
+        async with self.session() as db:
+            result = await db.execute(
+                delete(JobArchive)
+                .where(JobArchive.archived_at < datetime.utcnow() - older_than)
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+            return result.rowcount
+
+    async def count_by_group(self) -> List[Tuple[Optional[str], str, str, int]]:
+        """Exact (account_id, job_type, status, count) rows, used to rebuild the counters"""
+        async with self.session() as db:
+            rows = await db.execute(
+                select(Job.account_id, Job.job_type, Job.status, func.count())
+                .group_by(Job.account_id, Job.job_type, Job.status)
+            )
+            return [tuple(row) for row in rows.all()]
+
+    async def refresh_counters(self):
+        """Rebuild the approximate counters from the table, correcting any drift"""
+        if self.counters is not None:
+            await self.counters.replace(await self.count_by_group())
+
+    @staticmethod
+    def _to_out(job: Job) -> JobOut:
+        """Convert DB model to the API schema (any queue's status vocabulary, no session blob)"""
+        return JobOut(
+            id=job.job_id,
+            type=job.job_type,
+            status=getattr(job.status, "value", job.status),
+            rule_id=job.rule_id,
+            media_id=job.media_id,
+            target_user_id=job.target_user_id,
+            comment_id=job.comment_id,
+            account_id=job.account_id,
+            payload=json.loads(job.payload) if isinstance(job.payload, str) else (job.payload or {}),
+            attempts=job.attempts or 0,
+            error=job.last_error,
+            created_at=job.created_at,
+            updated_at=job.updated_at,
+            completed_at=job.completed_at
+        )
 
     def _to_schema(self, job: Job) -> JobItem:
         """Convert DB model to schema"""
@@ -95,7 +420,7 @@ class JobsRepository(BaseRepository):
             media_id=getattr(job, 'media_id', None),
             target_user_id=getattr(job, 'target_user_id', None),
             comment_id=getattr(job, 'comment_id', None),
-            payload=job.payload,
+            payload=json.loads(job.payload) if isinstance(job.payload, str) else (job.payload or {}),
             created_at=job.created_at,
             updated_at=job.updated_at,
             completed_at=getattr(job, 'completed_at', None),
@@ -103,4 +428,4 @@ class JobsRepository(BaseRepository):
             attempts=getattr(job, 'attempts', 0),
             account_id=getattr(job, 'account_id', None),
             session_blob=getattr(job, 'session_blob', None)
-        )
\ No newline at end of file
+        )
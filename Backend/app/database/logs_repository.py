@@ -0,0 +1,40 @@
+"""
+Persian:
+    LogsRepository: خواندن لاگ‌ها با صفحه‌بندی keyset روی (created_at, id) به جای OFFSET.
+
+English:
+    Logs repository: reads event logs with keyset (seek) pagination on (created_at, id) instead of OFFSET,
+    so every page is one index range scan regardless of depth and concurrent inserts never shift pages.
+"""
+
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import select, tuple_
+
+from app.database.base import AsyncRepository
+from app.models.log_model import EventLog
+
+
+class LogsRepository(AsyncRepository):
+    async def list_logs(
+        self,
+        level: Optional[str] = None,
+        account_id: Optional[str] = None,
+        limit: int = 50,
+        after: Optional[Tuple[datetime, int]] = None,
+    ) -> List[EventLog]:
+        """
+        Return up to limit logs newest first. after is the (created_at, id) of the last row of the
+        previous page; only strictly older rows are returned.
+        """
+        statement = select(EventLog)
+        if level:
+            statement = statement.where(EventLog.level == level)
+        if account_id:
+            statement = statement.where(EventLog.account_id == account_id)
+        if after is not None:
+            statement = statement.where(tuple_(EventLog.created_at, EventLog.id) < tuple_(*after))
+        statement = statement.order_by(EventLog.created_at.desc(), EventLog.id.desc()).limit(limit)
+        async with self.session() as db:
+            return list((await db.execute(statement)).scalars().all())
@@ -0,0 +1,63 @@
+"""
+Persian:
+    مهاجرت‌های سبک بدون alembic: ستون‌ها و ایندکس‌های جدید جدول‌های موجود را اضافه می‌کند.
+    create_all فقط جدول‌های جدید را می‌سازد؛ این ماژول پس از آن در init_db اجرا می‌شود و idempotent است.
+
+English:
+    Lightweight migrations without alembic: adds new columns and indexes to existing tables.
+    create_all only creates missing tables; this runs after it in init_db and is idempotent.
+    Before an index becomes unique, duplicate values are cleared on all but the oldest row.
+"""
+
+import logging
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from app.models.job_model import Job, JobArchive
+from app.models.log_model import EventLog
+
+logger = logging.getLogger(__name__)
+
+MIGRATED_TABLES = (Job.__table__, JobArchive.__table__, EventLog.__table__)
+
+
+def upgrade(engine: Engine):
+    """Bring existing tables up to the current models (add columns, create or fix indexes)"""
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in MIGRATED_TABLES:
+            if not inspector.has_table(table.name):
+                continue
+            existing_columns = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns:
+                    continue
+                col_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type}'))
+                logger.info("Added column %s.%s", table.name, column.name)
+
+            existing_indexes = {i["name"]: i for i in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                current = existing_indexes.get(index.name)
+                if current is not None and bool(current.get("unique")) == bool(index.unique):
+                    continue
+                if current is not None:
+                    # e.g. idempotency_key used to be a plain index; ON CONFLICT needs it unique
+                    conn.execute(text(f"DROP INDEX {index.name}"))
+                if index.unique:
+                    _clear_duplicates(conn, table, index)
+                index.create(conn)
+                logger.info("Created index %s on %s", index.name, table.name)
+
+
+def _clear_duplicates(conn, table, index):
+    """NULL out a single-column unique index's duplicate values, keeping them on the lowest id"""
+    if len(index.columns) != 1 or "id" not in table.columns:
+        return
+    column = list(index.columns)[0].name
+    result = conn.execute(text(
+        f"UPDATE {table.name} SET {column} = NULL WHERE {column} IS NOT NULL AND id NOT IN "
+        f"(SELECT MIN(id) FROM {table.name} WHERE {column} IS NOT NULL GROUP BY {column})"
+    ))
+    if result.rowcount:
+        logger.warning("Cleared %d duplicate %s.%s values before making %s unique",
+                       result.rowcount, table.name, column, index.name)
@@ -6,23 +6,38 @@ English:
 """
 
 """
-Rules repository adapted to work with sync SQLModel Session in async code by using asyncio.to_thread.
+Rules repository: each call runs in its own AsyncSession taken from the pooled async engine.
+get_compiled_rules keeps a per-account set of rules whose json-logic conditions are parsed and
+compiled to closures once, indexed by a RuleMatcher (get_rule_matcher); create/update/delete
+invalidate the account's entry, and a TTL bounds staleness for changes made by other processes.
 """
 
+import json
+import logging
+import time
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 from sqlalchemy import select
-import asyncio
-from app.database.base import BaseRepository
+from app.config import RULE_CACHE_TTL
+from app.database.base import AsyncRepository
 from app.models.rule_model import Rule
 from app.schemas.rule_schema import RuleIn, RuleOut, RuleUpdate
+from app.services.rule_matcher import CompiledRule, RuleMatcher
+from app.utils.logic_compiler import compile_predicate
 
-class RulesRepository(BaseRepository):
-    def __init__(self, db):
-        super().__init__(db)
+logger = logging.getLogger(__name__)
+
+
+class RulesRepository(AsyncRepository):
+    def __init__(self, session_factory=None, cache_ttl: float = RULE_CACHE_TTL):
+        super().__init__(session_factory)
+        self._cache_ttl = cache_ttl
+        self._compiled: Dict[str, Tuple[float, RuleMatcher]] = {}
+        # bumped on every invalidation so a load that raced with a write is not cached
+        self._generation = 0
 
     async def create_rule(self, rule_in: RuleIn) -> RuleOut:
-        def _sync():
+        async with self.session() as db:
             rule = Rule(
                 account_id=rule_in.account_id,
                 name=rule_in.name,
@@ -31,58 +46,86 @@ class RulesRepository(BaseRepository):
                 created_at=datetime.utcnow(),
                 updated_at=datetime.utcnow()
             )
-            self.db.add(rule)
-            self.db.commit()
-            self.db.refresh(rule)
-            return rule
-        rule = await asyncio.to_thread(_sync)
+            db.add(rule)
+            await db.commit()
+            await db.refresh(rule)
+        self.invalidate(rule.account_id)
         return self._to_schema(rule)
 
     async def get_rule(self, rule_id: int) -> Optional[RuleOut]:
-        def _sync():
-            return self.db.get(Rule, rule_id)
-        rule = await asyncio.to_thread(_sync)
-        if not rule:
-            return None
-        return self._to_schema(rule)
+        async with self.session() as db:
+            rule = await db.get(Rule, rule_id)
+            if not rule:
+                return None
+            return self._to_schema(rule)
 
     async def update_rule(self, rule_id: int, update: RuleUpdate) -> Optional[RuleOut]:
-        def _sync():
-            rule = self.db.get(Rule, rule_id)
+        async with self.session() as db:
+            rule = await db.get(Rule, rule_id)
             if not rule:
                 return None
             for field, value in update.dict(exclude_unset=True).items():
                 if hasattr(rule, field):
                     setattr(rule, field, value)
             rule.updated_at = datetime.utcnow()
-            self.db.commit()
-            self.db.refresh(rule)
-            return rule
-        rule = await asyncio.to_thread(_sync)
-        if not rule:
-            return None
+            await db.commit()
+            await db.refresh(rule)
+        self.invalidate(rule.account_id)
         return self._to_schema(rule)
 
     async def delete_rule(self, rule_id: int) -> bool:
-        def _sync():
-            rule = self.db.get(Rule, rule_id)
+        async with self.session() as db:
+            rule = await db.get(Rule, rule_id)
             if not rule:
                 return False
-            self.db.delete(rule)
-            self.db.commit()
-            return True
-        return await asyncio.to_thread(_sync)
+            await db.delete(rule)
+            await db.commit()
+        self.invalidate(rule.account_id)
+        return True
 
     async def get_active_rules(self, account_id: Optional[str] = None) -> List[RuleOut]:
-        def _sync():
-            self.ensure_db()
+        async with self.session() as db:
             stmt = select(Rule).where(Rule.enabled == True)
             if account_id:
                 stmt = stmt.where(Rule.account_id == account_id)
-            result = self.db.execute(stmt)
-            return result.scalars().all()
-        rules = await asyncio.to_thread(_sync)
-        return [self._to_schema(r) for r in rules]
+            rules = (await db.execute(stmt)).scalars().all()
+            return [self._to_schema(r) for r in rules]
+
+    async def get_compiled_rules(self, account_id: str) -> List[CompiledRule]:
+        """Active rules of an account with compiled conditions; served from the cache while fresh"""
+        return (await self.get_rule_matcher(account_id)).rules
+
+    async def get_rule_matcher(self, account_id: str) -> RuleMatcher:
+        """Term-indexed matcher over the account's compiled rules; served from the cache while fresh"""
+        cached = self._compiled.get(account_id)
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1]
+
+        generation = self._generation
+        matcher = RuleMatcher(self.compile_rules(await self.get_active_rules(account_id)))
+        if generation == self._generation:
+            self._compiled[account_id] = (time.monotonic() + self._cache_ttl, matcher)
+        return matcher
+
+    @staticmethod
+    def compile_rules(rules: List[RuleOut]) -> List[CompiledRule]:
+        """Parse and compile each rule's condition; rules with invalid conditions are skipped"""
+        compiled = []
+        for rule in rules:
+            try:
+                expression = json.loads(rule.condition)
+                compiled.append(CompiledRule(rule, compile_predicate(expression), expression))
+            except Exception as e:
+                logger.warning("Skipping rule %s with invalid condition: %s", rule.id, e)
+        return compiled
+
+    def invalidate(self, account_id: Optional[str] = None):
+        """Drop one account's compiled rules, or all of them"""
+        self._generation += 1
+        if account_id is None:
+            self._compiled.clear()
+        else:
+            self._compiled.pop(account_id, None)
 
     def _to_schema(self, rule: Rule) -> RuleOut:
         return RuleOut(
@@ -1,22 +1,17 @@
 """
-Sessions repository: provides async methods to create/get/update/delete session metadata using a sync SQLModel Session
-Operations run in a thread via asyncio.to_thread to be safe in async context.
+Sessions repository: provides async methods to create/get/update/delete session metadata.
+Each call runs in its own AsyncSession taken from the pooled async engine.
 """
 from typing import Optional, Dict, Any
 from datetime import datetime
-import asyncio
-from sqlmodel import select
-from app.database.base import BaseRepository
+from app.database.base import AsyncRepository
 from app.models.session_db_model import SessionDB
 from app.schemas.session_schema import SessionOut
 
-class SessionsRepository(BaseRepository):
-    def __init__(self, db):
-        super().__init__(db)
-
+class SessionsRepository(AsyncRepository):
     async def create_session(self, account_id: str, proxy: Optional[str] = None, proxy_enabled: bool = False, locale: str = "en") -> SessionOut:
-        def _sync():
-            session = SessionDB(
+        async with self.session() as db:
+            db_model = SessionDB(
                 id=str(datetime.utcnow().timestamp()).replace('.', '') ,
                 account_id=account_id,
                 proxy=proxy,
@@ -25,12 +20,8 @@ class SessionsRepository(BaseRepository):
                 created_at=datetime.utcnow(),
                 updated_at=datetime.utcnow()
             )
-            self.db.add(session)
-            self.db.commit()
-            self.db.refresh(session)
-            return session
-
-        db_model = await asyncio.to_thread(_sync)
+            db.add(db_model)
+            await db.commit()
         return SessionOut(
             id=db_model.id,
             account_id=db_model.account_id,
@@ -41,10 +32,8 @@ class SessionsRepository(BaseRepository):
         )
 
     async def get_session(self, session_id: str) -> Optional[SessionOut]:
-        def _sync():
-            return self.db.get(SessionDB, session_id)
-
-        db_model = await asyncio.to_thread(_sync)
+        async with self.session() as db:
+            db_model = await db.get(SessionDB, session_id)
         if not db_model:
             return None
         return SessionOut(
@@ -58,27 +47,22 @@ class SessionsRepository(BaseRepository):
         )
 
     async def update_session(self, session_id: str, **updates: Any) -> bool:
-        def _sync():
-            db_model = self.db.get(SessionDB, session_id)
+        async with self.session() as db:
+            db_model = await db.get(SessionDB, session_id)
             if not db_model:
                 return False
             for k, v in updates.items():
                 if hasattr(db_model, k):
                     setattr(db_model, k, v)
             db_model.updated_at = datetime.utcnow()
-            self.db.commit()
-            self.db.refresh(db_model)
+            await db.commit()
             return True
 
-        return await asyncio.to_thread(_sync)
-
     async def delete_session(self, session_id: str) -> bool:
-        def _sync():
-            db_model = self.db.get(SessionDB, session_id)
+        async with self.session() as db:
+            db_model = await db.get(SessionDB, session_id)
             if not db_model:
                 return False
-            self.db.delete(db_model)
-            self.db.commit()
+            await db.delete(db_model)
+            await db.commit()
             return True
-
-        return await asyncio.to_thread(_sync)
@@ -2,27 +2,66 @@
 Persian:
     SettingsRepository: ?????????? ??????? ????? (????).
 English:
-    Settings repository for account-level settings (stubbed implementation).
+    Settings repository for account-level settings stored in the account_settings table.
+    Reads go through a per-process TTL cache so rate checks for hot accounts never touch the DB;
+    writes (settings_router) invalidate the cached entry.
 """
 
-from typing import Optional
-from app.database.base import BaseRepository
+import time
+from datetime import datetime
+from typing import Dict, Optional, Tuple
 
-class SettingsRepository(BaseRepository):
-    def __init__(self, db=None):
-        super().__init__(db)
+from app.config import SETTINGS_CACHE_TTL
+from app.database.base import AsyncRepository
+from app.models.account_settings_model import AccountSettingsDB
+from app.schemas.job_schema import AccountSettings
 
-    async def get_account_settings(self, account_id: str):
-        """Return account settings. Currently returns defaults (no DB backing).
-        Kept async so callers can await this method even if implementation is sync.
+
+class SettingsRepository(AsyncRepository):
+    def __init__(self, session_factory=None, cache_ttl: float = SETTINGS_CACHE_TTL):
+        super().__init__(session_factory)
+        self._cache_ttl = cache_ttl
+        self._cache: Dict[str, Tuple[float, AccountSettings]] = {}
+
+    async def get_account_settings(self, account_id: str) -> AccountSettings:
+        """Return account settings, from the cache when fresh; accounts without a row get the defaults."""
+        cached = self._cache.get(account_id)
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1]
+
+        async with self.session() as db:
+            row = await db.get(AccountSettingsDB, account_id)
+        settings = self._to_schema(row if row is not None else AccountSettingsDB(account_id=account_id))
+        self._cache[account_id] = (time.monotonic() + self._cache_ttl, settings)
+        return settings
+
+    async def update_account_settings(self, account_id: str, values: Dict) -> AccountSettings:
         """
-        class Settings:
-            reply_delay = 5
-            dm_delay = 5
-            like_delay = 2
-            hourly_limit = 100
-            daily_limit = 1000
-            random_jitter = False
-            jitter_min = 0
-            jitter_max = 0
-        return Settings()
+        Create or update an account's settings row and drop its cached copy.
+        Raises ValueError (nothing is written) when the merged jitter_min exceeds jitter_max.
+        """
+        async with self.session() as db:
+            row = await db.get(AccountSettingsDB, account_id)
+            if row is None:
+                row = AccountSettingsDB(account_id=account_id)
+                db.add(row)
+            for field, value in values.items():
+                if field in AccountSettingsDB.__fields__ and field not in ("account_id", "created_at"):
+                    setattr(row, field, value)
+            if row.jitter_min > row.jitter_max:
+                raise ValueError("jitter_min_sec must not exceed jitter_max_sec")
+            row.updated_at = datetime.utcnow()
+            await db.commit()
+        self.invalidate(account_id)
+        return self._to_schema(row)
+
+    def invalidate(self, account_id: Optional[str] = None):
+        """Forget one account's cached settings, or all of them"""
+        if account_id is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(account_id, None)
+
+    @staticmethod
+    def _to_schema(row: AccountSettingsDB) -> AccountSettings:
+        return AccountSettings(**{field: getattr(row, field) for field in AccountSettings.__fields__})
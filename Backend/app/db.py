@@ -4,9 +4,12 @@ Persian:
 
 English:
     Database bootstrap using SQLModel and provide session factory.
+    Repositories use the pooled AsyncEngine (aiosqlite / asyncpg) through AsyncSessionLocal and open
+    one AsyncSession per unit of work; the sync engine remains for init_db and sync callers.
 """
 
 from sqlmodel import SQLModel, create_engine, Session
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 import os
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./dev.db")
@@ -14,9 +17,38 @@ DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./dev.db")
 # echo را بسته به نیاز لاگ فعال/غیرفعال کنید
 engine = create_engine(DATABASE_URL, echo=True, connect_args={"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {})
 
+def async_database_url(url: str = DATABASE_URL) -> str:
+    """Map a sync DATABASE_URL to its async driver (sqlite -> aiosqlite, postgresql -> asyncpg)"""
+    if url.startswith("sqlite:"):
+        return url.replace("sqlite:", "sqlite+aiosqlite:", 1)
+    for prefix in ("postgresql://", "postgres://", "postgresql+psycopg2://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    return url
+
+def make_async_engine(url: str = DATABASE_URL, **kwargs) -> AsyncEngine:
+    """Create an AsyncEngine; server databases get a sized connection pool from config"""
+    from app.config import DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE
+    if not url.startswith("sqlite") and "poolclass" not in kwargs:
+        kwargs.setdefault("pool_size", DB_POOL_SIZE)
+        kwargs.setdefault("max_overflow", DB_MAX_OVERFLOW)
+        kwargs.setdefault("pool_timeout", DB_POOL_TIMEOUT)
+        kwargs.setdefault("pool_recycle", DB_POOL_RECYCLE)
+        kwargs.setdefault("pool_pre_ping", True)
+    return create_async_engine(async_database_url(url), **kwargs)
+
+async_engine = make_async_engine()
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+
 def init_db():
     SQLModel.metadata.create_all(engine)
+    from app.database.migrations import upgrade
+    upgrade(engine)
 
 def get_session():
     with Session(engine) as session:
         yield session
+
+async def get_async_session():
+    async with AsyncSessionLocal() as session:
+        yield session
@@ -5,26 +5,76 @@ Persian:
 
 English:
     Dependency providers for FastAPI. get_session_manager returns a singleton instance of the async SessionManager.
+    get_reply_history returns the process-wide ReplyHistoryService (shared with the job processor).
+    get_settings_repository returns the process-wide SettingsRepository whose cache the rate limiter reads.
+    get_logs_repository returns a LogsRepository for keyset-paginated log reads.
+    get_jobs_repository returns the process-wide JobsRepository wired to the approximate job counters.
+    get_rules_repository returns the process-wide RulesRepository holding the compiled rule cache.
     Other providers include locale and client log verbosity.
 """
 
 from fastapi import Request, Depends
 from app.services.session_manager import SessionManager
+from app.services.reply_history import ReplyHistoryService
 from app.config import LOG_VERBOSITY_DEFAULT, LogVerbosity
-from app.db import get_session
 from app.database.sessions_repository import SessionsRepository
+from app.database.settings_repository import SettingsRepository
+from app.database.logs_repository import LogsRepository
+from app.database.jobs_repository import JobsRepository
+from app.database.rules_repository import RulesRepository
+from app.services.job_counters import JobCounters
 
 # Singleton session manager instance used by DI
 _session_manager = None
 
-def get_session_manager(db=Depends(get_session)) -> SessionManager:
+def get_session_manager() -> SessionManager:
     global _session_manager
     if _session_manager is None:
-        # Wrap DB into a SessionsRepository so SessionManager gets the expected API
-        sessions_repo = SessionsRepository(db)
+        # SessionsRepository opens a pooled AsyncSession per call, so the singleton never holds a request's session
+        sessions_repo = SessionsRepository()
         _session_manager = SessionManager(sessions_repo)
     return _session_manager
 
+# Singleton reply history service; background purges are tracked on this instance
+_reply_history = None
+
+def get_reply_history() -> ReplyHistoryService:
+    global _reply_history
+    if _reply_history is None:
+        _reply_history = ReplyHistoryService()
+    return _reply_history
+
+# Singleton settings repository; the rate limiter and settings_router must share its cache
+_settings_repo = None
+
+def get_settings_repository() -> SettingsRepository:
+    global _settings_repo
+    if _settings_repo is None:
+        _settings_repo = SettingsRepository()
+    return _settings_repo
+
+# Singleton jobs repository; the job processor, archiver and jobs_router share its counters
+_jobs_repo = None
+
+def get_jobs_repository() -> JobsRepository:
+    global _jobs_repo
+    if _jobs_repo is None:
+        _jobs_repo = JobsRepository(counters=JobCounters())
+    return _jobs_repo
+
+# Singleton rules repository; rule writes must invalidate the same compiled cache the engines read
+_rules_repo = None
+
+def get_rules_repository() -> RulesRepository:
+    global _rules_repo
+    if _rules_repo is None:
+        _rules_repo = RulesRepository()
+    return _rules_repo
+
+def get_logs_repository() -> LogsRepository:
+    # stateless; each call opens its own pooled AsyncSession
+    return LogsRepository()
+
 def get_locale(request: Request) -> str:
     # priority: query param 'locale' -> Accept-Language header -> DEFAULT
     q = request.query_params.get("locale")
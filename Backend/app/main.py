@@ -29,36 +29,34 @@ from app.routers import (
     jobs_router,
     settings_router,
     stories_router,
+    reply_router,
 )
 from app.middleware.verbosity_middleware import VerbosityMiddleware, default_rate_limit, strict_rate_limit
-from app.db import init_db, engine
+from app.db import init_db, engine, async_engine
 from app.services import telemetry_service
 from app.services.job_processor import JobProcessor
+from app.services.job_archiver import JobArchiver
 from app.services.rate_limiter import RateLimiter
-from app.database.jobs_repository import JobsRepository
-from app.database.rules_repository import RulesRepository
-from app.database.settings_repository import SettingsRepository
 from app.services.insta_client_factory import InstaClientFactory
-from app.services.reply_history import ReplyHistoryService
+from app.services.client_pool import get_client_pool
+from app.deps import get_jobs_repository, get_reply_history, get_rules_repository, get_settings_repository
+from app.services.comment_cursor_store import CommentCursorStore
 from fastapi_limiter import FastAPILimiter
 import redis.asyncio as redis  # redis-py async client
-from sqlmodel import Session
 
 # Remove lifespan usage; manage job processor in startup/shutdown events
 
-# Create a single DB session to reuse (simple approach for this app)
-_db_session = Session(engine)
-
-# Create repositories
-jobs_repo = JobsRepository(db=_db_session)
-rules_repo = RulesRepository(db=_db_session)
-settings_repo = SettingsRepository(db=_db_session)
+# Create repositories (each call opens its own session from the pooled async engine)
+jobs_repo = get_jobs_repository()
+rules_repo = get_rules_repository()
+settings_repo = get_settings_repository()
 
 # Create services
 rate_limiter = RateLimiter(settings_repo)
 client_factory = InstaClientFactory()
 reply_history = None
 job_processor = None
+job_archiver = JobArchiver(jobs_repo)
 
 app = FastAPI(
     title="InstaAutomation Backend",
@@ -96,16 +94,20 @@ async def startup_event():
 
     # Create reply history and job processor after DB init
     global reply_history, job_processor
-    reply_history = ReplyHistoryService()
+    reply_history = get_reply_history()
     job_processor = JobProcessor(
         client_factory=client_factory,
         jobs_repo=jobs_repo,
         rules_repo=rules_repo,
         rate_limiter=rate_limiter,
-        reply_history=reply_history
+        reply_history=reply_history,
+        client_pool=get_client_pool(),
+        comment_cursors=CommentCursorStore()
     )
     # start background job processor
     asyncio.create_task(job_processor.start())
+    # move finished jobs out of the hot table on a schedule
+    asyncio.create_task(job_archiver.start())
 
 
 @app.on_event("shutdown")
@@ -114,6 +116,12 @@ async def shutdown_event():
     global job_processor
     if job_processor:
         await job_processor.stop()
+    await job_archiver.stop()
+    # Flush in-process reply Bloom filters so the next start does not rebuild them
+    if reply_history is not None and reply_history.bloom is not None:
+        await reply_history.bloom.persist_all()
+    # Close pooled DB connections
+    await async_engine.dispose()
 
 
 # Health
@@ -139,6 +147,7 @@ app.include_router(challenge_ws_router.router)
 app.include_router(jobs_router.router)
 app.include_router(settings_router.router)
 app.include_router(stories_router.router)
+app.include_router(reply_router.router)
 
 # metrics_router is optional (already have /metrics) but included if exists
 try:
@@ -0,0 +1,30 @@
+"""
+Persian:
+    مدل AccountSettingsDB برای ذخیرهٔ تنظیمات سرعت و سهمیهٔ هر حساب (سطل توکن برای هر نوع عملیات و سقف روزانه).
+
+English:
+    AccountSettingsDB model storing per-account pacing and quotas (token bucket per operation type and daily cap).
+"""
+
+from sqlmodel import SQLModel, Field
+from datetime import datetime
+
+
+class AccountSettingsDB(SQLModel, table=True):
+    __tablename__ = "account_settings"
+
+    account_id: str = Field(primary_key=True, description="Account id / شناسه حساب")
+    enable_delay: bool = Field(default=True, description="Pace operations / فاصله‌گذاری بین عملیات")
+    reply_delay: int = Field(default=5, description="Seconds per reply token / ثانیه برای هر توکن پاسخ")
+    dm_delay: int = Field(default=5, description="Seconds per DM token / ثانیه برای هر توکن دایرکت")
+    like_delay: int = Field(default=2, description="Seconds per like token / ثانیه برای هر توکن لایک")
+    reply_burst: int = Field(default=1, description="Reply bucket size / اندازه سطل پاسخ")
+    dm_burst: int = Field(default=1, description="DM bucket size / اندازه سطل دایرکت")
+    like_burst: int = Field(default=1, description="Like bucket size / اندازه سطل لایک")
+    hourly_limit: int = Field(default=100)
+    daily_limit: int = Field(default=1000, description="Daily cap per operation type / سقف روزانه")
+    random_jitter: bool = Field(default=False)
+    jitter_min: int = Field(default=0)
+    jitter_max: int = Field(default=0)
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
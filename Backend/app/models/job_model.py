@@ -4,20 +4,59 @@ Persian:
 
 English:
     Job model to track queued jobs: job_id, type, status, payload, timestamps and idempotency token.
+    Comment-automation jobs also carry their rule/media/account context; workers claim pending jobs
+    by setting claimed_by and a lease (lease_expires_at) that a reaper releases if the worker dies.
+    Finished jobs are moved to JobArchive (job_archive) after a retention period so the hot table
+    only holds live work; composite and partial indexes serve the status-driven queries.
 """
 
 from sqlmodel import SQLModel, Field, JSON
+from sqlalchemy import Index, func, text
 from typing import Optional
 from datetime import datetime
 
-class Job(SQLModel, table=True):
-    id: Optional[int] = Field(default=None, primary_key=True)
+# statuses after which a job is never touched again (processor and sender queue vocabularies)
+FINISHED_STATUSES = ("completed", "failed", "cancelled", "done", "dead")
+
+class JobBase(SQLModel):
     job_id: Optional[str] = Field(None, index=True, description="RQ/Celery job id or uuid")
-    idempotency_key: Optional[str] = Field(None, index=True, description="Client-provided idempotency key")
     job_type: str = Field(..., description="Type of job e.g., send_message")
     payload: Optional[str] = Field(None, description="JSON payload as string")
-    status: str = Field("queued", description="queued|processing|done|failed")
+    status: str = Field("queued", description="queued|processing|done|failed|dead (sender) or pending|in_progress|completed|failed (processor)")
     attempts: int = Field(0)
     last_error: Optional[str] = Field(None)
+    rule_id: Optional[str] = Field(None)
+    media_id: Optional[str] = Field(None)
+    target_user_id: Optional[str] = Field(None)
+    comment_id: Optional[str] = Field(None)
+    account_id: Optional[str] = Field(None)
+    session_blob: Optional[str] = Field(None)
+    claimed_by: Optional[str] = Field(None, description="Worker holding the lease")
+    lease_expires_at: Optional[datetime] = Field(None, description="Claim is released after this time")
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
+    completed_at: Optional[datetime] = Field(None)
+
+
+class Job(JobBase, table=True):
+    __table_args__ = (
+        Index("ix_job_status_created_at", "status", "created_at"),
+        Index("ix_job_account_id_status", "account_id", "status"),
+        # the claim query only ever looks at pending rows
+        Index(
+            "ix_job_pending_created_at", "created_at",
+            postgresql_where=text("status = 'pending'"),
+            sqlite_where=text("status = 'pending'"),
+        ),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    idempotency_key: Optional[str] = Field(None, index=True, unique=True, description="Client-provided idempotency key")
+
+
+class JobArchive(JobBase, table=True):
+    __tablename__ = "job_archive"
+
+    id: int = Field(primary_key=True, sa_column_kwargs={"autoincrement": False}, description="Original job.id")
+    idempotency_key: Optional[str] = Field(None, index=True)
+    archived_at: Optional[datetime] = Field(None, index=True, sa_column_kwargs={"server_default": func.now()})
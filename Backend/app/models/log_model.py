@@ -1,9 +1,15 @@
 ﻿from typing import Optional, Dict, Any
 from datetime import datetime
 from sqlmodel import SQLModel, Field
-from sqlalchemy import Column, JSON
+from sqlalchemy import Column, JSON, Index
 
 class EventLog(SQLModel, table=True):
+    # keyset pagination (logs_router) orders by (created_at, id) DESC; filtered and unfiltered listings each seek an index
+    __table_args__ = (
+        Index("ix_eventlog_account_level_created_id", "account_id", "level", "created_at", "id"),
+        Index("ix_eventlog_created_id", "created_at", "id"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     account_id: Optional[str] = Field(
         default=None,
@@ -4,10 +4,16 @@ Persian:
 
 English:
     Router to accept inbound events (e.g., webhook or polling) and run rules engine.
+    /events:batch takes a whole webhook burst: events are grouped per account, each group is
+    matched in one pass by match_rules_batch and all matches are enqueued with one bulk call.
 """
 
-from fastapi import APIRouter, Body
-from app.services.rules_engine import run_rules_for_account
+import asyncio
+import time
+from fastapi import APIRouter, Body, HTTPException
+from app.config import INBOUND_BATCH_MAX
+from app.services.rules_engine import actions_for, enqueue_actions, match_rules_batch, run_rules_for_account
+from app.services.telemetry_service import incr, observe
 
 router = APIRouter(prefix="/api/inbound", tags=["inbound"])
 
@@ -17,5 +23,52 @@ async def inbound_event(payload: dict = Body(...)):
     account_id = payload.get("account_id")
     if not account_id:
         return {"ok": False, "error": "missing_account_id"}
-    run_rules_for_account(account_id, payload)
+    await run_rules_for_account(account_id, payload)
     return {"ok": True}
+
+@router.post("/events:batch", summary="Inbound event batch", description="Receive many events at once and evaluate rules per account in one pass / دریافت دسته‌ای eventها")
+async def inbound_events_batch(payload: dict = Body(...)):
+    # {"events": [...], "account_id": optional default for events that carry none}
+    events = payload.get("events")
+    if not isinstance(events, list):
+        raise HTTPException(status_code=400, detail="events must be a list")
+    if len(events) > INBOUND_BATCH_MAX:
+        raise HTTPException(status_code=413, detail=f"at most {INBOUND_BATCH_MAX} events per batch")
+    started = time.perf_counter()
+    default_account = payload.get("account_id")
+    by_account = {}
+    rejected = []
+    for index, event in enumerate(events):
+        account_id = event.get("account_id", default_account) if isinstance(event, dict) else None
+        if not account_id:
+            rejected.append({"index": index, "error": "missing_account_id"})
+            continue
+        if "account_id" not in event:
+            event = {**event, "account_id": account_id}
+        group = by_account.setdefault(account_id, ([], []))
+        group[0].append(index)
+        group[1].append(event)
+
+    accounts = list(by_account)
+    results = await asyncio.gather(*(match_rules_batch(a, by_account[a][1]) for a in accounts))
+    matched = {}
+    actions = []
+    for account_id, matches in zip(accounts, results):
+        indexes, account_events = by_account[account_id]
+        actions.extend(actions_for(account_events, matches))
+        for index, rule_ids in zip(indexes, matches):
+            if rule_ids:
+                matched[index] = rule_ids
+    # one transaction and one Redis pipeline for the whole request
+    await enqueue_actions(actions)
+
+    accepted = len(events) - len(rejected)
+    incr("inbound_events", accepted)
+    incr("inbound_matches", sum(len(rule_ids) for rule_ids in matched.values()))
+    observe("inbound_batch_duration", time.perf_counter() - started)
+    return {
+        "ok": True,
+        "accepted": accepted,
+        "matched": [{"index": i, "rule_ids": matched[i]} for i in sorted(matched)],
+        "rejected": rejected,
+    }
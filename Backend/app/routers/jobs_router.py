@@ -1,10 +1,54 @@
-from fastapi import APIRouter, Query, Depends
-from typing import Optional
+"""
+Persian:
+    Router فهرست jobها با فیلتر وضعیت، نوع، حساب و بازهٔ زمانی و صفحه‌بندی keyset با cursor امضاشده.
+    تعداد تقریبی کل از شمارنده‌های وضعیت (بدون COUNT(*)) خوانده می‌شود.
+
+English:
+    Jobs listing router: filter by status, type, account and created_at range, keyset-paginated on
+    (created_at, id) with a signed cursor bound to the filters. meta.estimated_total comes from the
+    per-status counters (no COUNT(*)); it is None when a time range is given.
+"""
+
+from datetime import datetime
+from fastapi import APIRouter, Query, Depends, HTTPException
+from typing import Optional, Tuple
+from app.deps import get_jobs_repository
+from app.database.jobs_repository import JobsRepository
+from app.schemas.job_schema import JobOut
+from app.schemas.pagination_schema import PaginatedResponse, PaginationMeta
+from app.utils.secure_cursor import sign, verify
 from app.middleware.verbosity_middleware import default_rate_limit
 
 router = APIRouter(prefix="/api/jobs", tags=["jobs"])
 
-@router.get("")
-async def list_jobs(cursor: Optional[str] = Query(None), limit: int = Query(20), status: Optional[str] = Query(None), type: Optional[str] = Query(None), _rl=Depends(default_rate_limit)):
-    """Return an empty paginated jobs list (stub)"""
-    return {"items": [], "meta": {"next_cursor": None, "count_returned": 0}}
+def _filters(**values) -> dict:
+    return {k: v.isoformat() if isinstance(v, datetime) else v for k, v in values.items()}
+
+def _decode_cursor(token: Optional[str], filters: dict) -> Optional[Tuple[datetime, int]]:
+    if not token:
+        return None
+    try:
+        state = verify(token)
+        after = (datetime.fromisoformat(state["c"]), int(state["i"]))
+    except Exception:
+        raise HTTPException(status_code=400, detail="invalid cursor")
+    if state.get("f") != filters:
+        # a cursor only makes sense for the filters it was issued with
+        raise HTTPException(status_code=400, detail="cursor does not match filters")
+    return after
+
+@router.get("", response_model=PaginatedResponse[JobOut], summary="List jobs / فهرست jobها", description="List jobs with filters and keyset pagination / فهرست jobها با فیلتر و صفحه‌بندی")
+async def list_jobs(cursor: Optional[str] = Query(None), limit: int = Query(20, ge=1, le=200), status: Optional[str] = Query(None), type: Optional[str] = Query(None), account_id: Optional[str] = Query(None), created_from: Optional[datetime] = Query(None), created_to: Optional[datetime] = Query(None), jobs_repo: JobsRepository = Depends(get_jobs_repository), _rl=Depends(default_rate_limit)):
+    filters = _filters(status=status, type=type, account_id=account_id, created_from=created_from, created_to=created_to)
+    after = _decode_cursor(cursor, filters)
+    items, next_after = await jobs_repo.list_jobs(
+        status=status, job_type=type, account_id=account_id,
+        created_from=created_from, created_to=created_to, limit=limit, after=after
+    )
+    next_cursor = sign({"c": next_after[0].isoformat(), "i": next_after[1], "f": filters}) if next_after else None
+
+    estimated_total = None
+    if jobs_repo.counters is not None and not (created_from or created_to):
+        estimated_total = await jobs_repo.counters.estimate(status=status, job_type=type, account_id=account_id)
+    meta = PaginationMeta(next_cursor=next_cursor, count_returned=len(items), estimated_total=estimated_total)
+    return {"items": items, "meta": meta}
@@ -2,48 +2,48 @@
 Persian:
     Router async برای خواندن لاگ‌ها با فیلتر سطح و صفحه‌بندی.
     endpoint فهرست لاگ‌ها با rate-limit محافظت شده است.
+    صفحه‌بندی keyset روی (created_at, id) با cursor امضاشده است.
 
 English:
     Async router to read logs with filters and pagination.
     The list endpoint is protected with a default rate-limit.
+    Pagination is keyset-based on (created_at, id) with a signed cursor (utils.secure_cursor)
+    bound to the filters it was issued for, so deep pages cost the same as the first one.
 """
 
-from fastapi import APIRouter, Depends, Query
-from sqlmodel import Session, select
-from typing import Optional
-from app.db import get_session
-from app.models.log_model import EventLog
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Optional, Tuple
+from app.deps import get_logs_repository
+from app.database.logs_repository import LogsRepository
 from app.schemas.log_schema import LogOut
 from app.schemas.pagination_schema import PaginatedResponse, PaginationMeta
-import base64, json
+from app.utils.secure_cursor import sign, verify
 from app.middleware.verbosity_middleware import default_rate_limit
 
 router = APIRouter(prefix="/api/logs", tags=["logs"])
 
-def _encode_cursor(state: dict) -> str:
-    return base64.urlsafe_b64encode(json.dumps(state).encode()).decode()
+def _encode_cursor(created_at: datetime, log_id: int, level: Optional[str], account_id: Optional[str]) -> str:
+    return sign({"c": created_at.isoformat(), "i": log_id, "l": level, "a": account_id})
 
-def _decode_cursor(token: Optional[str]) -> dict:
+def _decode_cursor(token: Optional[str], level: Optional[str], account_id: Optional[str]) -> Optional[Tuple[datetime, int]]:
     if not token:
-        return {"offset": 0}
+        return None
     try:
-        raw = base64.urlsafe_b64decode(token.encode()).decode()
-        return json.loads(raw)
+        state = verify(token)
+        after = (datetime.fromisoformat(state["c"]), int(state["i"]))
     except Exception:
-        return {"offset": 0}
+        raise HTTPException(status_code=400, detail="invalid cursor")
+    if state.get("l") != level or state.get("a") != account_id:
+        # a cursor only makes sense for the filters it was issued with
+        raise HTTPException(status_code=400, detail="cursor does not match filters")
+    return after
 
 @router.get("", response_model=PaginatedResponse[LogOut], summary="List logs / فهرست لاگ‌ها", description="List logs with filters and pagination / فهرست لاگ‌ها با فیلتر و صفحه‌بندی")
-async def list_logs(level: Optional[str] = Query(None), account_id: Optional[str] = Query(None), limit: int = Query(50, le=200), cursor: Optional[str] = Query(None), db: Session = Depends(get_session), _rl=Depends(default_rate_limit)):
-    decoded = _decode_cursor(cursor)
-    offset = decoded.get("offset", 0)
-    statement = select(EventLog).order_by(EventLog.created_at.desc())
-    if level:
-        statement = statement.where(EventLog.level == level)
-    if account_id:
-        statement = statement.where(EventLog.account_id == account_id)
-    rows = db.exec(statement.limit(limit).offset(offset)).all()
+async def list_logs(level: Optional[str] = Query(None), account_id: Optional[str] = Query(None), limit: int = Query(50, le=200), cursor: Optional[str] = Query(None), logs_repo: LogsRepository = Depends(get_logs_repository), _rl=Depends(default_rate_limit)):
+    after = _decode_cursor(cursor, level, account_id)
+    rows = await logs_repo.list_logs(level=level, account_id=account_id, limit=limit, after=after)
     items = [LogOut.from_orm(r) for r in rows]
-    next_offset = offset + len(items)
-    next_cursor = _encode_cursor({"offset": next_offset}) if len(items) == limit else None
+    next_cursor = _encode_cursor(rows[-1].created_at, rows[-1].id, level, account_id) if len(rows) == limit else None
     meta = PaginationMeta(next_cursor=next_cursor, count_returned=len(items))
     return {"items": items, "meta": meta}
@@ -10,6 +10,8 @@ Install:
 from fastapi import APIRouter, Depends, HTTPException
 from app.services.reply_service import ReplyService
 from app.services.dm_service import DMService
+from app.services.reply_history import ReplyHistoryService
+from app.deps import get_reply_history
 
 router = APIRouter(prefix="/api/reply", tags=["reply"])
 
@@ -22,3 +24,20 @@ async def send_reply_to_comment(media_id: str, comment_id: str, reply_text: str)
 async def send_dm_to_user(user_id: str, dm_text: str):
     # TODO: Implement using DMService
     return {"ok": True}
+
+@router.delete("/history/{account_id}", status_code=202, summary="Purge an account's reply history in the background")
+async def purge_reply_history(account_id: str, media_id: str = None,
+                              history: ReplyHistoryService = Depends(get_reply_history)):
+    if media_id:
+        # a single media's keys are known from its set (no keyspace SCAN); clear it inline
+        deleted = await history.clear_history(account_id, media_id)
+        return {"status": "done", "deleted": deleted}
+    purge_id = await history.start_purge(account_id)
+    return {"status": "running", "purge_id": purge_id}
+
+@router.get("/history/purges/{purge_id}", summary="Progress of a reply history purge")
+async def get_purge_status(purge_id: str, history: ReplyHistoryService = Depends(get_reply_history)):
+    status = await history.get_purge_status(purge_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Purge not found")
+    return status
@@ -1,24 +1,50 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
 from app.middleware.verbosity_middleware import default_rate_limit
+from app.database.settings_repository import SettingsRepository
+from app.deps import get_settings_repository
+from app.schemas.settings_schema import SettingsUpdate
 from datetime import datetime
 
 router = APIRouter(prefix="/api/settings", tags=["settings"])
 
-@router.get("/{account_id}")
-async def get_settings(account_id: str, _rl=Depends(default_rate_limit)):
-    # Return default settings shaped to match client SettingsDto
+# client SettingsDto field -> AccountSettings field
+_DTO_FIELDS = {
+    "enable_delay": "enable_delay",
+    "comment_delay_sec": "reply_delay",
+    "like_delay_sec": "like_delay",
+    "dm_delay_sec": "dm_delay",
+    "comment_burst": "reply_burst",
+    "like_burst": "like_burst",
+    "dm_burst": "dm_burst",
+    "hourly_limit": "hourly_limit",
+    "daily_limit": "daily_limit",
+    "random_jitter_enabled": "random_jitter",
+    "jitter_min_sec": "jitter_min",
+    "jitter_max_sec": "jitter_max",
+}
+
+
+def _to_dto(settings) -> dict:
+    # Shaped to match client SettingsDto
     now = datetime.utcnow().isoformat() + "Z"
-    return {
-        "account_id": account_id,
-        "enable_delay": False,
-        "comment_delay_sec": 5,
-        "like_delay_sec": 2,
-        "dm_delay_sec": 5,
-        "hourly_limit": 100,
-        "daily_limit": 1000,
-        "random_jitter_enabled": False,
-        "jitter_min_sec": 0,
-        "jitter_max_sec": 0,
-        "created_at": now,
-        "updated_at": now
-    }
+    dto = {"account_id": settings.account_id}
+    dto.update({dto_field: getattr(settings, field) for dto_field, field in _DTO_FIELDS.items()})
+    dto.update({"created_at": now, "updated_at": now})
+    return dto
+
+
+@router.get("/{account_id}")
+async def get_settings(account_id: str, _rl=Depends(default_rate_limit),
+                       repo: SettingsRepository = Depends(get_settings_repository)):
+    return _to_dto(await repo.get_account_settings(account_id))
+
+
+@router.put("/{account_id}")
+async def update_settings(account_id: str, update: SettingsUpdate, _rl=Depends(default_rate_limit),
+                          repo: SettingsRepository = Depends(get_settings_repository)):
+    values = {_DTO_FIELDS[k]: v for k, v in update.dict(exclude_unset=True).items() if v is not None}
+    # the write also drops this account's cached settings, so the rate limiter sees it at once
+    try:
+        return _to_dto(await repo.update_account_settings(account_id, values))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
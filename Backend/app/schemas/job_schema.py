@@ -9,7 +9,7 @@ English:
 from datetime import datetime
 from enum import Enum
 from typing import Optional, Dict, Any
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 class JobStatus(str, Enum):
     PENDING = "pending"
@@ -28,13 +28,31 @@ class JobItem(BaseModel):
     target_user_id: str
     comment_id: Optional[str] = None
     payload: Dict[str, Any]
-    created_at: datetime = datetime.utcnow()
-    updated_at: datetime = datetime.utcnow()
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
     completed_at: Optional[datetime] = None
     error: Optional[str] = None
     attempts: int = 0
     account_id: Optional[str] = None
     session_blob: Optional[str] = None
+    idempotency_key: Optional[str] = None
+
+class JobOut(BaseModel):
+    """Job as returned by the jobs API (no session material); status covers processor and sender queue values"""
+    id: str
+    type: str
+    status: str
+    rule_id: Optional[str] = None
+    media_id: Optional[str] = None
+    target_user_id: Optional[str] = None
+    comment_id: Optional[str] = None
+    account_id: Optional[str] = None
+    payload: Dict[str, Any]
+    attempts: int = 0
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    completed_at: Optional[datetime] = None
 
 class AccountSettings(BaseModel):
     """Account settings model"""
@@ -43,6 +61,9 @@ class AccountSettings(BaseModel):
     reply_delay: int = 30  # seconds
     dm_delay: int = 60  # seconds
     like_delay: int = 15  # seconds
+    reply_burst: int = 1  # operations allowed back to back
+    dm_burst: int = 1
+    like_burst: int = 1
     hourly_limit: int = 20
     daily_limit: int = 100
     random_jitter: bool = True
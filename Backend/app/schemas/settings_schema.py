@@ -0,0 +1,34 @@
+"""
+Persian:
+    اسکیمای ورودی به‌روزرسانی تنظیمات حساب (شکل SettingsDto کلاینت) با اعتبارسنجی مقادیر.
+
+English:
+    Account settings update input, shaped like the client's SettingsDto, with value validation:
+    delays and limits are non-negative (an hourly or daily limit of 0 pauses the account), bursts
+    are at least 1 and jitter_min <= jitter_max.
+"""
+
+from typing import Optional
+from pydantic import BaseModel, Field, validator
+
+
+class SettingsUpdate(BaseModel):
+    enable_delay: Optional[bool] = None
+    comment_delay_sec: Optional[int] = Field(None, ge=0, description="فاصله بین پاسخ‌ها / seconds between replies")
+    like_delay_sec: Optional[int] = Field(None, ge=0, description="فاصله بین لایک‌ها / seconds between likes")
+    dm_delay_sec: Optional[int] = Field(None, ge=0, description="فاصله بین دایرکت‌ها / seconds between DMs")
+    comment_burst: Optional[int] = Field(None, ge=1, description="حداکثر پاسخ پشت سر هم / reply burst size")
+    like_burst: Optional[int] = Field(None, ge=1, description="حداکثر لایک پشت سر هم / like burst size")
+    dm_burst: Optional[int] = Field(None, ge=1, description="حداکثر دایرکت پشت سر هم / DM burst size")
+    hourly_limit: Optional[int] = Field(None, ge=0, description="سقف ساعتی / actions per hour")
+    daily_limit: Optional[int] = Field(None, ge=0, description="سقف روزانه / actions per day")
+    random_jitter_enabled: Optional[bool] = None
+    jitter_min_sec: Optional[int] = Field(None, ge=0, description="حداقل تأخیر تصادفی / minimum jitter")
+    jitter_max_sec: Optional[int] = Field(None, ge=0, description="حداکثر تأخیر تصادفی / maximum jitter")
+
+    @validator("jitter_max_sec")
+    def _jitter_range(cls, v, values):
+        lo = values.get("jitter_min_sec")
+        if v is not None and lo is not None and lo > v:
+            raise ValueError("jitter_min_sec must not exceed jitter_max_sec")
+        return v
@@ -0,0 +1,555 @@
+"""
+Persian:
+    worker ارسال مبتنی بر asyncio که به جای اجرای هر job در یک event loop تازه (asyncio.run داخل RQ)،
+    یک loop زنده و استخر کلاینت گرم را نگه می‌دارد و صف sender را مستقیماً از Redis مصرف می‌کند.
+    چند ارسال هم‌زمان در هر پردازه اجرا می‌شود ولی ارسال‌های هر حساب پشت سر هم انجام می‌شوند.
+    idهای در حال پردازش در فهرست in-flight همین worker نگه داشته و پس از راه‌اندازی مجدد به صف برمی‌گردند.
+
+English:
+    asyncio-native sender worker. Instead of RQ running every job in a fresh event loop
+    (asyncio.run per send, client rebuilt each time), one long-lived loop with the warm client pool
+    consumes the sender queue directly: job ids are moved atomically onto this worker's in-flight
+    list, the action is read from the Job row enqueue_send stored, and up to
+    SENDER_WORKER_CONCURRENCY sends run at once, one at a time per account. Failures are retried
+    with exponential backoff up to JOB_MAX_ATTEMPTS and then go to the DLQ like the RQ worker's.
+    Every worker has a unique name (host:pid:random unless SENDER_WORKER_NAME is set) and heartbeats
+    into its backend's worker registry; live workers requeue whatever a worker silent for
+    SENDER_WORKER_DEAD_AFTER left in flight, and a worker restarted under an explicit name
+    requeues its own leftovers on start.
+    The source follows SENDER_QUEUE_BACKEND: RQ's "sender" list (RQListSource, BLMOVE), the
+    per-account lanes (LaneSource), where a rate-limited or challenged account's lane is paused, or
+    the sender stream's consumer group (StreamSource), where a job is also dead-lettered once its
+    delivery count passes JOB_MAX_ATTEMPTS.
+
+    Run with: python -m app.services.async_sender_worker
+"""
+
+import asyncio
+import json
+import logging
+import signal
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional, Set
+
+import redis.asyncio as redis
+from redis.exceptions import ResponseError
+from rq import Queue
+from rq.job import Job as RQJob
+
+from app.config import (
+    REDIS_URL,
+    SENDER_LANE_PAUSE_SECONDS,
+    SENDER_LANE_QUANTUM,
+    SENDER_QUEUE_BACKEND,
+    SENDER_RETRY_BACKOFF_MAX,
+    SENDER_STREAM_BATCH,
+    SENDER_STREAM_CLAIM_IDLE,
+    SENDER_STREAM_DEAD_MAXLEN,
+    SENDER_WORKER_CONCURRENCY,
+    SENDER_WORKER_DEAD_AFTER,
+    SENDER_WORKER_HEARTBEAT,
+    SENDER_WORKER_NAME,
+)
+from app.database.jobs_repository import JobsRepository
+from app.database.sessions_repository import SessionsRepository
+from app.models.job_model import Job
+from app.services.client_pool import get_client_pool
+from app.services.job_counters import JobCounters
+from app.services.sender_lanes import SenderLanes
+from app.services.sender_queue import DLQ_TTL, MAX_ATTEMPTS, dlq_entry, lane_of
+from app.services.sender_streams import SenderStream
+from app.services.sender_worker import perform_send
+from app.services.session_manager import SessionManager
+from app.services.telemetry_service import incr
+from app.utils.insta_error_map import map_instagram_exception
+
+logger = logging.getLogger(__name__)
+
+# seconds RQ keeps a finished job's hash (RQ's default result_ttl)
+RESULT_TTL = 500
+# send errors that mean the account must wait (lanes backend pauses the account's lane)
+PAUSE_CODES = ("rate_limited", "challenge_required", "two_factor_required", "login_required")
+
+
+class _Source:
+    pauses_lanes = False
+    # sorted set of worker name -> last heartbeat, per backend
+    workers_key = ""
+
+    async def reap(self, name: str) -> Optional[int]:
+        """
+        Hand back what the named (dead) worker left in flight; returns how many ids were requeued,
+        or None while it still holds entries that cannot be moved yet (keep it registered)
+        """
+        return None
+
+    def deliveries(self, token: str) -> int:
+        """How many times this entry has been handed to a worker (only streams track it)"""
+        return 1
+
+    async def dead_letter(self, key: str, payload: str):
+        await self.redis.set(key, payload, ex=DLQ_TTL)
+
+
+class RQListSource(_Source):
+    """Job ids from RQ's sender list in queue order; retries go back to the tail after their backoff"""
+
+    def __init__(self, client, queue_name: str = "sender", name: str = SENDER_WORKER_NAME):
+        self.redis = client
+        self.queue_name = queue_name
+        self.queue_key = Queue.redis_queue_namespace_prefix + queue_name
+        self.workers_key = f"{queue_name}:workers"
+        self.inflight_key = f"{queue_name}:inflight:{name}"
+
+    async def recover(self) -> int:
+        """Requeue (at the head, in order) ids a previous run of this worker left in flight"""
+        return await self._requeue_inflight(self.inflight_key)
+
+    async def reap(self, name: str) -> Optional[int]:
+        return await self._requeue_inflight(f"{self.queue_name}:inflight:{name}")
+
+    async def _requeue_inflight(self, inflight_key: str) -> int:
+        moved = 0
+        while await self.redis.lmove(inflight_key, self.queue_key, "RIGHT", "LEFT") is not None:
+            moved += 1
+        return moved
+
+    async def fetch(self, timeout: Optional[float]) -> List[str]:
+        if timeout is None:
+            job_id = await self.redis.lmove(self.queue_key, self.inflight_key, "LEFT", "RIGHT")
+        else:
+            job_id = await self.redis.blmove(self.queue_key, self.inflight_key, timeout, "LEFT", "RIGHT")
+        return [job_id] if job_id is not None else []
+
+    @staticmethod
+    def job_id(token: str) -> str:
+        return token
+
+    async def done(self, token: str, status: Optional[str] = None, ttl: int = RESULT_TTL):
+        await self.redis.lrem(self.inflight_key, 1, token)
+        if status:
+            # mirror the outcome on RQ's job hash and let it expire, as an RQ worker would
+            key = RQJob.redis_job_namespace_prefix + token
+            try:
+                pipe = self.redis.pipeline(transaction=False)
+                pipe.hset(key, "status", status)
+                pipe.expire(key, ttl)
+                await pipe.execute()
+            except Exception as e:
+                logger.debug("Could not update RQ job %s: %s", token, e)
+
+    async def retry(self, token: str, delay: float):
+        await asyncio.sleep(delay)
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.rpush(self.queue_key, token)
+        pipe.lrem(self.inflight_key, 1, token)
+        await pipe.execute()
+
+
+class LaneSource(_Source):
+    """
+    Job ids from the per-account lanes (SENDER_QUEUE_BACKEND=lanes), round-robin across accounts.
+    A retry goes back to the head of its lane, which is paused for the backoff, so order is kept.
+    """
+
+    pauses_lanes = True
+    # how long an idle worker waits before asking the scheduler again
+    IDLE_POLL = 0.1
+
+    def __init__(self, client, name: str = SENDER_WORKER_NAME, quantum: int = SENDER_LANE_QUANTUM):
+        self.redis = client
+        self.lanes = SenderLanes(client)
+        self.workers_key = self.lanes.WORKERS_KEY
+        self.inflight_key = self.lanes.inflight_key(name)
+        self._quantum = quantum
+
+    async def recover(self) -> int:
+        return await self.lanes.recover(self.inflight_key)
+
+    async def reap(self, name: str) -> Optional[int]:
+        # frees the dead worker's lanes (busy count) as well, so those accounts rejoin the ring
+        return await self.lanes.recover(self.lanes.inflight_key(name))
+
+    async def fetch(self, timeout: Optional[float]) -> List[str]:
+        entries = await self.lanes.take(self.inflight_key, self._quantum)
+        if not entries and timeout:
+            await asyncio.sleep(min(timeout, self.IDLE_POLL))
+        return list(entries)
+
+    @staticmethod
+    def job_id(token: str) -> str:
+        return SenderLanes.job_id(token)
+
+    async def done(self, token: str, status: Optional[str] = None, ttl: int = RESULT_TTL):
+        await self.lanes.done(self.inflight_key, token)
+
+    async def retry(self, token: str, delay: float):
+        await self.lanes.requeue(self.inflight_key, token, delay)
+
+
+class StreamSource(_Source):
+    """
+    Entries of the sender stream (SENDER_QUEUE_BACKEND=streams) read in batches through the consumer
+    group. Finished entries are acked and deleted; failed ones stay pending and are made claimable
+    after their backoff (XCLAIM ... IDLE), so every retry is a new delivery. Entries idle for
+    claim_idle are reclaimed from any consumer with XAUTOCLAIM.
+    """
+
+    def __init__(self, client, name: str = SENDER_WORKER_NAME, batch: int = SENDER_STREAM_BATCH,
+                 claim_idle: float = SENDER_STREAM_CLAIM_IDLE, dead_maxlen: int = SENDER_STREAM_DEAD_MAXLEN,
+                 claim_interval: Optional[float] = None):
+        self.redis = client
+        self.stream = SenderStream(client)
+        self.workers_key = f"{self.stream.STREAM_KEY}:workers"
+        self.consumer = name
+        self._batch = max(1, int(batch))
+        self._claim_idle_ms = int(claim_idle * 1000)
+        self._dead_maxlen = dead_maxlen
+        # pause between full XAUTOCLAIM passes over the pending list
+        self._claim_interval = max(1.0, claim_idle / 4) if claim_interval is None else claim_interval
+        self._group_ready = False
+        # this consumer's own pending entries (from a previous run) are read first, from this id on
+        self._own_cursor: Optional[str] = "0"
+        self._claim_cursor = "0-0"
+        self._next_claim = 0.0
+        self._deliveries: Dict[str, int] = {}
+        # entry ids this worker is processing; a slow send reclaimed by XAUTOCLAIM is not started twice
+        self._inflight: Set[str] = set()
+
+    async def _ensure_group(self):
+        if self._group_ready:
+            return
+        try:
+            # from id 0 so entries added before the group existed are delivered too
+            await self.redis.xgroup_create(self.stream.STREAM_KEY, self.stream.GROUP, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        self._group_ready = True
+
+    async def recover(self) -> int:
+        await self._ensure_group()
+        self._own_cursor = "0"
+        pending = await self.redis.xpending_range(
+            self.stream.STREAM_KEY, self.stream.GROUP, "-", "+", 10000, consumername=self.consumer
+        )
+        return len(pending)
+
+    async def reap(self, name: str) -> Optional[int]:
+        # a dead consumer's pending entries are XAUTOCLAIMed once idle; drop the consumer when none are left
+        # (XGROUP DELCONSUMER would discard pending entries)
+        await self._ensure_group()
+        key, group = self.stream.STREAM_KEY, self.stream.GROUP
+        if await self.redis.xpending_range(key, group, "-", "+", 1, consumername=name):
+            return None
+        await self.redis.xgroup_delconsumer(key, group, name)
+        return 0
+
+    async def fetch(self, timeout: Optional[float]) -> List[str]:
+        await self._ensure_group()
+        key, group = self.stream.STREAM_KEY, self.stream.GROUP
+        entries = []
+        if self._own_cursor is not None:
+            response = await self.redis.xreadgroup(group, self.consumer, {key: self._own_cursor}, count=self._batch)
+            entries = response[0][1] if response else []
+            self._own_cursor = entries[-1][0] if entries else None
+            await self._load_deliveries(entries)
+        if not entries and time.monotonic() >= self._next_claim:
+            self._claim_cursor, entries, _ = await self.redis.xautoclaim(
+                key, group, self.consumer, self._claim_idle_ms, self._claim_cursor, count=self._batch
+            )
+            if self._claim_cursor == "0-0":
+                self._next_claim = time.monotonic() + self._claim_interval
+            await self._load_deliveries(entries)
+        if not entries:
+            block = int(timeout * 1000) if timeout else None
+            response = await self.redis.xreadgroup(group, self.consumer, {key: ">"}, count=self._batch, block=block)
+            entries = response[0][1] if response else []
+
+        tokens = []
+        for entry_id, fields in entries:
+            if entry_id in self._inflight:
+                continue
+            if not fields:
+                # the entry's data was deleted (acked elsewhere); only its pending record was left
+                await self.redis.xack(key, group, entry_id)
+                continue
+            self._inflight.add(entry_id)
+            tokens.append(f"{entry_id} {fields['job_id']}")
+        return tokens
+
+    async def _load_deliveries(self, entries):
+        if not entries:
+            return
+        pipe = self.redis.pipeline(transaction=False)
+        for entry_id, _ in entries:
+            pipe.xpending_range(self.stream.STREAM_KEY, self.stream.GROUP, entry_id, entry_id, 1)
+        for rows in await pipe.execute():
+            for row in rows:
+                self._deliveries[row["message_id"]] = row["times_delivered"]
+
+    @staticmethod
+    def job_id(token: str) -> str:
+        return token.split(" ", 1)[1]
+
+    def deliveries(self, token: str) -> int:
+        return self._deliveries.get(token.split(" ", 1)[0], 1)
+
+    async def done(self, token: str, status: Optional[str] = None, ttl: int = RESULT_TTL):
+        entry_id = token.split(" ", 1)[0]
+        self._deliveries.pop(entry_id, None)
+        self._inflight.discard(entry_id)
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.xack(self.stream.STREAM_KEY, self.stream.GROUP, entry_id)
+        pipe.xdel(self.stream.STREAM_KEY, entry_id)
+        await pipe.execute()
+
+    async def retry(self, token: str, delay: float):
+        # keep the entry pending but backdate its idle time so XAUTOCLAIM picks it up after delay
+        # (JUSTID: this is not a delivery; the reclaim is)
+        entry_id = token.split(" ", 1)[0]
+        self._deliveries.pop(entry_id, None)
+        self._inflight.discard(entry_id)
+        idle = max(0, self._claim_idle_ms - int(delay * 1000))
+        await self.redis.xclaim(self.stream.STREAM_KEY, self.stream.GROUP, self.consumer, 0, [entry_id], idle=idle, justid=True)
+
+    async def dead_letter(self, key: str, payload: str):
+        await self.redis.xadd(self.stream.DEAD_KEY, {"payload": payload}, maxlen=self._dead_maxlen, approximate=True)
+
+
+class AsyncSenderWorker:
+    def __init__(
+        self,
+        jobs_repo: Optional[JobsRepository] = None,
+        session_manager: Optional[SessionManager] = None,
+        redis_url: str = REDIS_URL,
+        queue_name: str = "sender",
+        name: str = SENDER_WORKER_NAME,
+        concurrency: int = SENDER_WORKER_CONCURRENCY,
+        max_attempts: int = MAX_ATTEMPTS,
+        backoff_max: float = SENDER_RETRY_BACKOFF_MAX,
+        poll_timeout: float = 1.0,
+        backend: str = SENDER_QUEUE_BACKEND,
+        lane_pause: float = SENDER_LANE_PAUSE_SECONDS,
+        heartbeat: float = SENDER_WORKER_HEARTBEAT,
+        dead_after: float = SENDER_WORKER_DEAD_AFTER
+    ):
+        self.redis = redis.Redis.from_url(redis_url, encoding="utf-8", decode_responses=True)
+        self._jobs_repo = jobs_repo or JobsRepository(counters=JobCounters())
+        self._sm = session_manager or SessionManager(SessionsRepository(), client_pool=get_client_pool())
+        if backend == "lanes":
+            self._source = LaneSource(self.redis, name)
+        elif backend == "streams":
+            self._source = StreamSource(self.redis, name)
+        else:
+            self._source = RQListSource(self.redis, queue_name, name)
+        self._concurrency = max(1, int(concurrency))
+        self._max_attempts = max_attempts
+        self._backoff_max = backoff_max
+        self._poll_timeout = poll_timeout
+        self._lane_pause = lane_pause
+        self._name = name
+        self._heartbeat = heartbeat
+        self._dead_after = dead_after
+        self._slots: Optional[asyncio.Semaphore] = None
+        # per-account locks and the number of sends holding or waiting for each
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._lock_users: Dict[str, int] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._retries: Set[asyncio.Task] = set()
+        self._running = False
+
+    async def start(self):
+        """Consume the queue until stopped, then wait for the sends in flight"""
+        self._running = True
+        await self.heartbeat()
+        await self.recover()
+        beat = asyncio.create_task(self._beat())
+        try:
+            while self._running:
+                try:
+                    await self._dispatch_next(self._poll_timeout)
+                except Exception as e:
+                    logger.warning("Sender worker could not read the queue: %s", e)
+                    await asyncio.sleep(self._poll_timeout)
+            if self._tasks:
+                await asyncio.gather(*self._tasks, return_exceptions=True)
+        finally:
+            beat.cancel()
+        # pending retries are still in flight: hand them back now rather than wait to be reaped as dead
+        if await self._source.reap(self._name) is not None:
+            await self.redis.zrem(self._source.workers_key, self._name)
+
+    async def stop(self):
+        self._running = False
+        for task in list(self._retries):
+            task.cancel()
+
+    async def heartbeat(self) -> int:
+        """Mark this worker alive and requeue what workers silent for dead_after left in flight"""
+        key = self._source.workers_key
+        now = time.time()
+        await self.redis.zadd(key, {self._name: now})
+        moved = 0
+        for name in await self.redis.zrangebyscore(key, "-inf", now - self._dead_after):
+            if name == self._name:
+                continue
+            reaped = await self._source.reap(name)
+            if reaped is None:
+                continue
+            # only the worker whose ZREM succeeds reports it; the moves themselves are atomic
+            if await self.redis.zrem(key, name) and reaped:
+                logger.warning("Requeued %d sender jobs left in flight by dead worker %s", reaped, name)
+            moved += reaped
+        return moved
+
+    async def _beat(self):
+        while True:
+            await asyncio.sleep(self._heartbeat)
+            try:
+                await self.heartbeat()
+            except Exception as e:
+                logger.warning("Sender worker heartbeat failed: %s", e)
+
+    async def drain(self):
+        """Process everything queued, including retries, and return once the queue is empty"""
+        while True:
+            if await self._dispatch_next(None):
+                continue
+            pending = self._tasks | self._retries
+            if not pending:
+                return
+            await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+
+    async def recover(self) -> int:
+        """Requeue the ids a previous run of this worker left in flight"""
+        moved = await self._source.recover()
+        if moved:
+            logger.info("Requeued %d sender jobs left in flight", moved)
+        return moved
+
+    async def _dispatch_next(self, timeout: Optional[float]) -> bool:
+        """Take a slot and the next job ids (waiting up to timeout when given) and start their sends"""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self._concurrency)
+        await self._slots.acquire()
+        try:
+            tokens = await self._source.fetch(timeout)
+        except BaseException:
+            self._slots.release()
+            raise
+        if not tokens:
+            self._slots.release()
+            return False
+        for i, token in enumerate(tokens):
+            if i:
+                await self._slots.acquire()
+            job_id = self._source.job_id(token)
+            # the row is read here, in queue order, so each send takes its account's lock in that order
+            try:
+                job = await self._jobs_repo.get_job_row(job_id)
+            except Exception as e:
+                logger.warning("Could not load sender job %s: %s", job_id, e)
+                self._spawn(self._retries, self._source.retry(token, self._backoff_max))
+                self._slots.release()
+                continue
+            self._spawn(self._tasks, self._handle(token, job_id, job))
+        return True
+
+    @staticmethod
+    def _spawn(tasks: Set[asyncio.Task], coro) -> None:
+        task = asyncio.create_task(coro)
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    @asynccontextmanager
+    async def _account_lock(self, key: str):
+        """Serialize sends of one account; the lock is dropped when nobody holds or waits for it"""
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        self._lock_users[key] = self._lock_users.get(key, 0) + 1
+        try:
+            async with lock:
+                yield
+        finally:
+            self._lock_users[key] -= 1
+            if not self._lock_users[key]:
+                del self._lock_users[key]
+                del self._locks[key]
+
+    async def _handle(self, token: str, job_id: str, job: Optional[Job]):
+        outcome = "dropped"
+        try:
+            if job is None:
+                logger.warning("Sender job %s has no record; dropping it", job_id)
+                return
+            deliveries = self._source.deliveries(token)
+            if deliveries > self._max_attempts:
+                # handed out this often without finishing (e.g. it crashes its worker): stop trying
+                outcome = await self._bury(job_id, f"delivered {deliveries} times without finishing")
+                return
+            action = json.loads(job.payload) if job.payload else {}
+            async with self._account_lock(lane_of(action)):
+                outcome = await self._execute(token, job, action)
+        except Exception as e:
+            logger.exception("Sender job %s could not be processed: %s", job_id, e)
+            self._spawn(self._retries, self._source.retry(token, self._backoff_max))
+            outcome = "retry"
+        finally:
+            if outcome == "done":
+                await self._source.done(token, "finished", RESULT_TTL)
+            elif outcome == "dead":
+                await self._source.done(token, "failed", DLQ_TTL)
+            elif outcome == "dropped":
+                await self._source.done(token)
+            self._slots.release()
+
+    async def _execute(self, token: str, job: Job, action: Dict[str, Any]) -> str:
+        """Send one job; returns "done", "dead" or "retry" (the retry is already scheduled)"""
+        await self._jobs_repo.set_job_status(job.job_id, "processing")
+        session_id = action.get("session_id")
+        try:
+            if session_id:
+                await perform_send(self._sm, session_id, action)
+        except Exception as e:
+            return await self._fail(token, job.job_id, e)
+        await self._jobs_repo.set_job_status(job.job_id, "done")
+        incr("jobs_processed")
+        return "done"
+
+    async def _fail(self, token: str, job_id: str, error: Exception) -> str:
+        incr("jobs_failed")
+        code = map_instagram_exception(error)["code"]
+        if self._source.pauses_lanes and code in PAUSE_CODES:
+            # the account, not the job, is the problem: hold its lane back without spending an attempt
+            await self._jobs_repo.set_job_status(job_id, "queued", error=str(error))
+            logger.info("Pausing sender lane of job %s for %ss (%s)", job_id, self._lane_pause, code)
+            self._spawn(self._retries, self._source.retry(token, self._lane_pause))
+            return "retry"
+        row = await self._jobs_repo.set_job_status(job_id, "failed", error=str(error), count_attempt=True)
+        if row is None:
+            return "dropped"
+        if row.attempts < self._max_attempts:
+            self._spawn(self._retries, self._source.retry(token, min(self._backoff_max, 2 ** row.attempts)))
+            return "retry"
+        return await self._bury(job_id)
+
+    async def _bury(self, job_id: str, error: Optional[str] = None) -> str:
+        """Mark the job dead and dead-letter it"""
+        row = await self._jobs_repo.set_job_status(job_id, "dead", error=error)
+        if row is not None:
+            await self._source.dead_letter(*dlq_entry(row))
+        return "dead"
+
+
+async def main():
+    logging.basicConfig(level=logging.INFO)
+    worker = AsyncSenderWorker()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, lambda: asyncio.ensure_future(worker.stop()))
+    await worker.start()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,205 @@
+"""
+Persian:
+    استخر کلاینت‌های اینستاگرام با ظرفیت محدود و حذف LRU که بر اساس حساب کلیدگذاری می‌شود.
+    JobProcessor، SessionManager و sender_worker به جای ساخت Client و بارگذاری session_blob برای هر قانون
+    و هر job، کلاینت گرم را از این استخر مشترک می‌گیرند. hit/miss/eviction در telemetry_service ثبت می‌شود.
+
+English:
+    Bounded, LRU-evicting pool of Instagram clients keyed by account (client_key).
+    JobProcessor, SessionManager and sender_worker share this pool instead of constructing a Client
+    and deserializing the session blob for every rule and every job. Hits, misses and evictions are
+    reported through telemetry_service.
+"""
+
+import asyncio
+import hashlib
+import inspect
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional
+
+from app.config import CLIENT_POOL_MAX_SIZE
+from app.services.insta_client_factory import InstaClientFactory
+from app.services.telemetry_service import incr, gauge_set
+from app.utils.insta_error_map import map_instagram_exception
+
+logger = logging.getLogger(__name__)
+
+# Error codes after which a client's Instagram session is unusable and must not be handed out again
+AUTH_ERROR_CODES = frozenset({"login_required", "challenge_required", "two_factor_required", "bad_password"})
+
+
+async def maybe_await(value: Any) -> Any:
+    """
+    Persian:
+        متدهای wrapper ممکن است sync یا async باشند؛ نتیجه را در صورت awaitable بودن await می‌کند.
+
+    English:
+        Wrapper methods may be sync or async; await the result only when it is awaitable.
+    """
+    if inspect.isawaitable(value):
+        return await value
+    return value
+
+
+async def call_client(method: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """
+    Persian:
+        متد کلاینت را فراخوانی می‌کند؛ متدهای sync (instagrapi مسدودکننده) در thread اجرا می‌شوند تا event loop آزاد بماند.
+
+    English:
+        Call a client method. Coroutine methods are awaited; sync (blocking instagrapi) methods run
+        in a worker thread, so other accounts keep running and timeouts can still cancel the caller.
+    """
+    if inspect.iscoroutinefunction(method):
+        return await method(*args, **kwargs)
+    return await maybe_await(await asyncio.to_thread(method, *args, **kwargs))
+
+
+def _fingerprint(session_blob: Any) -> Optional[str]:
+    if session_blob is None:
+        return None
+    raw = session_blob if isinstance(session_blob, bytes) else str(session_blob).encode()
+    return hashlib.sha1(raw).hexdigest()
+
+
+def client_key(account_id: Optional[str], session_blob: Any = None) -> str:
+    """
+    Persian:
+        کلید استخر برای یک حساب؛ همهٔ مصرف‌کننده‌ها از همین کلید استفاده می‌کنند تا کلاینت مشترک باشد.
+
+    English:
+        Pool key of an account. Every caller keys by account so they share one client; the blob
+        fingerprint is used only when the account is unknown.
+    """
+    if account_id:
+        return f"account:{account_id}"
+    return f"blob:{_fingerprint(session_blob)}"
+
+
+class _PoolEntry:
+    __slots__ = ("client", "blob_fingerprint")
+
+    def __init__(self, client: Any, blob_fingerprint: Optional[str]):
+        self.client = client
+        self.blob_fingerprint = blob_fingerprint
+
+
+class ClientPool:
+    """
+    Persian:
+        استخر LRU کلاینت‌ها. اگر session_blob یک کلید تغییر کند، session روی همان کلاینت دوباره بارگذاری می‌شود.
+
+    English:
+        LRU pool of clients. When the session blob of a key changes, the session is reloaded
+        on the pooled client instead of building a new one.
+
+    All bookkeeping is synchronous between awaits, so the pool is safe to share between
+    coroutines on one event loop without a lock.
+    """
+
+    def __init__(self, factory: Callable[[], Any] = InstaClientFactory.create_new, max_size: int = CLIENT_POOL_MAX_SIZE):
+        self._factory = factory
+        self._max_size = max(1, int(max_size))
+        self._entries: "OrderedDict[str, _PoolEntry]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    @property
+    def max_size(self) -> int:
+        return self._max_size
+
+    async def acquire(
+        self,
+        key: str,
+        session_blob: Any = None,
+        setup: Optional[Callable[[Any], Awaitable[None]]] = None,
+    ) -> Any:
+        """
+        Persian:
+            کلاینت مربوط به key را برمی‌گرداند؛ در صورت miss کلاینت جدید ساخته، session_blob را بارگذاری
+            و setup (مثلاً اعمال پروکسی) را اجرا می‌کند.
+
+        English:
+            Return the pooled client for key. On a miss a new client is built, session_blob is
+            loaded and the optional setup coroutine (e.g. restore session / apply proxy) runs once.
+        """
+        fp = _fingerprint(session_blob)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            incr("client_pool_hits")
+            if fp is not None and fp != entry.blob_fingerprint:
+                await call_client(entry.client.load_session_bytes, session_blob)
+                entry.blob_fingerprint = fp
+            return entry.client
+
+        incr("client_pool_misses")
+        client = self._factory()
+        if session_blob is not None:
+            await call_client(client.load_session_bytes, session_blob)
+        if setup is not None:
+            await setup(client)
+
+        # another coroutine may have filled the slot while we were awaiting setup
+        existing = self._entries.get(key)
+        if existing is not None:
+            self._entries.move_to_end(key)
+            return existing.client
+
+        self._insert(key, _PoolEntry(client, fp))
+        return client
+
+    def put(self, key: str, client: Any, session_blob: Any = None) -> None:
+        """Register an already configured client under key (replaces any existing entry)."""
+        self._entries.pop(key, None)
+        self._insert(key, _PoolEntry(client, _fingerprint(session_blob)))
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the pooled client for key without creating one."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        return entry.client
+
+    def invalidate(self, key: str) -> None:
+        """Drop a client, e.g. after logout, session deletion or a login_required error."""
+        if self._entries.pop(key, None) is not None:
+            gauge_set("active_clients", len(self._entries))
+
+    def invalidate_on_auth_error(self, key: str, exc: BaseException) -> bool:
+        """Drop the client under key if exc means its session is no longer logged in."""
+        if map_instagram_exception(exc).get("code") not in AUTH_ERROR_CODES:
+            return False
+        self.invalidate(key)
+        incr("client_pool_auth_invalidations")
+        logger.warning("Dropped pooled client %s after auth error: %s", key, exc)
+        return True
+
+    def clear(self) -> None:
+        self._entries.clear()
+        gauge_set("active_clients", 0)
+
+    def _insert(self, key: str, entry: _PoolEntry) -> None:
+        self._entries[key] = entry
+        while len(self._entries) > self._max_size:
+            evicted_key, _ = self._entries.popitem(last=False)
+            incr("client_pool_evictions")
+            logger.debug("Evicted client %s from pool", evicted_key)
+        gauge_set("active_clients", len(self._entries))
+
+
+# Process-wide pool shared by the job processor, session manager and sender worker
+_client_pool: Optional[ClientPool] = None
+
+
+def get_client_pool() -> ClientPool:
+    global _client_pool
+    if _client_pool is None:
+        _client_pool = ClientPool()
+    return _client_pool
@@ -22,6 +22,7 @@ import base64
 from cryptography.fernet import Fernet
 
 from app.config import FERNET_KEY, INSTAGRAPI_TIMEOUT, REDIS_URL, CURSOR_SECRET
+from app.services.comment_cursor_store import is_newer
 
 # Ensure FERNET_KEY provided in config (app.config enforces this)
 fernet = Fernet(FERNET_KEY.encode() if isinstance(FERNET_KEY, str) else FERNET_KEY)
@@ -55,6 +56,16 @@ class BaseInstaClientWrapper:
         """
         raise NotImplementedError
 
+    def get_new_comments(self, media_id: str, since_id: Optional[str] = None) -> List[dict]:
+        """
+        Return recent comments of a media newer than since_id (the caller's high-water mark),
+        as dicts with at least id, user_id, username and text.
+        """
+        raise NotImplementedError
+
+    def reply_to_comment(self, media_id: str, comment_id: str, text: str) -> Any:
+        raise NotImplementedError
+
     def dump_session_bytes(self) -> bytes:
         raise NotImplementedError
 
@@ -143,6 +154,24 @@ class InstaClientRealWrapper(BaseInstaClientWrapper):
         except Exception:
             return [], None
 
+    def get_new_comments(self, media_id: str, since_id: Optional[str] = None, amount: int = 50):
+        items = []
+        for c in self.client.media_comments(media_id, amount):
+            if not is_newer(str(c.pk), since_id):
+                continue
+            user = getattr(c, "user", None)
+            items.append({
+                "id": str(c.pk),
+                "user_id": str(getattr(user, "pk", "")),
+                "username": getattr(user, "username", ""),
+                "text": c.text or "",
+                "created_at": getattr(c, "created_at_utc", None),
+            })
+        return items
+
+    def reply_to_comment(self, media_id: str, comment_id: str, text: str):
+        return self.client.media_comment(media_id, text, replied_to_comment_id=int(comment_id))
+
     def dump_session_bytes(self) -> bytes:
         if hasattr(self.client, "dump_session_to_bytes"):
             return self.client.dump_session_to_bytes()
@@ -216,6 +245,17 @@ class MockInstaClientWrapper(BaseInstaClientWrapper):
         next_cursor = str(offset + limit) if (offset + limit) < len(self._store_default) else None
         return items, next_cursor
 
+    def get_new_comments(self, media_id: str, since_id: Optional[str] = None):
+        # deterministic comments per media so callers can be exercised without instagrapi
+        comments = [
+            {"id": str(i), "user_id": f"u_{i}", "username": f"user_{i}", "text": f"comment {i} on {media_id}"}
+            for i in range(1, 6)
+        ]
+        return [c for c in comments if is_newer(c["id"], since_id)]
+
+    def reply_to_comment(self, media_id: str, comment_id: str, text: str):
+        return {"ok": True, "media_id": media_id, "replied_to": comment_id, "text": text}
+
     def dump_session_bytes(self) -> bytes:
         return b"mock-session-bytes"
 
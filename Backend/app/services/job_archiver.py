@@ -0,0 +1,66 @@
+"""
+Persian:
+    بایگانی دوره‌ای jobهای تمام‌شده: jobهای کامل/ناموفق پس از مدت مشخص به جدول job_archive منتقل
+    و پس از دورهٔ نگهداری حذف می‌شوند تا جدول اصلی فقط کارهای زنده را نگه دارد.
+    هر دور شمارنده‌های تقریبی jobها نیز از روی جدول بازسازی می‌شوند.
+
+English:
+    Periodic archiving of finished jobs: completed/failed jobs move to job_archive after a set age
+    and are deleted after the retention period, so the hot jobs table only holds live work.
+    Each pass also rebuilds the approximate job counters from the table.
+"""
+
+import asyncio
+import logging
+from datetime import timedelta
+
+from app.config import (
+    JOB_ARCHIVE_AFTER_HOURS,
+    JOB_ARCHIVE_BATCH,
+    JOB_ARCHIVE_INTERVAL,
+    JOB_ARCHIVE_RETENTION_DAYS,
+)
+from app.database.jobs_repository import JobsRepository
+
+logger = logging.getLogger(__name__)
+
+
+class JobArchiver:
+    def __init__(
+        self,
+        jobs_repo: JobsRepository,
+        archive_after: timedelta = timedelta(hours=JOB_ARCHIVE_AFTER_HOURS),
+        retention: timedelta = timedelta(days=JOB_ARCHIVE_RETENTION_DAYS),
+        interval: float = JOB_ARCHIVE_INTERVAL,
+        batch_size: int = JOB_ARCHIVE_BATCH
+    ):
+        self._jobs_repo = jobs_repo
+        self._archive_after = archive_after
+        self._retention = retention
+        self._interval = interval
+        self._batch_size = batch_size
+        self._running = False
+
+    async def start(self):
+        """Run archive passes until stopped"""
+        self._running = True
+        while self._running:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.exception("Error in job archiver: %s", e)
+            await asyncio.sleep(self._interval)
+
+    async def stop(self):
+        self._running = False
+
+    async def run_once(self):
+        moved = await self._jobs_repo.archive_finished_jobs(self._archive_after, self._batch_size)
+        purged = 0
+        if self._retention.total_seconds() > 0:
+            purged = await self._jobs_repo.purge_archive(self._retention)
+        # periodic exact recount keeps the listing's estimated totals from drifting
+        await self._jobs_repo.refresh_counters()
+        if moved or purged:
+            logger.info(f"Archived {moved} finished jobs, purged {purged} from the archive")
+        return moved, purged
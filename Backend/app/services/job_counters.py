@@ -0,0 +1,122 @@
+"""
+Persian:
+    شمارنده‌های تقریبی job به تفکیک وضعیت و نوع، در hashهای Redis.
+    JobsRepository در هر تغییر وضعیت آن‌ها را با HINCRBY به‌روز می‌کند و بایگانی دوره‌ای آن‌ها را
+    از روی جدول دوباره می‌سازد، پس فهرست jobها بدون COUNT(*) تعداد تقریبی کل را دارد.
+
+English:
+    Approximate job counts per status and per type, kept in Redis hashes.
+    JobsRepository bumps them with HINCRBY on every state transition and the periodic archiver
+    rebuilds them from the table (correcting drift), so the jobs listing gets an estimated total
+    without COUNT(*). Counts are best-effort: a failed update is logged, never raised.
+    Synchronous writers (the sender queue and its RQ worker) use apply_sync on a sync client.
+"""
+
+import logging
+from collections import Counter
+from typing import Dict, Iterable, Optional, Tuple
+
+import redis
+import redis.asyncio as aioredis
+
+from app.config import REDIS_URL
+
+logger = logging.getLogger(__name__)
+
+# (account_id, job_type, status) -> delta
+CounterKey = Tuple[Optional[str], str, str]
+
+
+class JobCounters:
+    def __init__(self, redis_url: str = REDIS_URL):
+        self.redis = aioredis.Redis.from_url(redis_url, encoding="utf-8", decode_responses=True)
+        self._redis_url = redis_url
+        self._sync_redis: Optional[redis.Redis] = None
+        # fields: "s:{status}" and "t:{job_type}:{status}"; one hash overall and one per account
+        self.COUNTS_KEY = "job_counts"
+        self.ACCOUNT_COUNTS_KEY = "job_counts:{account_id}"
+
+    @staticmethod
+    def _fields(job_type: str, status: str) -> Tuple[str, str]:
+        status = getattr(status, "value", status)  # JobStatus members format as "JobStatus.X"
+        return f"s:{status}", f"t:{job_type}:{status}"
+
+    def _keys(self, account_id: Optional[str]) -> Tuple[str, ...]:
+        if account_id:
+            return self.COUNTS_KEY, self.ACCOUNT_COUNTS_KEY.format(account_id=account_id)
+        return (self.COUNTS_KEY,)
+
+    def _queue_deltas(self, pipe, deltas: Dict[CounterKey, int]) -> None:
+        for (account_id, job_type, status), delta in deltas.items():
+            if not delta:
+                continue
+            for key in self._keys(account_id):
+                for field in self._fields(job_type, status):
+                    pipe.hincrby(key, field, delta)
+
+    async def apply(self, deltas: Dict[CounterKey, int]) -> None:
+        """Apply per-(account, type, status) deltas in one pipelined round-trip"""
+        if not any(deltas.values()):
+            return
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            self._queue_deltas(pipe, deltas)
+            await pipe.execute()
+        except Exception as e:
+            logger.warning("Could not update job counters: %s", e)
+
+    def apply_sync(self, deltas: Dict[CounterKey, int]) -> None:
+        """apply() for synchronous callers"""
+        if not any(deltas.values()):
+            return
+        try:
+            if self._sync_redis is None:
+                self._sync_redis = redis.Redis.from_url(self._redis_url, encoding="utf-8", decode_responses=True)
+            pipe = self._sync_redis.pipeline(transaction=False)
+            self._queue_deltas(pipe, deltas)
+            pipe.execute()
+        except Exception as e:
+            logger.warning("Could not update job counters: %s", e)
+
+    async def transition(self, account_id: Optional[str], job_type: str, old: Optional[str], new: Optional[str], n: int = 1) -> None:
+        """Move n jobs from status old to status new (None means created or removed)"""
+        deltas: Counter = Counter()
+        if old:
+            deltas[(account_id, job_type, old)] -= n
+        if new:
+            deltas[(account_id, job_type, new)] += n
+        await self.apply(deltas)
+
+    async def replace(self, counts: Iterable[Tuple[Optional[str], str, str, int]]) -> None:
+        """Rebuild every counter from exact (account_id, job_type, status, count) rows"""
+        totals: Dict[str, Counter] = {}
+        for account_id, job_type, status, n in counts:
+            for key in self._keys(account_id):
+                for field in self._fields(job_type, status):
+                    totals.setdefault(key, Counter())[field] += n
+        stale = [key async for key in self.redis.scan_iter(match=self.ACCOUNT_COUNTS_KEY.format(account_id="*"), count=1000)]
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.delete(self.COUNTS_KEY, *stale)
+        for key, fields in totals.items():
+            pipe.hset(key, mapping=dict(fields))
+        await pipe.execute()
+
+    async def estimate(self, status: Optional[str] = None, job_type: Optional[str] = None,
+                       account_id: Optional[str] = None) -> Optional[int]:
+        """Approximate number of jobs matching the filters, or None if the counters are unavailable"""
+        key = self.ACCOUNT_COUNTS_KEY.format(account_id=account_id) if account_id else self.COUNTS_KEY
+        try:
+            fields = await self.redis.hgetall(key)
+        except Exception as e:
+            logger.warning("Could not read job counters: %s", e)
+            return None
+        status = getattr(status, "value", status)
+        prefix = f"t:{job_type}:" if job_type else "s:"
+        total = 0
+        for field, value in fields.items():
+            if not field.startswith(prefix):
+                continue
+            if status and field[len(prefix):] != status:
+                continue
+            total += max(0, int(value))
+        return total
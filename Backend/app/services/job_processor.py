@@ -1,4 +1,4 @@
-"""
+﻿"""
 Persian:
     ???????? ????? ???? ????? ?????? ??????.
     ????:
@@ -17,14 +17,25 @@ English:
 """
 
 import asyncio
+import heapq
 from datetime import datetime, timedelta
 import logging
+import os
+import random
+import socket
+import time
+import uuid
 from typing import List, Dict, Any, Optional
 from app.services.insta_client_factory import InstaClientFactory
+from app.services.client_pool import ClientPool, call_client, client_key, get_client_pool
 from app.services.reply_history import ReplyHistoryService
+from app.services.comment_cursor_store import CommentCursorStore, is_newer
 from app.schemas.job_schema import JobItem, JobStatus
 from app.schemas.rule_schema import RuleOut
 from app.services.rate_limiter import RateLimiter
+from app.services.rule_matcher import RuleMatcher
+from app.services.telemetry_service import incr, observe
+from app.config import JOB_ACCOUNT_CONCURRENCY, JOB_ACCOUNT_TIMEOUT, JOB_LEASE_SECONDS, JOB_CLAIM_BATCH
 from app.database.jobs_repository import JobsRepository
 from app.database.rules_repository import RulesRepository
 
@@ -37,15 +48,33 @@ class JobProcessor:
         jobs_repo: JobsRepository,
         rules_repo: RulesRepository,
         rate_limiter: RateLimiter,
-        reply_history: ReplyHistoryService
+        reply_history: ReplyHistoryService,
+        client_pool: Optional[ClientPool] = None,
+        account_concurrency: int = JOB_ACCOUNT_CONCURRENCY,
+        account_timeout: float = JOB_ACCOUNT_TIMEOUT,
+        comment_cursors: Optional[CommentCursorStore] = None,
+        worker_id: Optional[str] = None,
+        lease_seconds: float = JOB_LEASE_SECONDS,
+        claim_batch: int = JOB_CLAIM_BATCH
     ):
         self._client_factory = client_factory
+        self._client_pool = client_pool if client_pool is not None else get_client_pool()
         self._jobs_repo = jobs_repo
         self._rules_repo = rules_repo
         self._rate_limiter = rate_limiter
         self._reply_history = reply_history
         self._running = False
         self._check_interval = 60  # seconds
+        # how far ahead the ready queue waits for rate-limited jobs within one cycle
+        self._dispatch_horizon = self._check_interval
+        self._account_concurrency = max(1, account_concurrency)
+        self._account_timeout = account_timeout
+        self._comment_cursors = comment_cursors
+        self._worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._lease_seconds = lease_seconds
+        self._claim_batch = claim_batch
+        # (account_id, media_id) -> (rule set signature, matcher); rebuilt only when the rules change
+        self._matchers: Dict[tuple, tuple] = {}
 
     async def start(self):
         """Start the job processor"""
@@ -63,73 +92,154 @@ class JobProcessor:
 
     async def _process_cycle(self):
         """Run one processing cycle"""
+        cycle_start = time.perf_counter()
         # 1. Get active rules
         rules = await self._rules_repo.get_active_rules()
         if rules is None:
             logger.error("Rules repository returned None for active rules, skipping cycle")
-            await asyncio.sleep(self._check_interval)
-            # continue
+            return
+
+        # Accounts run concurrently (bounded); medias of one account stay serialized
+        # so Instagram-side pacing per account is unchanged.
+        plan = self._plan_cycle(rules)
+        live = {(account_id, media_id) for account_id, medias in plan.items() for media_id in medias}
+        for key in [key for key in self._matchers if key not in live]:
+            del self._matchers[key]
+        semaphore = asyncio.Semaphore(self._account_concurrency)
+        await asyncio.gather(*(
+            self._process_account(account_id, media_plan, semaphore)
+            for account_id, media_plan in plan.items()
+        ))
+
+        # 6. Process pending jobs
+        await self._process_pending_jobs()
+        observe("job_cycle_duration", time.perf_counter() - cycle_start)
 
+    @staticmethod
+    def _plan_cycle(rules: List[RuleOut]) -> Dict[Optional[str], Dict[Optional[str], List[RuleOut]]]:
+        """
+        Build an account -> media_id -> [rules] index, preserving rule order,
+        so each media's comments are fetched once per cycle for all rules attached to it.
+        """
+        plan: Dict[Optional[str], Dict[Optional[str], List[RuleOut]]] = {}
         for rule in rules:
+            plan.setdefault(rule.account_id, {}).setdefault(rule.media_id, []).append(rule)
+        saved = sum(len(media_rules) - 1 for medias in plan.values() for media_rules in medias.values())
+        if saved:
+            incr("comment_fetches_saved", saved)
+        return plan
+
+    async def _process_account(self, account_id: Optional[str], media_plan: Dict[Optional[str], List[RuleOut]], semaphore: asyncio.Semaphore):
+        """Process all medias of one account under the concurrency limit and per-account timeout"""
+        async with semaphore:
+            started = time.perf_counter()
             try:
-                client = self._client_factory.create_new()
-                await client.load_session_bytes(rule.session_blob)
-
-                # 2. Get new comments
-                comments = await client.get_new_comments(rule.media_id)
-                
-                for comment in comments:
-                    # 3. Check if we've already replied
-                    if await self._reply_history.has_replied(
-                        rule.account_id, 
-                        rule.media_id,
-                        comment["id"]
-                    ):
-                        continue
-
-                    # 4. Apply rule conditions
-                    if self._evaluate_rule_condition(rule, comment):
-                        # 5. Create jobs for matches
-                        reply_text = rule.get_random_reply()
-                        await self._create_reply_job(rule, comment, reply_text)
-                        
-                        # Record that we're going to reply
-                        await self._reply_history.record_reply(
-                            rule.account_id,
-                            rule.media_id,
-                            comment["id"],
-                            rule.id,
-                            reply_text
-                        )
-
-                        # Create DM job if enabled
-                        if rule.send_dm:
-                            await self._create_dm_job(rule, comment)
+                await asyncio.wait_for(self._process_account_medias(media_plan), timeout=self._account_timeout)
+            except asyncio.TimeoutError:
+                incr("job_account_timeouts")
+                logger.warning("Account %s exceeded %ss in processing cycle, deferring to next cycle", account_id, self._account_timeout)
+            except Exception as e:
+                logger.error(f"Error processing account {account_id}: {e}", exc_info=True)
+            finally:
+                observe("job_account_latency", time.perf_counter() - started)
 
+    async def _process_account_medias(self, media_plan: Dict[Optional[str], List[RuleOut]]):
+        """Process the medias of a single account one at a time"""
+        for media_id, rules in media_plan.items():
+            try:
+                await self._process_media(media_id, rules)
             except Exception as e:
-                logger.error(f"Error processing rule {rule.id}: {e}", exc_info=True)
+                self._client_pool.invalidate_on_auth_error(client_key(rules[0].account_id, getattr(rules[0], "session_blob", None)), e)
+                logger.error(f"Error processing media {media_id} (rules {[r.id for r in rules]}): {e}", exc_info=True)
 
-        # 6. Process pending jobs
-        await self._process_pending_jobs()
+    async def _process_media(self, media_id: Optional[str], rules: List[RuleOut]):
+        """Fetch a media's new comments once and evaluate every attached rule against the batch"""
+        first = rules[0]
+        client = await self._get_client(first.account_id, getattr(first, "session_blob", None))
 
-    def _evaluate_rule_condition(self, rule: RuleOut, comment: Dict[str, Any]) -> bool:
-        """Evaluate if a comment matches rule conditions"""
-        try:
-            # Basic implementation - extend based on your condition format
-            if "text" not in rule.condition:
-                return False
-            
-            condition_text = rule.condition["text"].lower()
-            comment_text = comment.get("text", "").lower()
-            
-            return condition_text in comment_text
-        except Exception as e:
-            logger.error(f"Error evaluating rule {rule.id}: {e}")
-            return False
+        # 2. Get only the comments newer than this media's high-water mark
+        mark = None
+        if self._comment_cursors is not None:
+            mark = await self._comment_cursors.get(first.account_id, media_id)
+        comments = await call_client(client.get_new_comments, media_id, since_id=mark)
+        comments = [c for c in comments if is_newer(c["id"], mark)]
+        if not comments:
+            return
+
+        # 3. Drop comments we've already replied to (one round-trip for the batch)
+        unreplied = set(await self._reply_history.filter_unreplied(
+            first.account_id,
+            media_id,
+            [c["id"] for c in comments]
+        ))
+
+        replies = []
+        jobs: List[JobItem] = []
+        matcher = self._rule_matcher(first.account_id, media_id, rules)
+        for comment in comments:
+            if str(comment["id"]) not in unreplied:
+                continue
+
+            # 4. Apply rule conditions; the first matching rule answers the comment.
+            # Only rules whose indexed keywords occur in the text are evaluated.
+            matched = matcher.first_match(comment)
+            if matched is None:
+                continue
+            try:
+                record = self._apply_rule(matched.rule, comment, jobs)
+                if record:
+                    replies.append(record)
+            except Exception as e:
+                logger.error(f"Error processing rule {matched.rule.id}: {e}", exc_info=True)
+
+        # 5. Create the media's jobs in one bulk insert, then record that we're going to reply
+        # (one pipelined round-trip for the batch)
+        if jobs:
+            await self._jobs_repo.create_jobs_bulk(jobs)
+        if replies:
+            await self._reply_history.record_replies(first.account_id, media_id, replies)
+
+        # Jobs for this batch exist now; move the mark past the newest comment we saw
+        if self._comment_cursors is not None:
+            newest = max((str(c["id"]) for c in comments), key=lambda cid: (len(cid), cid))
+            await self._comment_cursors.advance(first.account_id, media_id, newest)
+
+    def _apply_rule(self, rule: RuleOut, comment: Dict[str, Any], jobs: List[JobItem]) -> Optional[Dict[str, Any]]:
+        """
+        Buffer reply (and optional DM) jobs for a matched comment and return its history record,
+        or None when the rule has nothing to send
+        """
+        reply_text = random.choice(rule.replies) if rule.replies else None
+        if reply_text is None and not rule.send_dm:
+            return None
+        if reply_text is not None:
+            jobs.append(self._reply_job(rule, comment, reply_text))
+
+        # DM job if enabled
+        if rule.send_dm:
+            jobs.append(self._dm_job(rule, comment))
+
+        return {"comment_id": comment["id"], "rule_id": rule.id, "reply_text": reply_text}
+
+    def _rule_matcher(self, account_id: Optional[str], media_id: Optional[str], rules: List[RuleOut]) -> RuleMatcher:
+        """The media's term-indexed matcher, recompiled only when its rules changed"""
+        key = (account_id, media_id)
+        signature = tuple((rule.id, rule.updated_at, rule.condition) for rule in rules)
+        cached = self._matchers.get(key)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        matcher = RuleMatcher(RulesRepository.compile_rules(rules))
+        self._matchers[key] = (signature, matcher)
+        return matcher
 
-    async def _create_reply_job(self, rule: RuleOut, comment: Dict[str, Any], reply_text: str):
-        """Create a job for replying to a comment"""
-        job = JobItem(
+    async def _get_client(self, account_id: Optional[str], session_blob: Any) -> Any:
+        """Get a warm client for the account from the shared pool"""
+        return await self._client_pool.acquire(client_key(account_id, session_blob), session_blob=session_blob)
+
+    def _reply_job(self, rule: RuleOut, comment: Dict[str, Any], reply_text: str) -> JobItem:
+        """Build a job for replying to a comment"""
+        return JobItem(
+            id=str(uuid.uuid4()),
             type="reply",
             status=JobStatus.PENDING,
             rule_id=rule.id,
@@ -141,19 +251,20 @@ class JobProcessor:
                 "comment_text": comment.get("text", ""),
             },
             account_id=rule.account_id,
-            session_blob=rule.session_blob
+            session_blob=getattr(rule, "session_blob", None),
+            idempotency_key=f"reply:{rule.account_id}:{comment['id']}"
         )
-        await self._jobs_repo.create_job(job)
 
-    async def _create_dm_job(self, rule: RuleOut, comment: Dict[str, Any]):
-        """Create a job for sending DM"""
+    def _dm_job(self, rule: RuleOut, comment: Dict[str, Any]) -> JobItem:
+        """Build a job for sending DM"""
         # Format DM template with comment info
         dm_text = rule.dm_template["text"].format(
             username=comment.get("username", ""),
             comment=comment.get("text", "")
         )
 
-        job = JobItem(
+        return JobItem(
+            id=str(uuid.uuid4()),
             type="dm",
             status=JobStatus.PENDING,
             rule_id=rule.id,
@@ -167,42 +278,88 @@ class JobProcessor:
                 "comment_text": comment.get("text", ""),
             },
             account_id=rule.account_id,
-            session_blob=rule.session_blob
+            session_blob=getattr(rule, "session_blob", None),
+            idempotency_key=f"dm:{rule.account_id}:{comment['id']}"
         )
-        await self._jobs_repo.create_job(job)
 
     async def _process_pending_jobs(self):
-        """Process pending jobs with rate limiting"""
-        jobs = await self._jobs_repo.get_pending_jobs()
-        
-        for job in jobs:
-            try:
+        """
+        Process pending jobs with rate limiting.
+        Jobs are claimed with a lease, then sit in a ready queue (heap) ordered by the time the rate
+        limiter makes them eligible, so the earliest eligible job of any account is dispatched next
+        and the loop only waits when nothing is eligible yet. Jobs not eligible within the dispatch
+        horizon are released back to pending for the next cycle, except those that already hold a
+        rate-limit reservation (only their jitter lies past the horizon).
+        """
+        reaped = await self._jobs_repo.reap_expired_leases()
+        if reaped:
+            logger.warning(f"Released {reaped} jobs whose lease expired")
+        # Claimed jobs are leased to this worker, so other processors never run them too
+        jobs = await self._jobs_repo.claim_jobs(self._worker_id, self._claim_batch, self._lease_seconds)
+        now = time.time()
+        horizon = now + self._dispatch_horizon
+        # (eligible_at, seq, reserved, job); seq keeps FIFO order among equal times
+        ready = [(now, seq, False, job) for seq, job in enumerate(jobs)]
+        heapq.heapify(ready)
+        seq = len(ready)
+
+        while ready:
+            eligible_at, _, reserved, job = ready[0]
+            if eligible_at > horizon and not reserved:
+                # not eligible this cycle: hand the rest back for any worker to pick up later. Reserved
+                # jobs stay: their rate-limit slot is already taken and only jitter pushed them out
+                for _, _, held, left in ready:
+                    if not held:
+                        await self._jobs_repo.release_job(left, self._worker_id)
+                ready = [entry for entry in ready if entry[2]]
+                heapq.heapify(ready)
+                continue
+            wait = eligible_at - time.time()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            heapq.heappop(ready)
+
+            if not reserved:
                 # Check rate limits
-                if not await self._rate_limiter.can_execute(job):
+                reserved, eligible_at = await self._rate_limiter.check(job)
+                if not reserved or eligible_at > time.time():
+                    heapq.heappush(ready, (eligible_at, seq, reserved, job))
+                    seq += 1
                     continue
 
-                client = self._client_factory.create_new()
-                await client.load_session_bytes(job.session_blob)
+            await self._execute_job(job)
 
-                if job.type == "reply":
-                    await self._execute_reply_job(client, job)
-                elif job.type == "dm":
-                    await self._execute_dm_job(client, job)
+    async def _execute_job(self, job: JobItem):
+        # the job may have waited in the ready queue past its lease; never send one another worker now holds
+        if not await self._jobs_repo.renew_lease(job.id, self._worker_id, self._lease_seconds):
+            logger.warning(f"Job {job.id} is no longer leased to this worker; skipping it")
+            return
+        try:
+            client = await self._get_client(job.account_id, job.session_blob)
 
-                # Mark as completed
-                job.status = JobStatus.COMPLETED
-                job.completed_at = datetime.utcnow()
-                await self._jobs_repo.update_job(job)
+            if job.type == "reply":
+                await self._execute_reply_job(client, job)
+            elif job.type == "dm":
+                await self._execute_dm_job(client, job)
 
-            except Exception as e:
-                logger.error(f"Error processing job {job.id}: {e}")
-                job.status = JobStatus.FAILED
-                job.error = str(e)
-                await self._jobs_repo.update_job(job)
+            # Mark as completed
+            job.status = JobStatus.COMPLETED
+            job.completed_at = datetime.utcnow()
+            owned = await self._jobs_repo.update_job(job, self._worker_id)
+
+        except Exception as e:
+            logger.error(f"Error processing job {job.id}: {e}")
+            self._client_pool.invalidate_on_auth_error(client_key(job.account_id, job.session_blob), e)
+            job.status = JobStatus.FAILED
+            job.error = str(e)
+            owned = await self._jobs_repo.update_job(job, self._worker_id)
+        if not owned:
+            logger.warning(f"Lost the lease on job {job.id} before recording its result")
 
     async def _execute_reply_job(self, client: Any, job: JobItem):
         """Execute a reply job"""
-        await client.reply_to_comment(
+        await call_client(
+            client.reply_to_comment,
             media_id=job.media_id,
             comment_id=job.comment_id,
             text=job.payload["reply_text"]
@@ -211,7 +368,8 @@ class JobProcessor:
     async def _execute_dm_job(self, client: Any, job: JobItem):
         """Execute a DM job"""
         message = job.payload["message"]
-        await client.send_direct_message(
+        await call_client(
+            client.send_direct_message,
             user_id=job.target_user_id,
             message=message["text"],
             media_url=message.get("media_url")
@@ -12,124 +12,276 @@ English:
     - Hourly and daily limits
     - Delay between operations
     - Limits per operation type
+    Limits are kept per (account, operation) in a backend: RedisRateLimitBackend (default) makes
+    each check one atomic Lua call on a sliding-window log, so the limits hold across uvicorn
+    workers, RQ workers and nodes; MemoryRateLimitBackend is a single-process fallback.
 """
 
-from datetime import datetime, timedelta
-from typing import Dict, List,Any
-import asyncio
+from collections import deque
+from typing import Dict, Deque, Any, Optional, Tuple
 import logging
+import random
+import time
+import uuid
+
+import redis.asyncio as redis
+
+from app.config import REDIS_URL, RATE_LIMIT_BACKEND
 from app.schemas.job_schema import JobItem
 from app.database.settings_repository import SettingsRepository
 
 logger = logging.getLogger(__name__)
 
+# Per (account, operation): a token bucket (burst size, one token per refill interval) in a hash,
+# plus a sliding-window log (sorted set of operation times, ms) for the hourly and daily caps.
+# Checks and reserves the slot in one atomic call; ARGV[6] == '1' records without checking.
+# An hourly or daily cap of 0 blocks the operation.
+# Time comes from the Redis server so every process shares one clock.
+# Returns {allowed, retry_after_ms}.
+_ACQUIRE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local interval = tonumber(ARGV[1])
+local hourly_limit = tonumber(ARGV[2])
+local daily_limit = tonumber(ARGV[3])
+local burst = tonumber(ARGV[5])
+local force = ARGV[6] == '1'
+
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', '(' .. (now - 86400000))
+
+local tokens = burst
+if interval > 0 then
+  local bucket = redis.call('HMGET', KEYS[2], 'tokens', 'ts')
+  if bucket[1] then
+    tokens = math.min(burst, tonumber(bucket[1]) + (now - tonumber(bucket[2])) / interval)
+  end
+end
+
+if not force then
+  -- a cap of 0 pauses the operation: retry once a full window has passed
+  if daily_limit <= 0 then
+    return {0, 86400000}
+  end
+  if hourly_limit <= 0 then
+    return {0, 3600000}
+  end
+
+  if tokens < 1 then
+    return {0, math.ceil((1 - tokens) * interval)}
+  end
+
+  local hour_start = now - 3600000
+  if redis.call('ZCOUNT', KEYS[1], hour_start, '+inf') >= hourly_limit then
+    local oldest = redis.call('ZRANGEBYSCORE', KEYS[1], hour_start, '+inf', 'WITHSCORES', 'LIMIT', 0, 1)
+    return {0, tonumber(oldest[2]) + 3600000 - now + 1}
+  end
+
+  if redis.call('ZCARD', KEYS[1]) >= daily_limit then
+    local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+    return {0, tonumber(oldest[2]) + 86400000 - now + 1}
+  end
+end
+
+redis.call('ZADD', KEYS[1], now, now .. ':' .. ARGV[4])
+redis.call('PEXPIRE', KEYS[1], 86400000)
+if interval > 0 then
+  redis.call('HSET', KEYS[2], 'tokens', tokens - 1, 'ts', now)
+  -- once the bucket would be full again the hash is no longer needed
+  redis.call('PEXPIRE', KEYS[2], math.ceil(interval * (burst + 1 - tokens)) + 1000)
+end
+return {1, 0}
+"""
+
+
+class RedisRateLimitBackend:
+    """Token buckets and sliding-window caps shared by every process through Redis"""
+
+    def __init__(self, redis_url: str = REDIS_URL):
+        self.redis = redis.Redis.from_url(redis_url, encoding="utf-8", decode_responses=True)
+        self.RATE_LIMIT_KEY = "rate_limit:{account_id}:{operation_type}"
+        self._acquire = self.redis.register_script(_ACQUIRE_SCRIPT)
+
+    async def acquire(self, account_id: str, operation_type: str, min_delay: float,
+                      hourly_limit: int, daily_limit: int, burst: int = 1) -> Tuple[bool, float]:
+        """
+        Reserve a slot if all limits allow it; returns (allowed, retry_after_seconds).
+        min_delay is the bucket refill interval; with burst=1 it is the minimum gap between operations.
+        """
+        return await self._run(account_id, operation_type, min_delay, hourly_limit, daily_limit, burst, False)
+
+    async def record(self, account_id: str, operation_type: str, min_delay: float = 0, burst: int = 1):
+        """Count an operation that did not go through acquire()"""
+        await self._run(account_id, operation_type, min_delay, 0, 0, burst, True)
+
+    async def _run(self, account_id, operation_type, min_delay, hourly_limit, daily_limit, burst, force):
+        key = self.RATE_LIMIT_KEY.format(account_id=account_id, operation_type=operation_type)
+        allowed, retry_ms = await self._acquire(
+            keys=[key, f"{key}:bucket"],
+            args=[int(min_delay * 1000), hourly_limit, daily_limit, uuid.uuid4().hex, max(1, burst), "1" if force else "0"]
+        )
+        return bool(allowed), int(retry_ms) / 1000
+
+
+class MemoryRateLimitBackend:
+    """
+    In-process limits; only correct when a single process sends for an account.
+    Each (account, operation) has a token bucket (tokens, last refill) and two deques of monotonic
+    timestamps, one per window, so the hourly and daily windows expire independently and every
+    check is amortized O(1).
+    """
+
+    HOUR = 60 * 60
+    DAY = 24 * HOUR
+
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self._hourly: Dict[Tuple[str, str], Deque[float]] = {}
+        self._daily: Dict[Tuple[str, str], Deque[float]] = {}
+        self._buckets: Dict[Tuple[str, str], Tuple[float, float]] = {}
+
+    async def acquire(self, account_id: str, operation_type: str, min_delay: float,
+                      hourly_limit: int, daily_limit: int, burst: int = 1) -> Tuple[bool, float]:
+        return self.acquire_now(account_id, operation_type, min_delay, hourly_limit, daily_limit, burst)
+
+    def acquire_now(self, account_id: str, operation_type: str, min_delay: float,
+                    hourly_limit: int, daily_limit: int, burst: int = 1) -> Tuple[bool, float]:
+        """Synchronous core of acquire(); nothing here awaits"""
+        # a cap of 0 pauses the operation: retry once a full window has passed
+        if daily_limit <= 0:
+            return False, float(self.DAY)
+        if hourly_limit <= 0:
+            return False, float(self.HOUR)
+
+        key = (account_id, operation_type)
+        now = self._clock()
+        tokens = self._tokens(key, now, min_delay, burst)
+        if tokens < 1:
+            return False, (1 - tokens) * min_delay
+
+        hourly = self._window(self._hourly, key, now - self.HOUR)
+        daily = self._window(self._daily, key, now - self.DAY)
+        if len(hourly) >= hourly_limit:
+            return False, hourly[0] + self.HOUR - now
+        if len(daily) >= daily_limit:
+            return False, daily[0] + self.DAY - now
+
+        hourly.append(now)
+        daily.append(now)
+        self._buckets[key] = (tokens - 1, now)
+        return True, 0.0
+
+    async def record(self, account_id: str, operation_type: str, min_delay: float = 0, burst: int = 1):
+        key = (account_id, operation_type)
+        now = self._clock()
+        self._buckets[key] = (self._tokens(key, now, min_delay, burst) - 1, now)
+        self._window(self._hourly, key, now - self.HOUR).append(now)
+        self._window(self._daily, key, now - self.DAY).append(now)
+
+    def _tokens(self, key: Tuple[str, str], now: float, interval: float, burst: int) -> float:
+        """Tokens available now: the stored count refilled by one per interval, up to burst"""
+        burst = max(1, burst)
+        bucket = self._buckets.get(key)
+        if bucket is None or interval <= 0:
+            return burst
+        tokens, last = bucket
+        return min(burst, tokens + (now - last) / interval)
+
+    @staticmethod
+    def _window(windows: Dict[Tuple[str, str], Deque[float]], key: Tuple[str, str], cutoff: float) -> Deque[float]:
+        """Return the key's deque with entries older than cutoff dropped from the left"""
+        window = windows.get(key)
+        if window is None:
+            window = windows[key] = deque()
+        while window and window[0] < cutoff:
+            window.popleft()
+        return window
+
+
+def _default_backend():
+    if RATE_LIMIT_BACKEND == "memory":
+        return MemoryRateLimitBackend()
+    return RedisRateLimitBackend()
+
+
 class RateLimiter:
-    def __init__(self, settings_repo: SettingsRepository):
+    ERROR_RETRY_SECONDS = 30
+
+    def __init__(self, settings_repo: SettingsRepository, backend=None):
         self._settings_repo = settings_repo
-        self._operation_counts: Dict[str, List[datetime]] = {}
-        self._last_operation_time: Dict[str, datetime] = {}
+        self._backend = backend if backend is not None else _default_backend()
 
     async def can_execute(self, job: JobItem) -> bool:
-        """Check if a job can be executed based on rate limits"""
+        """
+        Check if a job can be executed based on rate limits.
+        An allowed check reserves the slot, so the caller must not record the operation again.
+        Jitter is not applied here; schedulers should use check() and honour eligible_at.
+        """
+        reserved, _ = await self.check(job)
+        return reserved
+
+    async def check(self, job: JobItem) -> Tuple[bool, float]:
+        """
+        Return (reserved, eligible_at) without sleeping. eligible_at is an epoch timestamp.
+        reserved=True: the slot is taken; run the job at eligible_at (now plus any jitter).
+        reserved=False: a limit is hit; check again at eligible_at.
+        """
+        now = time.time()
         try:
             settings = await self._settings_repo.get_account_settings(job.account_id)
-            
-            operation_type = job.type
-            current_time = datetime.utcnow()
-
-            # 1. Check minimum delay between operations
-            if not await self._check_operation_delay(operation_type, current_time, settings):
-                return False
 
-            # 2. Check hourly limit
-            if not await self._check_hourly_limit(operation_type, current_time, settings):
-                return False
+            # 1-3. Token bucket (burst + refill), hourly and daily cap for this account and operation
+            allowed, retry_after = await self._backend.acquire(
+                job.account_id or "",
+                job.type,
+                self._operation_delay(job.type, settings),
+                settings.hourly_limit,
+                settings.daily_limit,
+                self._operation_burst(job.type, settings)
+            )
+            if not allowed:
+                logger.debug(f"Rate limited {job.type} for account {job.account_id}, retry in {retry_after:.1f}s")
+                return False, now + retry_after
 
-            # 3. Check daily limit
-            if not await self._check_daily_limit(operation_type, current_time, settings):
-                return False
-
-            # 4. Add random jitter if enabled
-            if settings.random_jitter:
-                await self._apply_jitter(settings)
-
-            return True
+            # 4. Random jitter for human-like behavior moves the start time instead of blocking
+            return True, now + self._jitter(settings)
 
         except Exception as e:
             logger.error(f"Error in rate limiter for job {job.id}: {e}")
-            return False
-
-    async def _check_operation_delay(
-        self,
-        operation_type: str,
-        current_time: datetime,
-        settings: Any
-    ) -> bool:
-        """Check if enough time has passed since last operation"""
-        last_time = self._last_operation_time.get(operation_type)
-        if last_time is None:
-            return True
-
-        delay = {
+            return False, now + self.ERROR_RETRY_SECONDS
+
+    @staticmethod
+    def _operation_delay(operation_type: str, settings: Any) -> float:
+        """Seconds to refill one token of this operation type (the minimum gap when burst is 1)"""
+        if not getattr(settings, "enable_delay", True):
+            return 0
+        return {
             "reply": settings.reply_delay,
             "dm": settings.dm_delay,
             "like": settings.like_delay
         }.get(operation_type, 30)  # default 30 seconds
 
-        time_passed = (current_time - last_time).total_seconds()
-        return time_passed >= delay
-
-    async def _check_hourly_limit(
-        self,
-        operation_type: str,
-        current_time: datetime,
-        settings: Any
-    ) -> bool:
-        """Check if hourly limit is reached"""
-        if operation_type not in self._operation_counts:
-            self._operation_counts[operation_type] = []
-
-        # Remove operations older than 1 hour
-        self._operation_counts[operation_type] = [
-            t for t in self._operation_counts[operation_type]
-            if (current_time - t) <= timedelta(hours=1)
-        ]
-
-        hourly_count = len(self._operation_counts[operation_type])
-        return hourly_count < settings.hourly_limit
-
-    async def _check_daily_limit(
-        self,
-        operation_type: str,
-        current_time: datetime,
-        settings: Any
-    ) -> bool:
-        """Check if daily limit is reached"""
-        if operation_type not in self._operation_counts:
-            self._operation_counts[operation_type] = []
-
-        # Remove operations older than 24 hours
-        self._operation_counts[operation_type] = [
-            t for t in self._operation_counts[operation_type]
-            if (current_time - t) <= timedelta(days=1)
-        ]
-
-        daily_count = len(self._operation_counts[operation_type])
-        return daily_count < settings.daily_limit
-
-    async def _apply_jitter(self, settings: Any):
-        """Apply random delay for human-like behavior"""
-        if settings.random_jitter:
-            import random
-            jitter = random.uniform(settings.jitter_min, settings.jitter_max)
-            await asyncio.sleep(jitter)
-
-    def record_operation(self, operation_type: str):
-        """Record that an operation was performed"""
-        current_time = datetime.utcnow()
-        
-        if operation_type not in self._operation_counts:
-            self._operation_counts[operation_type] = []
-        
-        self._operation_counts[operation_type].append(current_time)
-        self._last_operation_time[operation_type] = current_time
\ No newline at end of file
+    @staticmethod
+    def _operation_burst(operation_type: str, settings: Any) -> int:
+        """How many operations of this type may run back to back"""
+        return {
+            "reply": getattr(settings, "reply_burst", 1),
+            "dm": getattr(settings, "dm_burst", 1),
+            "like": getattr(settings, "like_burst", 1)
+        }.get(operation_type, 1)
+
+    @staticmethod
+    def _jitter(settings: Any) -> float:
+        """Random delay for human-like behavior (0 when disabled)"""
+        if not settings.random_jitter:
+            return 0.0
+        return random.uniform(settings.jitter_min, settings.jitter_max)
+
+    async def record_operation(self, operation_type: str, account_id: Optional[str] = None):
+        """Record an operation performed outside can_execute (e.g. a manual send)"""
+        settings = await self._settings_repo.get_account_settings(account_id)
+        await self._backend.record(
+            account_id or "",
+            operation_type,
+            self._operation_delay(operation_type, settings),
+            self._operation_burst(operation_type, settings)
+        )
@@ -0,0 +1,278 @@
+"""
+Persian:
+    فیلتر Bloom اختیاری به ازای هر حساب جلوی تاریخچهٔ پاسخ‌ها (ReplyHistoryService).
+    فیلتر داخل پردازه نگهداری و در پس‌زمینه بارگذاری می‌شود؛ بیت‌های هر پاسخ جدید در همان pipeline ثبت پاسخ
+    (BITFIELD SET) در bitmap ردیس نوشته می‌شوند و فیلتر به صورت دوره‌ای با BITOP OR با آن ادغام می‌شود.
+    پاسخ «قطعاً پاسخ داده نشده» بدون تماس با Redis داده می‌شود و فقط مثبت‌ها به مجموعهٔ دقیق مراجعه می‌کنند.
+
+English:
+    Optional per-account Bloom filter in front of reply history (ReplyHistoryService).
+    The filter lives in-process and is loaded (or seeded from the exact sets) by a background task;
+    until then the account has no filter. The bits of every new reply ride the reply's own pipeline
+    into a shared Redis bitmap (BITFIELD SET), and each process merges that bitmap back with BITOP
+    OR every persist interval, so replies made by other processes become visible within one
+    interval. It answers "definitely not replied" without a Redis call; only positives fall back
+    to the exact set. False-positive rate and memory are configurable and reported through telemetry.
+"""
+
+import asyncio
+import hashlib
+import logging
+import math
+import time
+from typing import Dict, Iterable, List, Optional
+
+from app.config import (
+    REPLY_BLOOM_CAPACITY,
+    REPLY_BLOOM_ERROR_RATE,
+    REPLY_BLOOM_PERSIST_INTERVAL,
+)
+from app.services.telemetry_service import gauge_set
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    """
+    Persian:
+        فیلتر Bloom ساده با double hashing روی blake2b. ترتیب بیت‌ها با bitmap ردیس (MSB اول) یکسان است.
+
+    English:
+        Plain Bloom filter using double hashing over blake2b. Bit order matches Redis bitmaps
+        (most significant bit first), so the persisted value can be inspected with GETBIT.
+    """
+
+    def __init__(self, capacity: int, error_rate: float, bits: Optional[bytes] = None, count: int = 0):
+        self.capacity = max(1, int(capacity))
+        self.error_rate = float(error_rate)
+        self.num_bits = max(8, int(math.ceil(-self.capacity * math.log(self.error_rate) / (math.log(2) ** 2))))
+        self.num_hashes = max(1, int(round(self.num_bits / self.capacity * math.log(2))))
+        size = (self.num_bits + 7) // 8
+        self.bits = bytearray(size)
+        if bits:
+            self.merge_bytes(bits)
+        self.count = count
+
+    def positions(self, item: str) -> List[int]:
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:], "big") | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, item: str) -> None:
+        for pos in self.positions(item):
+            self.bits[pos >> 3] |= 0x80 >> (pos & 7)
+        self.count += 1
+
+    def set_positions(self, positions: Iterable[int]) -> None:
+        """Set bits learned from another copy without counting a new item"""
+        for pos in positions:
+            self.bits[pos >> 3] |= 0x80 >> (pos & 7)
+
+    def __contains__(self, item: str) -> bool:
+        bits = self.bits
+        return all(bits[pos >> 3] & (0x80 >> (pos & 7)) for pos in self.positions(item))
+
+    def merge_bytes(self, other: bytes) -> None:
+        """OR another copy of the same-sized bitmap into this one"""
+        n = min(len(self.bits), len(other))
+        merged = int.from_bytes(self.bits[:n], "big") | int.from_bytes(other[:n], "big")
+        self.bits[:n] = merged.to_bytes(n, "big")
+
+    @property
+    def memory_bytes(self) -> int:
+        return len(self.bits)
+
+    @property
+    def estimated_fp_rate(self) -> float:
+        return (1 - math.exp(-self.num_hashes * self.count / self.num_bits)) ** self.num_hashes
+
+
+class ReplyBloomFilter:
+    """
+    Persian:
+        مدیریت فیلترهای Bloom هر حساب: بارگذاری از Redis (یا بازسازی از مجموعه‌های دقیق) در پس‌زمینه،
+        همگام‌سازی دوره‌ای و گزارش متریک. تا پایان بارگذاری، حساب فیلتر ندارد.
+
+    English:
+        Registry of per-account Bloom filters: loaded from Redis (or rebuilt from the exact sets) in a
+        background task, synced with the shared bitmap on a timer, reported through telemetry.
+        Until an account's load finishes it has no filter and every check goes to the exact set.
+        Items are "{media_id}:{comment_id}".
+    """
+
+    def __init__(
+        self,
+        redis_client,
+        history_key: str = "reply_history:{account_id}:{media_id}",
+        capacity: int = REPLY_BLOOM_CAPACITY,
+        error_rate: float = REPLY_BLOOM_ERROR_RATE,
+        persist_interval: float = REPLY_BLOOM_PERSIST_INTERVAL,
+    ):
+        self.redis = redis_client
+        self.BLOOM_KEY = "reply_bloom:{account_id}"
+        self._history_key = history_key
+        self._capacity = capacity
+        self._error_rate = error_rate
+        self._persist_interval = persist_interval
+        self._filters: Dict[str, BloomFilter] = {}
+        # filters still being loaded; replies recorded meanwhile are added to them too
+        self._loading: Dict[str, BloomFilter] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._dirty: Dict[str, int] = {}
+        self._last_persist: Dict[str, float] = {}
+
+    @staticmethod
+    def item(media_id: str, comment_id: str) -> str:
+        return f"{media_id}:{comment_id}"
+
+    def get(self, account_id: str) -> Optional[BloomFilter]:
+        """
+        Return the account's filter if it is loaded. Otherwise start loading it in the background
+        and return None: seeding a large history must not run inside the caller's time budget.
+        """
+        bloom = self._filters.get(account_id)
+        if bloom is None and account_id not in self._loading:
+            self._loading[account_id] = BloomFilter(self._capacity, self._error_rate)
+            self._spawn(account_id, self._load(account_id))
+        return bloom
+
+    async def load(self, account_id: str) -> BloomFilter:
+        """Return the account's filter, waiting for its load (warm-up and tests)"""
+        self.get(account_id)
+        task = self._tasks.get(account_id)
+        if task is not None and account_id not in self._filters:
+            await asyncio.shield(task)
+        return self._filters[account_id]
+
+    def might_contain_many(self, account_id: str, media_id: str, comment_ids: Iterable[str]) -> Optional[List[bool]]:
+        """
+        Bloom answer per comment, or None while the account has no loaded filter. Negatives are
+        answered locally; the shared bitmap is merged in the background every persist interval.
+        """
+        bloom = self.get(account_id)
+        if bloom is None:
+            return None
+        self._sync_if_due(account_id)
+        return [self.item(media_id, cid) in bloom for cid in comment_ids]
+
+    def add_many(self, account_id: str, media_id: str, comment_ids: Iterable[str], pipe) -> None:
+        """
+        Add comments to the filter (loaded or still loading) and queue a BITFIELD SET of their bits
+        on the caller's pipeline, so the shared bitmap gains them without an extra round-trip.
+        """
+        self.get(account_id)
+        bloom = self._filters.get(account_id) or self._loading[account_id]
+        args = []
+        added = 0
+        for cid in comment_ids:
+            item = self.item(media_id, cid)
+            bloom.add(item)
+            for pos in bloom.positions(item):
+                args += ["SET", "u1", pos, 1]
+            added += 1
+        if args:
+            pipe.execute_command("BITFIELD", self.BLOOM_KEY.format(account_id=account_id), *args)
+        self._dirty[account_id] = self._dirty.get(account_id, 0) + added
+        if bloom.count > bloom.capacity:
+            logger.warning("Reply bloom filter for %s is over capacity (%s > %s); false-positive rate is rising", account_id, bloom.count, bloom.capacity)
+        self._sync_if_due(account_id)
+        self._report()
+
+    async def persist(self, account_id: str) -> None:
+        """Merge the local bitmap into Redis (BITOP OR) and pull back what other processes added"""
+        bloom = self._filters.get(account_id)
+        if bloom is None:
+            return
+        key = self.BLOOM_KEY.format(account_id=account_id)
+        tmp_key = f"{key}:incoming:{id(self)}"
+        self._last_persist[account_id] = time.monotonic()
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.set(tmp_key, bytes(bloom.bits))
+        pipe.bitop("OR", key, key, tmp_key)
+        pipe.delete(tmp_key)
+        pipe.hincrby(f"{key}:meta", "count", self._dirty.pop(account_id, 0))
+        await pipe.execute()
+        raw, count = await self._read(key)
+        if raw is not None:
+            bloom.merge_bytes(raw)
+            bloom.count = max(bloom.count, count)
+
+    async def persist_all(self) -> None:
+        for account_id in list(self._filters):
+            await self.persist(account_id)
+
+    async def drop(self, account_id: str) -> None:
+        """Forget the account's filter locally and in Redis (used when its history is cleared)"""
+        task = self._tasks.pop(account_id, None)
+        if task is not None:
+            task.cancel()
+        self._filters.pop(account_id, None)
+        self._loading.pop(account_id, None)
+        self._dirty.pop(account_id, None)
+        self._last_persist.pop(account_id, None)
+        key = self.BLOOM_KEY.format(account_id=account_id)
+        await self.redis.delete(key, f"{key}:meta")
+        self._report()
+
+    async def _load(self, account_id: str) -> None:
+        bloom = self._loading[account_id]
+        key = self.BLOOM_KEY.format(account_id=account_id)
+        raw, count = await self._read(key)
+        if raw is not None:
+            bloom.merge_bytes(raw)
+            bloom.count = max(bloom.count, count)
+        else:
+            # No persisted bitmap yet: seed from the exact sets so negatives are trustworthy
+            prefix = self._history_key.format(account_id=account_id, media_id="")
+            async for set_key in self.redis.scan_iter(match=prefix + "*", count=1000):
+                media_id = set_key[len(prefix):]
+                if ":" in media_id:
+                    continue  # detail/index keys, not membership sets
+                async for comment_id in self.redis.sscan_iter(set_key, count=1000):
+                    bloom.add(self.item(media_id, comment_id))
+            self._dirty[account_id] = bloom.count
+
+        self._filters[account_id] = self._loading.pop(account_id)
+        if raw is None:
+            # publish the seed at once: processes that load the bitmap later trust it to be complete
+            await self.persist(account_id)
+        self._last_persist.setdefault(account_id, time.monotonic())
+        self._report()
+
+    def _sync_if_due(self, account_id: str) -> None:
+        if time.monotonic() - self._last_persist.get(account_id, 0) < self._persist_interval:
+            return
+        task = self._tasks.get(account_id)
+        if task is None or task.done():
+            self._last_persist[account_id] = time.monotonic()
+            self._spawn(account_id, self.persist(account_id))
+
+    def _spawn(self, account_id: str, coro) -> None:
+        task = asyncio.ensure_future(coro)
+        self._tasks[account_id] = task
+
+        def _done(t: asyncio.Task) -> None:
+            if self._tasks.get(account_id) is t:
+                del self._tasks[account_id]
+            if t.cancelled():
+                return
+            if t.exception() is not None:
+                # a failed load is retried on the next check
+                if account_id not in self._filters:
+                    self._loading.pop(account_id, None)
+                logger.warning("Reply bloom task for %s failed: %s", account_id, t.exception())
+
+        task.add_done_callback(_done)
+
+    async def _read(self, key: str):
+        # The bitmap is binary, so read it without the client's response decoding
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.execute_command("GET", key, NEVER_DECODE=True)
+        pipe.hget(f"{key}:meta", "count")
+        raw, count = await pipe.execute()
+        return raw, int(count or 0)
+
+    def _report(self) -> None:
+        gauge_set("reply_bloom_memory_bytes", sum(b.memory_bytes for b in self._filters.values()))
+        gauge_set("reply_bloom_fp_rate", max((b.estimated_fp_rate for b in self._filters.values()), default=0.0))
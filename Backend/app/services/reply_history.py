@@ -6,72 +6,258 @@ Persian:
 English:
     Duplicate reply prevention service.
     Maintains history of replies to comments and prevents duplicate responses.
+    Uses the asyncio Redis client; bulk calls check a whole media batch with one SMISMEMBER
+    and record it with one pipelined round-trip. Reply details live in a hash indexed by a
+    timestamp-scored sorted set, so the newest N replies cost one ZREVRANGE and one HMGET and
+    can be paged with a signed cursor. With REPLY_BLOOM_ENABLED a per-account Bloom filter
+    answers "definitely not replied" and only positives reach the exact set.
 """
 
-from datetime import datetime, timedelta
-from typing import Optional, Dict, List
-import redis
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Dict, List, Iterable, Tuple
+import redis.asyncio as redis
+import asyncio
 import json
 import logging
-from app.config import REDIS_URL
+import uuid
+from app.config import REDIS_URL, REPLY_BLOOM_ENABLED, REPLY_PURGE_SCAN_COUNT
+from app.services.reply_bloom import ReplyBloomFilter
+from app.services.telemetry_service import incr
+from app.utils.secure_cursor import sign, verify
 
 logger = logging.getLogger(__name__)
 
 class ReplyHistoryService:
-    def __init__(self, redis_url: str = REDIS_URL):
-        self.redis = redis.from_url(redis_url)
+    def __init__(self, redis_url: str = REDIS_URL, bloom_enabled: bool = REPLY_BLOOM_ENABLED):
+        self.redis = redis.Redis.from_url(redis_url, encoding="utf-8", decode_responses=True)
         self.REPLY_HISTORY_KEY = "reply_history:{account_id}:{media_id}"
         self.HISTORY_TTL = 60 * 60 * 24 * 30  # 30 days
+        self.PURGE_STATUS_KEY = "reply_history_purge:{purge_id}"
+        self.PURGE_STATUS_TTL = 60 * 60 * 24  # 1 day
+        self._purges: Dict[str, asyncio.Task] = {}
+        self.bloom: Optional[ReplyBloomFilter] = (
+            ReplyBloomFilter(self.redis, history_key=self.REPLY_HISTORY_KEY) if bloom_enabled else None
+        )
 
     async def has_replied(self, account_id: str, media_id: str, comment_id: str) -> bool:
         """Check if we've already replied to this comment"""
+        return not await self.filter_unreplied(account_id, media_id, [comment_id])
+
+    async def filter_unreplied(self, account_id: str, media_id: str, comment_ids: Iterable[str]) -> List[str]:
+        """Return the comment ids (in input order) we have not replied to yet, in one round-trip"""
+        comment_ids = [str(c) for c in comment_ids]
+        if not comment_ids:
+            return []
+
+        # Bloom negatives are definitely unreplied; only positives need the exact set
+        candidates = comment_ids
+        maybe = self.bloom.might_contain_many(account_id, media_id, comment_ids) if self.bloom is not None else None
+        if maybe is not None:
+            candidates = [cid for cid, hit in zip(comment_ids, maybe) if hit]
+            incr("reply_bloom_negatives", len(comment_ids) - len(candidates))
+            if not candidates:
+                return comment_ids
+
         key = self.REPLY_HISTORY_KEY.format(account_id=account_id, media_id=media_id)
-        return bool(self.redis.sismember(key, comment_id))
+        flags = await self.redis.smismember(key, candidates)
+        replied = {cid for cid, seen in zip(candidates, flags) if seen}
+        if maybe is not None:
+            incr("reply_bloom_false_positives", len(candidates) - len(replied))
+        return [cid for cid in comment_ids if cid not in replied]
 
-    async def record_reply(self, account_id: str, media_id: str, comment_id: str, 
+    async def record_reply(self, account_id: str, media_id: str, comment_id: str,
                          rule_id: str, reply_text: str):
         """Record that we've replied to this comment"""
+        await self.record_replies(account_id, media_id, [
+            {"comment_id": comment_id, "rule_id": rule_id, "reply_text": reply_text}
+        ])
+
+    async def record_replies(self, account_id: str, media_id: str, replies: List[Dict]):
+        """
+        Record several replies of one media in a single pipelined round-trip.
+        Each item needs comment_id, rule_id and reply_text.
+        """
+        if not replies:
+            return
         key = self.REPLY_HISTORY_KEY.format(account_id=account_id, media_id=media_id)
-        
+        details_key, timeline_key = f"{key}:details", f"{key}:timeline"
+        now = datetime.utcnow()
+        timestamp = now.isoformat()
+        score = round(now.replace(tzinfo=timezone.utc).timestamp(), 3)
+
+        pipe = self.redis.pipeline(transaction=False)
         # Store basic reply history
-        self.redis.sadd(key, comment_id)
-        self.redis.expire(key, self.HISTORY_TTL)
-
-        # Store detailed reply info
-        detail_key = f"{key}:detail:{comment_id}"
-        detail = {
-            "rule_id": rule_id,
-            "reply_text": reply_text,
-            "timestamp": datetime.utcnow().isoformat()
+        pipe.sadd(key, *[str(r["comment_id"]) for r in replies])
+        pipe.expire(key, self.HISTORY_TTL)
+
+        # Store detailed reply info in a hash, indexed by time in a sorted set
+        details = {
+            str(r["comment_id"]): json.dumps({
+                "rule_id": r["rule_id"],
+                "reply_text": r["reply_text"],
+                "timestamp": timestamp
+            })
+            for r in replies
         }
-        self.redis.set(detail_key, json.dumps(detail))
-        self.redis.expire(detail_key, self.HISTORY_TTL)
+        pipe.hset(details_key, mapping=details)
+        pipe.expire(details_key, self.HISTORY_TTL)
+        pipe.zadd(timeline_key, {cid: score for cid in details})
+        pipe.expire(timeline_key, self.HISTORY_TTL)
+        if self.bloom is not None:
+            # the bloom bits ride the same round-trip into the shared bitmap other processes sync from
+            self.bloom.add_many(account_id, media_id, list(details), pipe)
+        await pipe.execute()
 
-    async def get_reply_history(self, account_id: str, media_id: str, 
+    async def get_reply_history(self, account_id: str, media_id: str,
                               limit: int = 100) -> List[Dict]:
-        """Get history of replies for a media"""
+        """Get history of replies for a media (newest first)"""
+        items, _ = await self.get_reply_history_page(account_id, media_id, limit)
+        return items
+
+    async def get_reply_history_page(self, account_id: str, media_id: str, limit: int = 100,
+                                     cursor: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+        """
+        Return (items, next_cursor) of replies for a media, newest first.
+        Costs one sorted-set range plus one HMGET regardless of how many replies the media has.
+        """
         key = self.REPLY_HISTORY_KEY.format(account_id=account_id, media_id=media_id)
-        comment_ids = self.redis.smembers(key)
-        
+        details_key, timeline_key = f"{key}:details", f"{key}:timeline"
+
+        if cursor:
+            state = verify(cursor)
+            last_score, last_member = float(state["s"]), state["m"]
+            # Replies recorded in one batch share a score: take the rest of that tie group
+            # (ordered by member, descending) and then everything strictly older.
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.zrevrangebyscore(timeline_key, last_score, last_score, withscores=True)
+            pipe.zrevrangebyscore(timeline_key, f"({last_score}", "-inf", start=0, num=limit, withscores=True)
+            ties, older = await pipe.execute()
+            entries = [(m, sc) for m, sc in ties if m < last_member] + older
+        else:
+            entries = await self.redis.zrevrange(timeline_key, 0, limit - 1, withscores=True)
+            if not entries:
+                return await self._legacy_history(key, limit), None
+
+        entries = entries[:limit]
+        if not entries:
+            return [], None
+
+        raw = await self.redis.hmget(details_key, [m for m, _ in entries])
         history = []
-        for comment_id in comment_ids:
-            detail_key = f"{key}:detail:{comment_id}"
-            detail_json = self.redis.get(detail_key)
+        for (comment_id, _), detail_json in zip(entries, raw):
             if detail_json:
                 detail = json.loads(detail_json)
                 detail["comment_id"] = comment_id
                 history.append(detail)
 
-        return sorted(history, 
-                     key=lambda x: x["timestamp"], 
+        next_cursor = None
+        if len(entries) == limit:
+            last_member, last_score = entries[-1]
+            next_cursor = sign({"s": last_score, "m": last_member})
+        return history, next_cursor
+
+    async def _legacy_history(self, key: str, limit: int) -> List[Dict]:
+        """Read replies recorded before the time index existed (per-comment :detail: keys)"""
+        comment_ids = await self.redis.smembers(key)
+        if not comment_ids:
+            return []
+        comment_ids = list(comment_ids)
+        raw = await self.redis.mget([f"{key}:detail:{cid}" for cid in comment_ids])
+
+        history = []
+        for comment_id, detail_json in zip(comment_ids, raw):
+            if detail_json:
+                detail = json.loads(detail_json)
+                detail["comment_id"] = comment_id
+                history.append(detail)
+
+        return sorted(history,
+                     key=lambda x: x["timestamp"],
                      reverse=True)[:limit]
 
-    async def clear_history(self, account_id: str, media_id: str = None):
-        """Clear reply history for an account or specific media"""
+    async def clear_history(self, account_id: str, media_id: str = None, purge_id: Optional[str] = None) -> int:
+        """
+        Clear reply history for an account or specific media, including detail and index keys.
+        Keys are found with batched SCAN and removed with pipelined UNLINK (freed off the Redis
+        main thread). Returns the number of keys removed; progress goes to purge_id if given.
+        """
         if media_id:
             key = self.REPLY_HISTORY_KEY.format(account_id=account_id, media_id=media_id)
-            self.redis.delete(key)
-        else:
-            pattern = self.REPLY_HISTORY_KEY.format(account_id=account_id, media_id="*")
-            for key in self.redis.scan_iter(pattern):
-                self.redis.delete(key)
\ No newline at end of file
+            # legacy per-comment detail keys are named after the set's members, so no keyspace SCAN
+            deleted = await self._unlink_legacy_details(key)
+            return deleted + await self.redis.unlink(key, f"{key}:details", f"{key}:timeline")
+
+        # matches the sets, their :details/:timeline index and legacy :detail: keys
+        pattern = self.REPLY_HISTORY_KEY.format(account_id=account_id, media_id="*")
+        deleted = await self._unlink_matching(pattern, purge_id)
+        if self.bloom is not None:
+            await self.bloom.drop(account_id)
+        return deleted
+
+    async def _unlink_legacy_details(self, key: str) -> int:
+        deleted = 0
+        cursor = 0
+        while True:
+            cursor, comment_ids = await self.redis.sscan(key, cursor=cursor, count=REPLY_PURGE_SCAN_COUNT)
+            if comment_ids:
+                deleted += await self.redis.unlink(*(f"{key}:detail:{cid}" for cid in comment_ids))
+            if cursor == 0:
+                return deleted
+
+    async def _unlink_matching(self, pattern: str, purge_id: Optional[str] = None) -> int:
+        status_key = self.PURGE_STATUS_KEY.format(purge_id=purge_id) if purge_id else None
+        scanned = deleted = 0
+        cursor = 0
+        while True:
+            cursor, keys = await self.redis.scan(cursor=cursor, match=pattern, count=REPLY_PURGE_SCAN_COUNT)
+            scanned += len(keys)
+            if keys:
+                pipe = self.redis.pipeline(transaction=False)
+                for i in range(0, len(keys), 500):
+                    pipe.unlink(*keys[i:i + 500])
+                deleted += sum(await pipe.execute())
+            if status_key:
+                await self.redis.hset(status_key, mapping={"scanned": scanned, "deleted": deleted})
+            if cursor == 0:
+                return deleted
+            # let other coroutines (API requests) run between batches
+            await asyncio.sleep(0)
+
+    async def start_purge(self, account_id: str) -> str:
+        """
+        Start an account-wide clear_history in the background and return a purge id
+        whose progress can be read with get_purge_status().
+        """
+        purge_id = uuid.uuid4().hex
+        status_key = self.PURGE_STATUS_KEY.format(purge_id=purge_id)
+        await self.redis.hset(status_key, mapping={
+            "account_id": account_id,
+            "status": "running",
+            "scanned": 0,
+            "deleted": 0,
+            "started_at": datetime.utcnow().isoformat()
+        })
+        await self.redis.expire(status_key, self.PURGE_STATUS_TTL)
+
+        async def _run():
+            try:
+                await self.clear_history(account_id, purge_id=purge_id)
+                await self.redis.hset(status_key, mapping={"status": "done", "finished_at": datetime.utcnow().isoformat()})
+            except Exception as e:
+                logger.exception("Reply history purge %s for %s failed", purge_id, account_id)
+                await self.redis.hset(status_key, mapping={"status": "failed", "error": str(e), "finished_at": datetime.utcnow().isoformat()})
+            finally:
+                self._purges.pop(purge_id, None)
+
+        # keep a reference so the task is not garbage collected mid-run
+        self._purges[purge_id] = asyncio.create_task(_run())
+        return purge_id
+
+    async def get_purge_status(self, purge_id: str) -> Optional[Dict]:
+        status = await self.redis.hgetall(self.PURGE_STATUS_KEY.format(purge_id=purge_id))
+        if not status:
+            return None
+        for field in ("scanned", "deleted"):
+            status[field] = int(status.get(field, 0))
+        status["purge_id"] = purge_id
+        return status
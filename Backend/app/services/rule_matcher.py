@@ -0,0 +1,211 @@
+"""
+Persian:
+    تطبیق ایندکس‌شدهٔ قوانین: از شرط json-logic هر قانون عبارت‌های لازم (زیررشتهٔ متن با in و مقدار دقیق
+    فیلدها با ==) استخراج و در ایندکس معکوس و یک automaton از نوع Aho–Corasick قرار می‌گیرند. یک پیمایش
+    متن کامنت قوانین کاندید را می‌دهد و عبارت کامل فقط روی همین کاندیدها ارزیابی می‌شود.
+
+English:
+    Indexed rule matching: the terms a rule's json-logic condition requires, substrings of the text
+    field ({"in": ["term", {"var": "text"}]}) and exact values of any field ({"==": [{"var": f}, v]}),
+    combined through and/or, go into an inverted index. Substrings are found by an Aho–Corasick
+    automaton, so one pass over a comment's text plus a dict lookup per equality field yields the
+    candidate rules, and the full expression is evaluated only on those. Rules with no extractable
+    term are always candidates, so results are identical to testing every rule.
+"""
+
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.schemas.rule_schema import RuleOut
+
+# ("in", field, substring) or ("==", field, value)
+Term = Tuple[str, str, Any]
+
+
+class CompiledRule:
+    """An active rule with its condition compiled to a predicate over the event/comment data"""
+    __slots__ = ("rule", "test", "expression")
+
+    def __init__(self, rule: RuleOut, test: Callable[[Dict[str, Any]], bool], expression: Any = None):
+        self.rule = rule
+        self.test = test
+        self.expression = expression
+
+
+class _Automaton:
+    """Aho–Corasick automaton over a fixed set of literals; search() returns the ids of those found"""
+
+    def __init__(self, literals: List[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[tuple] = [()]
+        for literal_id, literal in enumerate(literals):
+            node = 0
+            for ch in literal:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                node = nxt
+            self._out[node] += (literal_id,)
+
+        # breadth-first fail links (depth-1 nodes fail to the root); each node's output also
+        # carries the outputs of its fail chain
+        queue = list(self._goto[0].values())
+        for node in queue:
+            for ch, child in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(ch, 0)
+                self._out[child] += self._out[self._fail[child]]
+                queue.append(child)
+
+    def search(self, text: str) -> Set[int]:
+        goto, fail, out = self._goto, self._fail, self._out
+        found: Set[int] = set()
+        node = 0
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                found.update(out[node])
+        return found
+
+
+def _field_of(node: Any) -> Optional[str]:
+    """The data field a {"var": ...} node reads, or None when it is not a plain field reference"""
+    if not isinstance(node, dict) or len(node) != 1 or "var" not in node:
+        return None
+    path = node["var"]
+    if isinstance(path, (list, tuple)):
+        # a default value could make the test pass without the field holding the term
+        if len(path) != 1:
+            return None
+        path = path[0]
+    # dotted paths would need the nested lookup; leave them to the full evaluation
+    return path if isinstance(path, str) and path and "." not in path else None
+
+
+def required_terms(expression: Any, field: str = "text") -> Optional[List[Term]]:
+    """
+    Persian:
+        فهرست عبارت‌هایی که دست‌کم یکی از آن‌ها باید برقرار باشد تا شرط برقرار شود؛ None یعنی قابل ایندکس نیست.
+        ("in", field, term): term زیررشتهٔ data[field] است؛ ("==", f, value): data[f] برابر value است.
+
+    English:
+        Terms of which at least one must hold for expression to be truthy, or None when no such
+        necessary condition can be derived (the rule is then always a candidate).
+        ("in", field, term) means term is a substring of data[field]; ("==", f, value) means
+        data[f] == value for any field f.
+    """
+    if not isinstance(expression, dict) or len(expression) != 1:
+        return None
+    (op, args), = expression.items()
+    if not isinstance(args, (list, tuple)):
+        args = [args]
+
+    if op == "in" and len(args) == 2 and isinstance(args[0], str) and args[0] and _field_of(args[1]) == field:
+        return [("in", field, args[0])]
+    if op in ("==", "===") and len(args) == 2:
+        left, right = args
+        if _field_of(left) is None:
+            left, right = right, left
+        name = _field_of(left)
+        if name is not None and isinstance(right, (str, int, float, bool)) and right != "":
+            return [("==", name, right)]
+        return None
+    if op == "and":
+        options = [terms for terms in (required_terms(a, field) for a in args) if terms]
+        if not options:
+            return None
+        # any one conjunct is a necessary condition: index the most selective one
+        # (exact lookups first, then fewest and longest substrings)
+        return min(options, key=lambda terms: (
+            any(kind == "in" for kind, _, _ in terms),
+            len(terms),
+            -min(len(str(value)) for _, _, value in terms),
+        ))
+    if op == "or":
+        union: List[Term] = []
+        for arg in args:
+            terms = required_terms(arg, field)
+            if not terms:
+                return None
+            union.extend(terms)
+        return union or None
+    return None
+
+
+class RuleMatcher:
+    """
+    Persian:
+        تطبیق‌دهندهٔ قوانین یک مجموعه (حساب یا مدیا) با ایندکس معکوس عبارت‌ها و Aho–Corasick.
+
+    English:
+        Matcher over one rule set (an account's or a media's) backed by a term -> rules inverted
+        index and an Aho–Corasick automaton. Candidates keep the rule set's order, so first_match()
+        returns the same rule as testing the rules one by one.
+    """
+
+    def __init__(self, rules: Iterable[CompiledRule], field: str = "text"):
+        self.rules: List[CompiledRule] = list(rules)
+        self._field = field
+        literal_ids: Dict[str, int] = {}
+        postings: List[List[int]] = []
+        # field -> value -> rule indexes, for equality terms
+        exact: Dict[str, Dict[Any, List[int]]] = {}
+        always: List[int] = []
+        for index, compiled in enumerate(self.rules):
+            terms = required_terms(compiled.expression, field) if compiled.expression is not None else None
+            if not terms:
+                always.append(index)
+                continue
+            for kind, name, value in set(terms):
+                if kind == "==":
+                    exact.setdefault(name, {}).setdefault(value, []).append(index)
+                    continue
+                literal_id = literal_ids.setdefault(value, len(literal_ids))
+                if literal_id == len(postings):
+                    postings.append([])
+                postings[literal_id].append(index)
+        self._postings = postings
+        self._exact = exact
+        self._always = always
+        self._automaton = _Automaton(list(literal_ids)) if literal_ids else None
+
+    @property
+    def indexed_count(self) -> int:
+        return len(self.rules) - len(self._always)
+
+    def candidates(self, data: Dict[str, Any]) -> List[CompiledRule]:
+        """Rules whose required terms hold for data, plus the unindexed ones, in rule order"""
+        if not isinstance(data, dict):
+            return self.rules
+        text = data.get(self._field)
+        if text is not None and not isinstance(text, str):
+            # "in" also works on lists; only strings can be searched by the automaton
+            return self.rules
+        hits = set(self._always)
+        if self._automaton is not None and text:
+            for literal_id in self._automaton.search(text):
+                hits.update(self._postings[literal_id])
+        for name, values in self._exact.items():
+            value = data.get(name)
+            if isinstance(value, (str, int, float, bool)):
+                hits.update(values.get(value, ()))
+        return [self.rules[i] for i in sorted(hits)]
+
+    def match(self, data: Dict[str, Any]) -> List[CompiledRule]:
+        """All rules whose full condition holds for data"""
+        return [compiled for compiled in self.candidates(data) if compiled.test(data)]
+
+    def first_match(self, data: Dict[str, Any]) -> Optional[CompiledRule]:
+        """The first rule (in rule set order) whose condition holds for data"""
+        for compiled in self.candidates(data):
+            if compiled.test(data):
+                return compiled
+        return None
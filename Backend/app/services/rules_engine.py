@@ -1,20 +1,62 @@
 ﻿"""
 Persian:
     موتور سادهٔ ارزیابی قواعد: برای هر حساب، قوانین فعال را انتخاب، روی ورودی‌ها اعمال و در صورت match به صف ارسال job می‌فرستد.
+    قوانین هر حساب یک بار پارس و به closure کامپایل و در RulesRepository کش می‌شوند؛ ارزیابی رویداد کوئری DB ندارد
+    و ایندکس عبارت‌ها (RuleMatcher) فقط قوانین کاندید را ارزیابی می‌کند.
 
 English:
     Simple rules engine: select active rules for account, evaluate against input (e.g., new media), and enqueue send jobs when matched.
+    Each account's rules are parsed and compiled to closures once and cached in RulesRepository,
+    so evaluating an event runs no DB query and no json.loads; a term index (RuleMatcher) limits
+    evaluation to the rules whose keywords occur in the event text.
+    Matching a batch of events runs in a small thread pool and the matches are enqueued with one
+    enqueue_send_many call, so webhook bursts never block the event loop. match_rules_batch and
+    enqueue_actions are the two halves, for callers that enqueue several accounts' matches at once.
 """
 
-from typing import List, Dict, Any
-from sqlmodel import Session, select
-from app.models.rule_model import Rule
-from app.db import engine
-from app.services.sender_queue import enqueue_send
-from json_logic import jsonLogic
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional
+from app.config import INBOUND_MATCH_WORKERS
+from app.database.rules_repository import RulesRepository
+from app.services.rule_matcher import RuleMatcher
+from app.services.sender_queue import enqueue_send_many
+from app.utils.logic_compiler import compile_predicate
 import ast
 
-def evaluate_rules_for_event(event: Dict[str, Any]) -> list:
+_match_executor: Optional[ThreadPoolExecutor] = None
+
+def _rules_repo(rules_repo: Optional[RulesRepository]) -> RulesRepository:
+    if rules_repo is not None:
+        return rules_repo
+    from app.deps import get_rules_repository
+    return get_rules_repository()
+
+def _executor() -> ThreadPoolExecutor:
+    # compiled rules are closures and cannot be pickled to a process pool; a dedicated thread pool
+    # keeps batch matching off the loop without competing with the default executor
+    global _match_executor
+    if _match_executor is None:
+        _match_executor = ThreadPoolExecutor(max_workers=INBOUND_MATCH_WORKERS, thread_name_prefix="rules-match")
+    return _match_executor
+
+def _action(event: Dict[str, Any], rule_id: Any) -> Dict[str, Any]:
+    return {"session_id": event.get("session_id"), "rule_id": rule_id, "event": event}
+
+def _match_events(matcher: RuleMatcher, events: List[Dict[str, Any]]) -> List[List[Any]]:
+    return [[compiled.rule.id for compiled in matcher.match(event)] for event in events]
+
+def actions_for(events: List[Dict[str, Any]], matches: List[List[Any]]) -> List[Dict[str, Any]]:
+    """Send actions for matched events, in event order"""
+    return [_action(event, rule_id) for event, rule_ids in zip(events, matches) for rule_id in rule_ids]
+
+async def enqueue_actions(actions: List[Dict[str, Any]]) -> None:
+    """Enqueue send actions with one enqueue_send_many call, off the event loop"""
+    if actions:
+        # enqueueing writes the jobs table and Redis synchronously
+        await asyncio.to_thread(enqueue_send_many, actions)
+
+async def evaluate_rules_for_event(event: Dict[str, Any], rules_repo: Optional[RulesRepository] = None) -> list:
     """
     Persian:
         رویداد را روی همه قواعد فعال حساب اجرا می‌کند و لیست rule_idهایی که match شدند را برمی‌گرداند.
@@ -22,23 +64,41 @@ def evaluate_rules_for_event(event: Dict[str, Any]) -> list:
         Evaluates the event against all active rules for the account and returns a list of matched rule_ids.
     """
     account_id = event.get("account_id")
-    matched = []
     if not account_id:
-        return matched
-    with Session(engine) as db:
-        statement = select(Rule).where(Rule.account_id == account_id, Rule.enabled == True)
-        rules = db.exec(statement).all()
-    for r in rules:
-        try:
-            expr = __import__("json").loads(r.expression)
-        except Exception:
-            continue
-        if evaluate_expression_jsonlogic(expr, event):
-            matched.append(r.id)
-            action = {"session_id": event.get("session_id"), "rule_id": r.id, "event": event}
-            enqueue_send(action)
+        return []
+    # only rules whose indexed terms occur in the event text are evaluated
+    matcher = await _rules_repo(rules_repo).get_rule_matcher(account_id)
+    matched = [compiled.rule.id for compiled in matcher.match(event)]
+    await enqueue_actions([_action(event, rule_id) for rule_id in matched])
     return matched
 
+async def match_rules_batch(account_id: str, events: List[Dict[str, Any]], rules_repo: Optional[RulesRepository] = None) -> List[List[Any]]:
+    """
+    Match a batch of one account's events against its compiled rule set in a single pass on the
+    matching thread pool (off the event loop), without enqueueing. Returns the matched rule_ids
+    for each event, in input order.
+    """
+    if not events:
+        return []
+    matcher = await _rules_repo(rules_repo).get_rule_matcher(account_id)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor(), _match_events, matcher, events)
+
+async def evaluate_rules_batch(account_id: str, events: List[Dict[str, Any]], rules_repo: Optional[RulesRepository] = None) -> List[List[Any]]:
+    """
+    Persian:
+        چند رویداد یک حساب را در یک گذر روی قوانین کامپایل‌شده (در thread pool، بیرون از event loop) ارزیابی
+        و همهٔ matchها را با یک فراخوانی enqueue_send_many در صف می‌گذارد. برای هر رویداد فهرست rule_idها برمی‌گردد.
+
+    English:
+        Evaluate a batch of one account's events against its compiled rule set in a single pass on
+        the matching thread pool (off the event loop) and enqueue every match with one
+        enqueue_send_many call. Returns the matched rule_ids for each event, in input order.
+    """
+    matches = await match_rules_batch(account_id, events, rules_repo)
+    await enqueue_actions(actions_for(events, matches))
+    return matches
+
 def evaluate_expression_jsonlogic(expression: Dict[str, Any], context: Dict[str, Any]) -> bool:
     """
     Persian:
@@ -48,7 +108,7 @@ def evaluate_expression_jsonlogic(expression: Dict[str, Any], context: Dict[str,
         expression must be a valid json-logic structure. context provides runtime data.
     """
     try:
-        return bool(jsonLogic(expression, data=context))
+        return compile_predicate(expression)(context)
     except Exception:
         return False
 
@@ -70,7 +130,7 @@ def evaluate_expression(expression: str, context: Dict[str, Any]) -> bool:
     except Exception:
         return False
 
-def run_rules_for_account(account_id: str, event: Dict[str, Any]):
+async def run_rules_for_account(account_id: str, event: Dict[str, Any], rules_repo: Optional[RulesRepository] = None):
     """
     Persian:
         برای هر قاعده فعال مرتبط با account این event را تست می‌کنیم و اگر مطابق بود، job ارسال می‌کنیم.
@@ -78,15 +138,6 @@ def run_rules_for_account(account_id: str, event: Dict[str, Any]):
     English:
         For each active rule linked to account, test the event and enqueue send job on match.
     """
-    with Session(engine) as db:
-        statement = select(Rule).where(Rule.account_id == account_id, Rule.enabled == True)
-        rules = db.exec(statement).all()
-    for r in rules:
-        # Expect r.expression to be JSON string representing json-logic; parse safely
-        try:
-            expr = __import__("json").loads(r.expression)
-        except Exception:
-            continue
-        if evaluate_expression_jsonlogic(expr, event):
-            action = {"session_id": event.get("session_id"), "rule_id": r.id, "event": event}
-            enqueue_send(action)
+    # conditions were parsed and compiled when the account's rules were cached; invalid ones are skipped there
+    matcher = await _rules_repo(rules_repo).get_rule_matcher(account_id)
+    await enqueue_actions([_action(event, compiled.rule.id) for compiled in matcher.match(event)])
@@ -0,0 +1,212 @@
+"""
+Persian:
+    صف ارسال با خط (lane) جداگانه برای هر حساب در Redis و زمان‌بند نوبتی (round-robin) بین خط‌ها.
+    هر خط یک list از job idهای همان حساب به ترتیب ورود است. حساب‌هایی که کار دارند در یک حلقهٔ ready
+    قرار می‌گیرند؛ هر نوبت حداکثر quantum job از سر خط برداشته می‌شود و تا پایان آن‌ها حساب به حلقه برنمی‌گردد،
+    پس ارسال‌های هر حساب در کل خوشه پشت سر هم و به ترتیب انجام می‌شوند و حساب پرکار حساب‌های کم‌کار را گرسنه نمی‌گذارد.
+    خط یک حساب را می‌توان تا زمان مشخصی متوقف کرد (rate limit یا challenge).
+
+English:
+    Per-account lanes for the sender queue with a round-robin scheduler across lanes, in Redis.
+    Each lane is a list of one account's job ids in arrival order. Accounts with work sit in a
+    ready ring; a take pops the next account, hands out up to `quantum` ids from the head of its
+    lane and keeps the account off the ring until those are done. So each account has at most one
+    batch in flight cluster-wide (sends stay ordered and serialized per account), and a hot account
+    gets one turn per round like every other, so it cannot starve quiet ones. (Sends all cost one
+    unit, so deficit round-robin reduces to this fixed quantum.) A lane can be paused until a given
+    time, e.g. when its account is rate limited or challenged; paused lanes rejoin the ring on
+    the first take after the pause ends.
+
+    All state changes are single Lua scripts. Methods return whatever the client's script call
+    returns, so the same class serves the sync client (enqueue side) and the asyncio client (worker,
+    await the result).
+
+    Keys: sender:lane:{account} (list), sender:lanes:ready (list), sender:lanes:ringed (set),
+    sender:lanes:busy (hash account -> ids in flight), sender:lanes:paused (zset account -> resume
+    time) and one in-flight list per worker holding "{job_id} {account}" entries. A lane stays off the
+    ring while its account has ids in flight, so a worker that dies must be recovered: the async worker
+    keeps a heartbeat in sender:lanes:workers and live workers recover() the lists of silent ones.
+"""
+
+import time
+from typing import Any, Iterable, Optional, Tuple
+
+# KEYS: ready, ringed, busy, paused[, in-flight]; ARGV: lane prefix, now, ...
+_PRELUDE = """
+local ready, ringed, busy, paused = KEYS[1], KEYS[2], KEYS[3], KEYS[4]
+local prefix, now = ARGV[1], tonumber(ARGV[2])
+
+local function is_paused(acct)
+    local until_ts = redis.call('ZSCORE', paused, acct)
+    return until_ts and tonumber(until_ts) > now
+end
+
+-- put acct on the ring if it has work, nothing in flight, is not paused and is not already there
+local function ring(acct)
+    if redis.call('SISMEMBER', ringed, acct) == 1 then return end
+    if tonumber(redis.call('HGET', busy, acct) or '0') > 0 then return end
+    if is_paused(acct) then return end
+    if redis.call('LLEN', prefix .. acct) == 0 then return end
+    redis.call('RPUSH', ready, acct)
+    redis.call('SADD', ringed, acct)
+end
+
+local function release(acct, n)
+    if redis.call('HINCRBY', busy, acct, -n) <= 0 then
+        redis.call('HDEL', busy, acct)
+    end
+end
+
+local function split(entry)
+    local sp = string.find(entry, ' ', 1, true)
+    return string.sub(entry, 1, sp - 1), string.sub(entry, sp + 1)
+end
+"""
+
+# ARGV[3..]: account, job_id pairs
+_PUSH_SCRIPT = _PRELUDE + """
+for i = 3, #ARGV, 2 do
+    redis.call('RPUSH', prefix .. ARGV[i], ARGV[i + 1])
+end
+for i = 3, #ARGV, 2 do
+    ring(ARGV[i])
+end
+return (#ARGV - 2) / 2
+"""
+
+# KEYS[5]: in-flight list; ARGV[3]: quantum. Returns the taken in-flight entries (empty when idle).
+_TAKE_SCRIPT = _PRELUDE + """
+local inflight, quantum = KEYS[5], tonumber(ARGV[3])
+for _, acct in ipairs(redis.call('ZRANGEBYSCORE', paused, '-inf', now)) do
+    redis.call('ZREM', paused, acct)
+    ring(acct)
+end
+for _ = 1, redis.call('LLEN', ready) do
+    local acct = redis.call('LPOP', ready)
+    redis.call('SREM', ringed, acct)
+    -- a lane paused while on the ring just drops off; it rejoins when the pause ends
+    if not is_paused(acct) then
+        local ids = redis.call('LPOP', prefix .. acct, quantum)
+        if ids then
+            redis.call('HINCRBY', busy, acct, #ids)
+            local entries = {}
+            for i, id in ipairs(ids) do
+                entries[i] = id .. ' ' .. acct
+                redis.call('RPUSH', inflight, entries[i])
+            end
+            return entries
+        end
+    end
+end
+return {}
+"""
+
+# KEYS[5]: in-flight list; ARGV[3]: entry
+_DONE_SCRIPT = _PRELUDE + """
+if redis.call('LREM', KEYS[5], 1, ARGV[3]) == 0 then return 0 end
+local _, acct = split(ARGV[3])
+release(acct, 1)
+ring(acct)
+return 1
+"""
+
+# KEYS[5]: in-flight list; ARGV[3]: entry, ARGV[4]: pause the lane until this time (0 for no pause).
+# The id goes back to the head of its lane so the account's order is kept.
+_REQUEUE_SCRIPT = _PRELUDE + """
+if redis.call('LREM', KEYS[5], 1, ARGV[3]) == 0 then return 0 end
+local id, acct = split(ARGV[3])
+redis.call('LPUSH', prefix .. acct, id)
+if tonumber(ARGV[4]) > now then
+    redis.call('ZADD', paused, ARGV[4], acct)
+end
+release(acct, 1)
+ring(acct)
+return 1
+"""
+
+# ARGV[3]: account, ARGV[4]: resume time (0 resumes now)
+_PAUSE_SCRIPT = _PRELUDE + """
+local acct = ARGV[3]
+if tonumber(ARGV[4]) > now then
+    redis.call('ZADD', paused, ARGV[4], acct)
+else
+    redis.call('ZREM', paused, acct)
+    ring(acct)
+end
+return 1
+"""
+
+# KEYS[5]: in-flight list of a worker that died or restarted; its ids go back to the head of their lanes
+_RECOVER_SCRIPT = _PRELUDE + """
+local moved = 0
+while true do
+    local entry = redis.call('RPOP', KEYS[5])
+    if not entry then break end
+    local id, acct = split(entry)
+    redis.call('LPUSH', prefix .. acct, id)
+    release(acct, 1)
+    ring(acct)
+    moved = moved + 1
+end
+return moved
+"""
+
+
+class SenderLanes:
+    def __init__(self, client: Any):
+        self.redis = client
+        self.LANE_PREFIX = "sender:lane:"
+        self.READY_KEY = "sender:lanes:ready"
+        self.RINGED_KEY = "sender:lanes:ringed"
+        self.BUSY_KEY = "sender:lanes:busy"
+        self.PAUSED_KEY = "sender:lanes:paused"
+        self.INFLIGHT_KEY = "sender:lanes:inflight:{worker}"
+        self.WORKERS_KEY = "sender:lanes:workers"
+        self._push = client.register_script(_PUSH_SCRIPT)
+        self._take = client.register_script(_TAKE_SCRIPT)
+        self._done = client.register_script(_DONE_SCRIPT)
+        self._requeue = client.register_script(_REQUEUE_SCRIPT)
+        self._pause = client.register_script(_PAUSE_SCRIPT)
+        self._recover = client.register_script(_RECOVER_SCRIPT)
+
+    def _run(self, script, *args, inflight: Optional[str] = None):
+        keys = [self.READY_KEY, self.RINGED_KEY, self.BUSY_KEY, self.PAUSED_KEY]
+        if inflight is not None:
+            keys.append(inflight)
+        return script(keys=keys, args=[self.LANE_PREFIX, time.time(), *args])
+
+    def inflight_key(self, worker: str) -> str:
+        return self.INFLIGHT_KEY.format(worker=worker)
+
+    @staticmethod
+    def job_id(entry: str) -> str:
+        """The job id of an in-flight entry"""
+        return entry.split(" ", 1)[0]
+
+    def push(self, items: Iterable[Tuple[str, str]]):
+        """Append (account_id, job_id) pairs to their lanes, in order"""
+        args = [value for account_id, job_id in items for value in (account_id, job_id)]
+        return self._run(self._push, *args)
+
+    def take(self, inflight: str, quantum: int = 1):
+        """Up to quantum in-flight entries from the next ready lane (round-robin), or an empty list"""
+        return self._run(self._take, max(1, int(quantum)), inflight=inflight)
+
+    def done(self, inflight: str, entry: str):
+        """Finish an in-flight entry; its account rejoins the ring once its batch is done"""
+        return self._run(self._done, entry, inflight=inflight)
+
+    def requeue(self, inflight: str, entry: str, delay: float = 0.0):
+        """Put an in-flight entry back at the head of its lane, pausing the lane for delay seconds"""
+        return self._run(self._requeue, entry, time.time() + delay if delay > 0 else 0, inflight=inflight)
+
+    def pause(self, account_id: str, seconds: float):
+        """Stop handing out the account's sends for the given time (rate limit, challenge)"""
+        return self._run(self._pause, account_id, time.time() + seconds)
+
+    def resume(self, account_id: str):
+        return self._run(self._pause, account_id, 0)
+
+    def recover(self, inflight: str):
+        """Return every entry of an in-flight list to the head of its lane; returns how many"""
+        return self._run(self._recover, inflight=inflight)
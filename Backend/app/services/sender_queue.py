@@ -5,6 +5,7 @@ Persian:
     - enqueue به RQ
     - در صورت تکرار بیش از حد یا failure متوالی job به DLQ (جدول یا prefix) منتقل می‌شود
     - متریک‌ها را افزایش می‌دهد و Queue length را گزارش می‌کند (best-effort)
+    - enqueue_send_many: کلیدهای idempotency با یک کوئری IN، درج همهٔ jobها در یک تراکنش و enqueue به RQ در یک pipeline
 
 English:
     Updated sender queue (RQ):
@@ -12,29 +13,53 @@ English:
     - enqueues job to RQ
     - moves repeatedly failing jobs to DLQ (simple implementation)
     - updates telemetry metrics and reports queue length
+    - keeps the approximate job counters (job_counters) in step with every status change it writes
+    - enqueue_send_many batches all of this: one IN query for idempotency keys, one transaction for
+      the Job rows, one Redis pipeline for Queue.enqueue_many and one queue-length read per batch.
+      Rows are inserted with ON CONFLICT DO NOTHING, so a key a concurrent call inserted meanwhile
+      is reported as reused instead of failing the whole batch
+    - with SENDER_QUEUE_BACKEND=lanes job ids go to per-account lanes (sender_lanes) instead of the
+      RQ list, and pause_account/resume_account hold back one account's sends; with
+      SENDER_QUEUE_BACKEND=streams they are XADDed to the sender stream (sender_streams)
 """
 
-from rq import Queue
+from rq import Queue, Retry
 from redis import Redis
-from typing import Dict, Any, Optional
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
 import os
 import json
+from app.config import SENDER_QUEUE_BACKEND
+from app.services.job_counters import JobCounters
+from app.services.sender_lanes import SenderLanes
+from app.services.sender_streams import SenderStream
 from app.services.telemetry_service import incr, gauge_set
 from app.db import engine
+from sqlalchemy import literal, union_all, update
 from sqlmodel import Session, select
-from app.models.job_model import Job
+from app.models.job_model import Job, JobArchive
 import uuid
 import time
 
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
 redis_conn = Redis.from_url(REDIS_URL)
 queue = Queue("sender", connection=redis_conn)
+lanes = SenderLanes(redis_conn)
+stream = SenderStream(redis_conn)
+job_counters = JobCounters(REDIS_URL)
 
 # DLQ settings
 DLQ_PREFIX = "dlq:sender"
 MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+DLQ_TTL = 60*60*24*30
 
-def _push_to_dlq(job_record: Job):
+SEND_FUNC = "app.services.sender_worker.process_send"
+# keeps each idempotency lookup well below the database's bound-parameter limit
+IDEMPOTENCY_LOOKUP_CHUNK = 500
+
+def dlq_entry(job_record: Job) -> Tuple[str, str]:
+    """DLQ key and JSON payload for a dead job (shared by the RQ and asyncio workers)"""
     key = f"{DLQ_PREFIX}:{job_record.job_id or job_record.id}"
     payload = {
         "job_id": job_record.job_id,
@@ -46,59 +71,224 @@ def _push_to_dlq(job_record: Job):
         "last_error": job_record.last_error,
         "timestamp": int(time.time())
     }
+    return key, json.dumps(payload)
+
+def _push_to_dlq(job_record: Job):
+    key, payload = dlq_entry(job_record)
     # store as JSON string with TTL (e.g., 30 days)
-    redis_conn.set(key, json.dumps(payload), ex=60*60*24*30)
+    redis_conn.set(key, payload, ex=DLQ_TTL)
+
+def account_of(action: Dict[str, Any]) -> Optional[str]:
+    """The account an action sends for (on the action or its event)"""
+    event = action.get("event")
+    return action.get("account_id") or (event.get("account_id") if isinstance(event, dict) else None)
+
+def lane_of(action: Dict[str, Any]) -> str:
+    """The lane an action is ordered in: its account, else its session"""
+    return str(account_of(action) or action.get("session_id") or "_")
+
+def pause_account(account_id: str, seconds: float) -> None:
+    """Hold back an account's queued sends for a while (lanes backend)"""
+    lanes.pause(account_id, seconds)
+
+def resume_account(account_id: str) -> None:
+    lanes.resume(account_id)
 
 def enqueue_send(action: Dict[str, Any], idempotency_key: Optional[str] = None) -> Dict[str, Any]:
+    return enqueue_send_many([action], [idempotency_key])[0]
+
+def _count_transition(job: Job, old: str, new: str) -> None:
+    if old != new:
+        job_counters.apply_sync(Counter({(job.account_id, job.job_type, old): -1, (job.account_id, job.job_type, new): 1}))
+
+def _existing_jobs(db: Session, keys: List[str]) -> Dict[str, Any]:
+    """
+    (job_id, status) rows of the jobs holding these idempotency keys, live or archived (archiving
+    drops a key from the unique index); a live job wins over an archived one
+    """
+    existing: Dict[str, Any] = {}
+    for i in range(0, len(keys), IDEMPOTENCY_LOOKUP_CHUNK):
+        chunk = keys[i:i + IDEMPOTENCY_LOOKUP_CHUNK]
+        stmt = union_all(*(
+            select(model.idempotency_key, model.job_id, model.status, literal(live).label("live"))
+            .where(model.idempotency_key.in_(chunk))
+            for model, live in ((Job, 1), (JobArchive, 0))
+        ))
+        for row in db.exec(stmt):
+            if row.live or row.idempotency_key not in existing:
+                existing[row.idempotency_key] = row
+    return existing
+
+def _insert_new(db: Session, rows: List[Dict[str, Any]]) -> set:
+    """Insert Job rows, skipping idempotency keys that already exist; returns the inserted job ids"""
+    if db.bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    inserted = set()
+    for i in range(0, len(rows), IDEMPOTENCY_LOOKUP_CHUNK):
+        stmt = (
+            insert(Job)
+            .values(rows[i:i + IDEMPOTENCY_LOOKUP_CHUNK])
+            .on_conflict_do_nothing(index_elements=["idempotency_key"])
+            .returning(Job.job_id)
+        )
+        inserted.update(db.exec(stmt).scalars().all())
+    return inserted
+
+def enqueue_send_many(actions: List[Dict[str, Any]], idempotency_keys: Optional[List[Optional[str]]] = None) -> List[Dict[str, Any]]:
+    """
+    Persian:
+        چند action را با هم در صف می‌گذارد؛ برای هر action یک نتیجه مانند enqueue_send برمی‌گرداند.
+        کلیدهای تکراری (در DB یا داخل همین دسته) job قبلی را برمی‌گردانند.
+
+    English:
+        Enqueue several send actions in one call; returns one enqueue_send-style result per action.
+        Keys already in the DB (including ones a concurrent call inserts meanwhile), or repeated
+        within the batch, reuse the earlier job. Job rows are committed before the RQ enqueue so a
+        worker always finds its record; if the enqueue fails the new rows are marked failed and the
+        error is raised.
+    """
+    keys = list(idempotency_keys) if idempotency_keys is not None else [None] * len(actions)
+    if len(keys) != len(actions):
+        raise ValueError("idempotency_keys must have one entry per action")
+    results: List[Optional[Dict[str, Any]]] = [None] * len(actions)
     with Session(engine) as db:
-        if idempotency_key:
-            stmt = select(Job).where(Job.idempotency_key == idempotency_key)
-            existing = db.exec(stmt).first()
-            if existing:
-                return {"ok": True, "job_id": existing.job_id, "reused": True, "status": existing.status}
-        # create Job record
-        job_uuid = str(uuid.uuid4())
-        job = Job(job_id=job_uuid, idempotency_key=idempotency_key, job_type="send", payload=json.dumps(action), status="queued", attempts=0)
-        db.add(job)
-        db.commit()
-        db.refresh(job)
-        # enqueue actual worker function
-        rq_job = queue.enqueue("app.services.sender_worker.process_send", action, job_id=job_uuid, retry=MAX_ATTEMPTS)
-        job.job_id = rq_job.get_id() if rq_job.get_id() else job_uuid
-        db.add(job)
+        existing = _existing_jobs(db, list({k for k in keys if k}))
+        batch_keys: Dict[str, str] = {}
+        new_rows: List[Dict[str, Any]] = []
+        enqueue_data = []
+        now = datetime.utcnow()
+        for i, (action, key) in enumerate(zip(actions, keys)):
+            if key and key in existing:
+                job = existing[key]
+                results[i] = {"ok": True, "job_id": job.job_id, "reused": True, "status": job.status}
+                continue
+            if key and key in batch_keys:
+                results[i] = {"ok": True, "job_id": batch_keys[key], "reused": True, "status": "queued"}
+                continue
+            job_uuid = str(uuid.uuid4())
+            if key:
+                batch_keys[key] = job_uuid
+            new_rows.append(dict(job_id=job_uuid, idempotency_key=key, job_type="send", payload=json.dumps(action),
+                                 status="queued", attempts=0, account_id=account_of(action), created_at=now, updated_at=now))
+            enqueue_data.append((action, job_uuid))
+            results[i] = {"ok": True, "job_id": job_uuid, "reused": False}
+        if not new_rows:
+            return results
+
+        inserted = _insert_new(db, new_rows)
         db.commit()
-        incr("jobs_enqueued")
-        # best-effort queue length (approx)
+        if len(inserted) < len(new_rows):
+            # lost the race for these keys to a concurrent call: report its jobs instead
+            lost = {row["job_id"]: row["idempotency_key"] for row in new_rows if row["job_id"] not in inserted}
+            winners = _existing_jobs(db, list(set(lost.values())))
+            for i, result in enumerate(results):
+                key = lost.get(result["job_id"])
+                if key:
+                    job = winners[key]
+                    results[i] = {"ok": True, "job_id": job.job_id, "reused": True, "status": job.status}
+            new_rows = [row for row in new_rows if row["job_id"] in inserted]
+            enqueue_data = [(action, job_uuid) for action, job_uuid in enqueue_data if job_uuid in inserted]
+            if not new_rows:
+                return results
+        new_counts = Counter((row["account_id"], row["job_type"]) for row in new_rows)
+        job_counters.apply_sync(Counter({(account_id, job_type, "queued"): n for (account_id, job_type), n in new_counts.items()}))
+        try:
+            if SENDER_QUEUE_BACKEND == "lanes":
+                lanes.push([(lane_of(action), job_uuid) for action, job_uuid in enqueue_data])
+            elif SENDER_QUEUE_BACKEND == "streams":
+                stream.push([(lane_of(action), job_uuid) for action, job_uuid in enqueue_data])
+            else:
+                with queue.connection.pipeline() as pipe:
+                    queue.enqueue_many([
+                        Queue.prepare_data(SEND_FUNC, (action,), job_id=job_uuid, retry=Retry(max=MAX_ATTEMPTS))
+                        for action, job_uuid in enqueue_data
+                    ], pipeline=pipe)
+                    pipe.execute()
+        except Exception as e:
+            ids = [row["job_id"] for row in new_rows]
+            for i in range(0, len(ids), IDEMPOTENCY_LOOKUP_CHUNK):
+                db.exec(
+                    update(Job)
+                    .where(Job.job_id.in_(ids[i:i + IDEMPOTENCY_LOOKUP_CHUNK]))
+                    .values(status="failed", last_error=f"enqueue failed: {e}", updated_at=datetime.utcnow())
+                )
+            db.commit()
+            failed = Counter()
+            for (account_id, job_type), n in new_counts.items():
+                failed[(account_id, job_type, "queued")] -= n
+                failed[(account_id, job_type, "failed")] += n
+            job_counters.apply_sync(failed)
+            raise
+    incr("jobs_enqueued", len(new_rows))
+    # best-effort queue length (approx), read once per batch; lanes have no single length
+    if SENDER_QUEUE_BACKEND != "lanes":
         try:
-            qlen = queue.count  # may raise depending on RQ version
-            gauge_set("queue_length", qlen)
+            gauge_set("queue_length", stream.length() if SENDER_QUEUE_BACKEND == "streams" else queue.count)
         except Exception:
             pass
-        return {"ok": True, "job_id": job.job_id, "reused": False}
+    return results
 
-def handle_worker_failure(job_id: str, last_error: str):
+def _set_status(job_id: str, status: str) -> Optional[Job]:
+    with Session(engine) as db:
+        job = db.exec(select(Job).where(Job.job_id == job_id)).first()
+        if not job:
+            return None
+        old_status = job.status
+        job.status = status
+        job.updated_at = datetime.utcnow()
+        if status == "done":
+            job.completed_at = job.updated_at
+        db.add(job)
+        db.commit()
+        _count_transition(job, old_status, status)
+        return job
+
+def mark_job_processing(job_id: str) -> None:
+    """Record that a worker started the send"""
+    _set_status(job_id, "processing")
+
+def mark_job_done(job_id: str) -> None:
+    """Record a successful send"""
+    _set_status(job_id, "done")
+
+def mark_job_failed(job_id: str, last_error: str) -> Optional[Job]:
     """
     Persian:
-        هنگام شکست در worker این تابع فراخوانی شود تا وضعیت job به‌روزرسانی شود
-        و اگر attempts>=MAX_ATTEMPTS شود، job به DLQ منتقل شود.
+        یک تلاش ناموفق را ثبت می‌کند؛ پس از MAX_ATTEMPTS تلاش، job با وضعیت dead به DLQ منتقل می‌شود.
 
     English:
-        Must be called when a worker records a failure. Updates Job in DB and moves to DLQ
-        if attempts exceed MAX_ATTEMPTS.
+        Count one failed attempt; after MAX_ATTEMPTS the job becomes dead and is copied to the DLQ.
     """
+    if not job_id:
+        return None
     with Session(engine) as db:
         job = db.exec(select(Job).where(Job.job_id == job_id)).first()
         if not job:
-            return
+            return None
+        old_status = job.status
         job.attempts = (job.attempts or 0) + 1
         job.last_error = last_error
         job.status = "failed" if job.attempts < MAX_ATTEMPTS else "dead"
+        job.updated_at = datetime.utcnow()
         db.add(job)
         db.commit()
-        if job.attempts >= MAX_ATTEMPTS:
+        db.refresh(job)
+        _count_transition(job, old_status, job.status)
+        if job.status == "dead":
             _push_to_dlq(job)
-            # optional: remove job from active queue or mark dead
-            job.status = "dead"
-            db.add(job)
-            db.commit()
-        incr("jobs_failed")
+        return job
+
+def handle_worker_failure(job_id: str, last_error: str):
+    """
+    Persian:
+        هنگام شکست در worker این تابع فراخوانی شود تا وضعیت job به‌روزرسانی شود
+        و اگر attempts>=MAX_ATTEMPTS شود، job به DLQ منتقل شود.
+
+    English:
+        Must be called when a worker records a failure. Updates Job in DB and moves to DLQ
+        if attempts exceed MAX_ATTEMPTS.
+    """
+    mark_job_failed(job_id, last_error)
+    incr("jobs_failed")
@@ -0,0 +1,38 @@
+"""
+Persian:
+    صف ارسال روی Redis Streams: هر job با XADD به stream اضافه می‌شود و workerها در یک consumer group
+    دسته‌ای با XREADGROUP می‌خوانند، پس از پایان XACK و XDEL می‌کنند و ورودی‌های معلق worker مرده را با
+    XAUTOCLAIM پس می‌گیرند. تعداد تحویل هر ورودی معیار dead-letter است و ورودی‌های مرده در stream جداگانه ثبت می‌شوند.
+
+English:
+    Sender queue on Redis Streams. enqueue_send XADDs one entry per job (job id and lane) to
+    sender:stream; workers of the sender-workers consumer group read batches with XREADGROUP,
+    XACK + XDEL entries when finished and XAUTOCLAIM entries another consumer left pending for
+    SENDER_STREAM_CLAIM_IDLE seconds (crashed or stuck worker). XPENDING shows all in-flight work
+    and each entry's delivery count, which is what JOB_MAX_ATTEMPTS dead-lettering is measured
+    against; dead entries go to the capped sender:stream:dead stream instead of loose string keys.
+
+    push() returns whatever the client's pipeline returns, so the same class serves the sync
+    client (enqueue side) and the asyncio client (await the result).
+"""
+
+from typing import Any, Iterable, Tuple
+
+
+class SenderStream:
+    def __init__(self, client: Any):
+        self.redis = client
+        self.STREAM_KEY = "sender:stream"
+        self.GROUP = "sender-workers"
+        self.DEAD_KEY = "sender:stream:dead"
+
+    def push(self, items: Iterable[Tuple[str, str]]):
+        """XADD (lane, job_id) pairs in one pipelined round-trip"""
+        pipe = self.redis.pipeline(transaction=False)
+        for lane, job_id in items:
+            pipe.xadd(self.STREAM_KEY, {"job_id": job_id, "lane": lane})
+        return pipe.execute()
+
+    def length(self):
+        """Entries not yet acknowledged and deleted (queued plus in flight)"""
+        return self.redis.xlen(self.STREAM_KEY)
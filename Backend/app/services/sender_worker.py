@@ -12,22 +12,31 @@ English:
     - marks the job as processing,
     - attempts to perform a real send using SessionManager and the Insta client,
     - marks job done on success or failed on exception.
+    perform_send is the async send itself; the long-lived asyncio worker (async_sender_worker)
+    awaits it directly, while this RQ entry point runs it in one event loop per job.
 """
 
 from rq import get_current_job
 from app.services.sender_queue import mark_job_processing, mark_job_done, mark_job_failed
 from app.services.telemetry_service import incr
 from app.services.session_manager import SessionManager
-from app.db import engine
+from app.services.client_pool import call_client, get_client_pool
+from app.database.sessions_repository import SessionsRepository
+from app.db import engine, make_async_engine
 from sqlmodel import Session, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.pool import NullPool
 from app.models.job_model import Job
 import time
 import json
 import traceback
 import asyncio
 
-# SessionManager singleton for worker usage (sync worker will call async methods via asyncio.run)
-_sm = SessionManager()
+# SessionManager singleton for worker usage (sync worker will call async methods via asyncio.run).
+# Clients come from the process-wide pool so consecutive jobs for a session reuse a warm client.
+# Every asyncio.run() is a new event loop, so DB connections must not be pooled across calls.
+_worker_sessions = async_sessionmaker(make_async_engine(poolclass=NullPool), class_=AsyncSession, expire_on_commit=False)
+_sm = SessionManager(SessionsRepository(_worker_sessions), client_pool=get_client_pool())
 
 def _find_job_record_by_rq():
     rq_job = get_current_job()
@@ -38,35 +47,41 @@ def _find_job_record_by_rq():
         rec = db.exec(select(Job).where(Job.job_id == job_id)).first()
         return rec
 
-def _perform_send_via_session(session_id: str, action: dict):
+async def perform_send(sm: SessionManager, session_id: str, action: dict):
     """
     Persian:
-        تابع کمکی که از SessionManager استفاده می‌کند تا client را بازیابی کند و در صورت وجود
-        متد send_direct_message آن را فراخوانی نماید.
+        client را از SessionManager (استخر کلاینت گرم) می‌گیرد و در صورت وجود send_direct_message را فراخوانی می‌کند.
 
     English:
-        Helper that uses SessionManager to retrieve client and call send_direct_message if available.
+        Get the session's client from the SessionManager (warm client pool) and call send_direct_message
+        if available. Blocking (sync) client methods run in a thread so the event loop stays free.
     """
-    try:
-        # SessionManager._ensure_client is async; we run it in an event loop
-        client = asyncio.run(_sm._ensure_client(session_id))
-        # prefer send_direct_message if available
-        send_fn = getattr(client, "send_direct_message", None)
-        if callable(send_fn):
-            # action may contain target and message
-            target = action.get("target") or action.get("event", {}).get("target")
-            message = action.get("message") or action.get("event", {}).get("message") or action.get("event")
-            # allow send_fn to be sync or async
-            if asyncio.iscoroutinefunction(send_fn):
-                res = asyncio.run(send_fn(target, message))
-            else:
-                res = send_fn(target, message)
-            return res
+    client = await sm._ensure_client(session_id)
+    # prefer send_direct_message if available
+    send_fn = getattr(client, "send_direct_message", None)
+    if not callable(send_fn):
         # fallback: no send capability
         return {"ok": False, "error": "no_send_implementation"}
+    # action may contain target and message
+    target = action.get("target") or action.get("event", {}).get("target")
+    message = action.get("message") or action.get("event", {}).get("message") or action.get("event")
+    try:
+        return await call_client(send_fn, target, message)
     except Exception as e:
+        # a logged-out client must not stay in the pool for the session's next send
+        await sm.discard_client_on_auth_error(session_id, e)
         raise
 
+def _perform_send_via_session(session_id: str, action: dict):
+    """
+    Persian:
+        نسخهٔ sync برای RQ: perform_send را در یک event loop اجرا می‌کند.
+
+    English:
+        Sync wrapper for RQ: runs perform_send in a single event loop for the job.
+    """
+    return asyncio.run(perform_send(_sm, session_id, action))
+
 def process_send(action: dict):
     """
     Persian:
@@ -13,15 +13,28 @@ from datetime import datetime
 import asyncio
 import logging
 from .insta_client_factory import InstaClientFactory, encrypt_session_bytes, decrypt_session_token
+from .client_pool import ClientPool, client_key, get_client_pool, maybe_await
 from app.schemas.session_schema import SessionCreateIn, SessionOut
 from app.schemas.media_schema import MediaItem
 
 logger = logging.getLogger(__name__)
 
 class SessionManager:
-    def __init__(self, db):
+    def __init__(self, db, client_pool: Optional[ClientPool] = None):
         self.db = db
-        self._clients = {}
+        self._clients = client_pool if client_pool is not None else get_client_pool()
+        # session id -> account id, so clients are pooled per account like the job processor does
+        self._accounts: Dict[str, str] = {}
+
+    async def _pool_key(self, session_id: str) -> str:
+        account_id = self._accounts.get(session_id)
+        if account_id is None:
+            meta = await self.db.get_session(session_id)
+            account_id = getattr(meta, "account_id", None) if meta else None
+            if not account_id:
+                return f"session:{session_id}"
+            self._accounts[session_id] = account_id
+        return client_key(account_id)
 
     async def create_session(
         self,
@@ -43,7 +56,8 @@ class SessionManager:
         if proxy_enabled and proxy:
             client.set_proxy(proxy)
         
-        self._clients[meta.id] = client
+        self._accounts[meta.id] = account_id
+        self._clients.put(client_key(account_id), client)
         return meta
 
     async def login_and_probe(
@@ -84,23 +98,26 @@ class SessionManager:
 
     async def _ensure_client(self, session_id: str):
         """Ensure client exists and is configured / اطمینان از وجود و پیکربندی کلاینت"""
-        if session_id not in self._clients:
-            self._clients[session_id] = InstaClientFactory.create_new()
-
+        async def _setup(client):
             # Try to restore session if we have metadata
             meta = await self.db.get_session(session_id)
-            if meta and meta.session_blob:
+            session_blob = getattr(meta, "session_blob", None) if meta else None
+            if session_blob:
                 try:
-                    session_bytes = decrypt_session_token(meta.session_blob)
-                    await self._clients[session_id].load_session_bytes(session_bytes)
+                    session_bytes = decrypt_session_token(session_blob)
+                    await maybe_await(client.load_session_bytes(session_bytes))
                 except Exception:
                     logger.warning(f"Failed to restore session {session_id}")
 
             # Apply proxy if enabled
             if meta and meta.proxy_enabled and meta.proxy:
-                self._clients[session_id].set_proxy(meta.proxy)
+                client.set_proxy(meta.proxy)
+
+        return await self._clients.acquire(await self._pool_key(session_id), setup=_setup)
 
-        return self._clients[session_id]
+    async def discard_client_on_auth_error(self, session_id: str, exc: BaseException) -> bool:
+        """Drop the session's pooled client when exc is a login/challenge error / حذف کلاینت پس از خطای احراز هویت"""
+        return self._clients.invalidate_on_auth_error(await self._pool_key(session_id), exc)
 
     async def get_session(self, session_id: str) -> Optional[SessionOut]:
         """Get session metadata / دریافت متادیتای سشن"""
@@ -108,8 +125,8 @@ class SessionManager:
 
     async def delete_session(self, session_id: str):
         """Delete session / حذف سشن"""
-        if session_id in self._clients:
-            del self._clients[session_id]
+        self._clients.invalidate(await self._pool_key(session_id))
+        self._accounts.pop(session_id, None)
         await self.db.delete_session(session_id)
 
     async def update_session(self, session_id: str, **updates):
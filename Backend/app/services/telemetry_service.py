@@ -62,6 +62,56 @@ LOGIN_ERRORS    = Counter(
     "Total number of login errors",
     registry=REGISTRY,
 )
+CLIENT_POOL_HITS      = Counter(
+    "insta_client_pool_hits_total",
+    "Total number of client pool lookups served by a warm client",
+    registry=REGISTRY,
+)
+CLIENT_POOL_MISSES    = Counter(
+    "insta_client_pool_misses_total",
+    "Total number of client pool lookups that built a new client",
+    registry=REGISTRY,
+)
+JOB_ACCOUNT_TIMEOUTS  = Counter(
+    "insta_job_account_timeouts_total",
+    "Total number of accounts that exceeded their per-cycle time budget",
+    registry=REGISTRY,
+)
+COMMENT_FETCHES_SAVED = Counter(
+    "insta_comment_fetches_saved_total",
+    "Comment API calls avoided by fetching each media once for all rules attached to it",
+    registry=REGISTRY,
+)
+REPLY_BLOOM_NEGATIVES = Counter(
+    "insta_reply_bloom_negatives_total",
+    "Reply-history lookups answered by the Bloom filter without a Redis call",
+    registry=REGISTRY,
+)
+REPLY_BLOOM_FALSE_POSITIVES = Counter(
+    "insta_reply_bloom_false_positives_total",
+    "Bloom filter positives that the exact reply-history set did not confirm",
+    registry=REGISTRY,
+)
+CLIENT_POOL_EVICTIONS = Counter(
+    "insta_client_pool_evictions_total",
+    "Total number of clients evicted from the pool (LRU)",
+    registry=REGISTRY,
+)
+CLIENT_POOL_AUTH_INVALIDATIONS = Counter(
+    "insta_client_pool_auth_invalidations_total",
+    "Total number of pooled clients dropped after a login/challenge error",
+    registry=REGISTRY,
+)
+INBOUND_EVENTS = Counter(
+    "insta_inbound_events_total",
+    "Inbound webhook events evaluated against rules",
+    registry=REGISTRY,
+)
+INBOUND_MATCHES = Counter(
+    "insta_inbound_matches_total",
+    "Rule matches produced by inbound webhook events",
+    registry=REGISTRY,
+)
 
 # Histogram
 REQUEST_LATENCY = Histogram(
@@ -69,6 +119,24 @@ REQUEST_LATENCY = Histogram(
     "Request latency seconds",
     registry=REGISTRY,
 )
+JOB_CYCLE_DURATION = Histogram(
+    "insta_job_cycle_duration_seconds",
+    "Duration of one JobProcessor cycle",
+    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 20, 30, 45, 60, 120),
+    registry=REGISTRY,
+)
+JOB_ACCOUNT_LATENCY = Histogram(
+    "insta_job_account_latency_seconds",
+    "Time spent processing the rules of a single account in a cycle",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 45),
+    registry=REGISTRY,
+)
+INBOUND_BATCH_DURATION = Histogram(
+    "insta_inbound_batch_duration_seconds",
+    "Time to match and enqueue one batch of inbound events",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+    registry=REGISTRY,
+)
 
 # Gauges
 QUEUE_LENGTH    = Gauge(
@@ -81,6 +149,16 @@ ACTIVE_CLIENTS  = Gauge(
     "Number of runtime instantiated clients",
     registry=REGISTRY,
 )
+REPLY_BLOOM_MEMORY = Gauge(
+    "insta_reply_bloom_memory_bytes",
+    "Memory held by in-process reply-history Bloom filters",
+    registry=REGISTRY,
+)
+REPLY_BLOOM_FP_RATE = Gauge(
+    "insta_reply_bloom_estimated_fp_rate",
+    "Highest estimated false-positive rate among loaded reply-history Bloom filters",
+    registry=REGISTRY,
+)
 
 
 def incr(metric_name: str, amount: int = 1) -> None:
@@ -104,6 +182,26 @@ def incr(metric_name: str, amount: int = 1) -> None:
         LOGIN_ATTEMPTS.inc(amount)
     elif metric_name == "login_errors":
         LOGIN_ERRORS.inc(amount)
+    elif metric_name == "client_pool_hits":
+        CLIENT_POOL_HITS.inc(amount)
+    elif metric_name == "client_pool_misses":
+        CLIENT_POOL_MISSES.inc(amount)
+    elif metric_name == "client_pool_evictions":
+        CLIENT_POOL_EVICTIONS.inc(amount)
+    elif metric_name == "client_pool_auth_invalidations":
+        CLIENT_POOL_AUTH_INVALIDATIONS.inc(amount)
+    elif metric_name == "job_account_timeouts":
+        JOB_ACCOUNT_TIMEOUTS.inc(amount)
+    elif metric_name == "comment_fetches_saved":
+        COMMENT_FETCHES_SAVED.inc(amount)
+    elif metric_name == "reply_bloom_negatives":
+        REPLY_BLOOM_NEGATIVES.inc(amount)
+    elif metric_name == "reply_bloom_false_positives":
+        REPLY_BLOOM_FALSE_POSITIVES.inc(amount)
+    elif metric_name == "inbound_events":
+        INBOUND_EVENTS.inc(amount)
+    elif metric_name == "inbound_matches":
+        INBOUND_MATCHES.inc(amount)
 
 
 def gauge_set(metric_name: str, value: int) -> None:
@@ -118,6 +216,10 @@ def gauge_set(metric_name: str, value: int) -> None:
         QUEUE_LENGTH.set(value)
     elif metric_name == "active_clients":
         ACTIVE_CLIENTS.set(value)
+    elif metric_name == "reply_bloom_memory_bytes":
+        REPLY_BLOOM_MEMORY.set(value)
+    elif metric_name == "reply_bloom_fp_rate":
+        REPLY_BLOOM_FP_RATE.set(value)
 
 
 def observe_latency(seconds: float) -> None:
@@ -131,6 +233,22 @@ def observe_latency(seconds: float) -> None:
     REQUEST_LATENCY.observe(seconds)
 
 
+def observe(metric_name: str, value: float) -> None:
+    """
+    Persian:
+        ثبت مقدار در Histogram بر اساس نام.
+
+    English:
+        Observe a value in a named histogram.
+    """
+    if metric_name == "job_cycle_duration":
+        JOB_CYCLE_DURATION.observe(value)
+    elif metric_name == "job_account_latency":
+        JOB_ACCOUNT_LATENCY.observe(value)
+    elif metric_name == "inbound_batch_duration":
+        INBOUND_BATCH_DURATION.observe(value)
+
+
 def get_metrics() -> Tuple[bytes, str]:
     """
     Persian:
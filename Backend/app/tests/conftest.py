@@ -6,14 +6,19 @@ Persian:
 English:
     Basic pytest fixtures for DB and Redis to run integration tests locally/CI.
     Uses tmp_path for a sqlite DB file and respects REDIS_URL env var.
+    The sender fixtures (send_client, sender_jobs) are shared by the asyncio sender worker,
+    lane and stream tests.
 """
 
 import os
 import pytest
 import asyncio
 from app.db import init_db
+from rq import Queue
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy_utils import database_exists, create_database
+from sqlmodel import Session, SQLModel, select
 
 @pytest.fixture(scope="session", autouse=True)
 def setup_env_tmp_db(tmp_path_factory):
@@ -44,3 +49,89 @@ def redis_client(redis_url):
         r.flushdb()
     except Exception:
         pass
+
+
+class ClientThrottledError(Exception):
+    pass
+
+
+class FakeSendClient:
+    """
+    Client stand-in for the sender tests: records (account_id, n) of every message sent and the
+    peak concurrency overall and per account. Sends fail for throttled accounts (as a throttling
+    error), for the first `failures` sends, or always with fail=True.
+    """
+
+    def __init__(self, fail=False, failures=0, throttled=(), delay=0.001):
+        self.fail = fail
+        self.failures = failures
+        self.throttled = set(throttled)
+        self.delay = delay
+        self.active = {}
+        self.max_active = 0
+        self.max_per_account = 0
+        self.sent = []
+
+    async def send_direct_message(self, target, message):
+        account = message.get("account_id")
+        self.active[account] = self.active.get(account, 0) + 1
+        self.max_active = max(self.max_active, sum(self.active.values()))
+        self.max_per_account = max(self.max_per_account, self.active[account])
+        await asyncio.sleep(self.delay)
+        self.active[account] -= 1
+        if account in self.throttled:
+            raise ClientThrottledError("please wait a few minutes")
+        if self.fail or self.failures:
+            self.failures = max(0, self.failures - 1)
+            raise RuntimeError("send failed")
+        self.sent.append((account, message["n"]))
+
+
+class FakeSessionManager:
+    def __init__(self, client):
+        self.client = client
+
+    async def _ensure_client(self, session_id):
+        return self.client
+
+    async def discard_client_on_auth_error(self, session_id, exc):
+        return False
+
+
+class SenderJobs:
+    """A sqlite jobs table wired into sender_queue, its async JobsRepository and a worker builder"""
+
+    def __init__(self, engine, repo, redis_url):
+        self.engine = engine
+        self.repo = repo
+        self.redis_url = redis_url
+
+    def worker(self, client, **kwargs):
+        from app.services.async_sender_worker import AsyncSenderWorker
+        kwargs.setdefault("name", "t")
+        return AsyncSenderWorker(jobs_repo=self.repo, session_manager=FakeSessionManager(client),
+                                 redis_url=self.redis_url, **kwargs)
+
+    def jobs(self):
+        from app.models.job_model import Job
+        with Session(self.engine) as db:
+            return {job.job_id: job for job in db.exec(select(Job)).all()}
+
+
+@pytest.fixture
+def send_client():
+    return FakeSendClient
+
+
+@pytest.fixture
+def sender_jobs(tmp_path, monkeypatch, redis_client, redis_url):
+    from app.database.jobs_repository import JobsRepository
+    from app.services import sender_queue
+    url = f"sqlite:///{tmp_path / 'jobs.db'}"
+    engine = create_engine(url, connect_args={"check_same_thread": False})
+    SQLModel.metadata.create_all(engine)
+    monkeypatch.setattr(sender_queue, "engine", engine)
+    monkeypatch.setattr(sender_queue, "queue", Queue("sender", connection=redis_client))
+    repo = JobsRepository(async_sessionmaker(create_async_engine(url.replace("sqlite:", "sqlite+aiosqlite:")), expire_on_commit=False))
+    return SenderJobs(engine, repo, redis_url)
+
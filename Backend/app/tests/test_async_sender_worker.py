@@ -0,0 +1,66 @@
+"""
+Persian:
+    تست worker ارسال asyncio: ارسال هم‌زمان حساب‌های مختلف، ترتیبی برای هر حساب، retry و DLQ و بازیابی idهای in-flight.
+
+English:
+    Tests for the asyncio sender worker: concurrent across accounts, serialized per account,
+    retries then DLQ, and requeueing ids left in flight.
+"""
+
+import json
+import pytest
+from app.services import sender_queue
+
+
+@pytest.mark.asyncio
+async def test_sends_run_concurrently_across_accounts_and_in_order_per_account(sender_jobs, send_client, redis_client):
+    actions = [{"session_id": "s", "event": {"account_id": f"a{i % 3}", "message": {"account_id": f"a{i % 3}", "n": i}}} for i in range(15)]
+    results = sender_queue.enqueue_send_many(actions)
+    client = send_client(delay=0.01)
+
+    await sender_jobs.worker(client, concurrency=8).drain()
+
+    assert len(client.sent) == 15
+    assert client.max_per_account == 1
+    assert client.max_active > 1
+    for account in ("a0", "a1", "a2"):
+        sent = [n for a, n in client.sent if a == account]
+        assert sent == sorted(sent)
+    assert {job.status for job in sender_jobs.jobs().values()} == {"done"}
+    assert redis_client.llen("sender:inflight:t") == 0
+    assert redis_client.hget(f"rq:job:{results[0]['job_id']}", "status") == b"finished"
+
+
+@pytest.mark.asyncio
+async def test_failing_send_is_retried_then_moved_to_dlq(sender_jobs, send_client, redis_client):
+    [result] = sender_queue.enqueue_send_many([{"session_id": "s", "event": {"message": {"account_id": "a", "n": 1}}}])
+
+    await sender_jobs.worker(send_client(fail=True), max_attempts=3, backoff_max=0).drain()
+
+    job = sender_jobs.jobs()[result["job_id"]]
+    assert (job.status, job.attempts, job.last_error) == ("dead", 3, "send failed")
+    assert json.loads(redis_client.get(f"dlq:sender:{result['job_id']}"))["attempts"] == 3
+    assert redis_client.llen("rq:queue:sender") == 0
+    assert redis_client.llen("sender:inflight:t") == 0
+
+
+@pytest.mark.asyncio
+async def test_ids_left_in_flight_are_requeued_in_order(sender_jobs, send_client, redis_client):
+    redis_client.rpush("sender:inflight:t", "j1", "j2")
+    redis_client.rpush("rq:queue:sender", "j3")
+
+    assert await sender_jobs.worker(send_client()).recover() == 2
+    assert redis_client.lrange("rq:queue:sender", 0, -1) == [b"j1", b"j2", b"j3"]
+
+
+@pytest.mark.asyncio
+async def test_live_worker_requeues_what_a_dead_worker_left_in_flight(sender_jobs, send_client, redis_client):
+    redis_client.zadd("sender:workers", {"gone": 1, "alive": 4102444800})
+    redis_client.rpush("sender:inflight:gone", "j1", "j2")
+    redis_client.rpush("sender:inflight:alive", "j3")
+
+    assert await sender_jobs.worker(send_client(), dead_after=60).heartbeat() == 2
+    assert redis_client.lrange("rq:queue:sender", 0, -1) == [b"j1", b"j2"]
+    assert redis_client.lrange("sender:inflight:alive", 0, -1) == [b"j3"]
+    assert redis_client.zscore("sender:workers", "gone") is None
+    assert redis_client.zscore("sender:workers", "t") is not None
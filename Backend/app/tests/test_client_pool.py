@@ -0,0 +1,100 @@
+"""
+Persian:
+    تست‌های واحد برای ClientPool: بازاستفاده از کلاینت گرم، حذف LRU و بارگذاری مجدد session هنگام تغییر blob.
+
+English:
+    Unit tests for ClientPool: warm client reuse, LRU eviction and session reload when the blob changes.
+"""
+
+import pytest
+from types import SimpleNamespace
+from app.services.client_pool import ClientPool, client_key
+from app.services.insta_client_factory import MockInstaClientWrapper
+from app.services.sender_worker import perform_send
+from app.services.session_manager import SessionManager
+from app.services.telemetry_service import REGISTRY
+
+
+class _CountingClient(MockInstaClientWrapper):
+    def __init__(self):
+        super().__init__()
+        self.loaded = []
+
+    def load_session_bytes(self, b):
+        self.loaded.append(b)
+
+
+@pytest.mark.asyncio
+async def test_acquire_reuses_client_and_evicts_lru():
+    built = []
+
+    def factory():
+        c = _CountingClient()
+        built.append(c)
+        return c
+
+    pool = ClientPool(factory=factory, max_size=2)
+    a = await pool.acquire("account:a", session_blob="blob-a")
+    assert await pool.acquire("account:a", session_blob="blob-a") is a
+    assert a.loaded == ["blob-a"]
+
+    await pool.acquire("account:b")
+    await pool.acquire("account:a")  # touch a so b becomes least recently used
+    await pool.acquire("account:c")
+    assert len(pool) == 2
+    assert "account:b" not in pool
+    assert "account:a" in pool
+    assert len(built) == 3
+
+
+@pytest.mark.asyncio
+async def test_acquire_reloads_session_when_blob_changes_and_runs_setup_once():
+    calls = []
+
+    async def setup(client):
+        calls.append(client)
+
+    pool = ClientPool(factory=_CountingClient, max_size=4)
+    c1 = await pool.acquire("session:1", session_blob="v1", setup=setup)
+    c2 = await pool.acquire("session:1", session_blob="v2", setup=setup)
+    assert c1 is c2
+    assert c1.loaded == ["v1", "v2"]
+    assert calls == [c1]
+
+    pool.invalidate("session:1")
+    assert pool.get("session:1") is None
+
+
+class LoginRequired(Exception):
+    pass
+
+
+class _Sessions:
+    async def get_session(self, session_id):
+        return SimpleNamespace(account_id="acct", session_blob=None, proxy_enabled=False, proxy=None)
+
+
+@pytest.mark.asyncio
+async def test_session_manager_shares_account_clients_and_drops_them_on_auth_errors():
+    pool = ClientPool(factory=_CountingClient, max_size=4)
+    sm = SessionManager(_Sessions(), client_pool=pool)
+
+    client = await sm._ensure_client("s1")
+    assert await pool.acquire(client_key("acct"), session_blob="blob") is client  # the job processor's key
+
+    async def send(target, message):
+        raise RuntimeError("network down")
+    client.send_direct_message = send
+    with pytest.raises(RuntimeError):
+        await perform_send(sm, "s1", {"target": "u", "message": "hi"})
+    assert client_key("acct") in pool
+
+    async def send(target, message):
+        raise LoginRequired("login_required")
+    client.send_direct_message = send
+    dropped = REGISTRY.get_sample_value("insta_client_pool_auth_invalidations_total")
+    with pytest.raises(LoginRequired):
+        await perform_send(sm, "s1", {"target": "u", "message": "hi"})
+    assert client_key("acct") not in pool
+    assert REGISTRY.get_sample_value("insta_client_pool_auth_invalidations_total") == dropped + 1
+    assert await sm._ensure_client("s1") is not client
@@ -0,0 +1,30 @@
+"""
+Persian:
+    تست CommentCursorStore روی Redis واقعی: mark فقط رو به جلو حرکت می‌کند.
+
+English:
+    CommentCursorStore test against a real Redis: the mark only moves forward.
+"""
+
+import pytest
+from app.services.comment_cursor_store import CommentCursorStore, is_newer
+
+
+def test_is_newer_compares_long_numeric_ids_exactly():
+    assert is_newer("18012345678901234567", "18012345678901234566")
+    assert is_newer("100", "99")
+    assert not is_newer("99", "100")
+    assert is_newer("1", None)
+
+
+@pytest.mark.asyncio
+async def test_advance_is_forward_only(redis_client, redis_url):
+    store = CommentCursorStore(redis_url)
+    assert await store.get("acct", "m1") is None
+
+    assert await store.advance("acct", "m1", "17999999999999999999") is True
+    assert await store.advance("acct", "m1", "9999") is False
+    assert await store.get("acct", "m1") == "17999999999999999999"
+
+    await store.reset("acct", "m1")
+    assert await store.get("acct", "m1") is None
@@ -0,0 +1,282 @@
+"""
+Persian:
+    تست‌های واحد JobProcessor: پردازش هم‌زمان حساب‌ها با محدودیت، ترتیب سریالی قوانین هر حساب و timeout هر حساب.
+
+English:
+    Unit tests for JobProcessor: bounded concurrent accounts, serialized rules per account and per-account timeout.
+"""
+
+import asyncio
+import time
+from datetime import datetime
+
+import pytest
+from app.schemas.rule_schema import RuleOut
+from app.services.client_pool import ClientPool
+from app.services.insta_client_factory import MockInstaClientWrapper
+from app.services.job_processor import JobProcessor
+
+
+class _RulesRepo:
+    def __init__(self, rules):
+        self.rules = rules
+
+    async def get_active_rules(self, account_id=None):
+        return self.rules
+
+
+class _JobsRepo:
+    def __init__(self):
+        self.created = []
+        self.pending = []
+        self.updated = []
+        self.released = []
+
+    async def create_job(self, job):
+        self.created.append(job)
+        return job.id
+
+    async def create_jobs_bulk(self, jobs):
+        self.created.extend(jobs)
+        return [job.id for job in jobs]
+
+    async def claim_jobs(self, worker_id, n=100, lease_seconds=300):
+        return self.pending
+
+    async def release_job(self, job, worker_id=None):
+        self.released.append(job)
+
+    async def reap_expired_leases(self):
+        return 0
+
+    async def renew_lease(self, job_id, worker_id, lease_seconds):
+        return True
+
+    async def update_job(self, job, worker_id=None):
+        self.updated.append(job)
+        return True
+
+
+class _ReplyHistory:
+    def __init__(self):
+        self.checked = []
+
+    async def filter_unreplied(self, account_id, media_id, comment_ids):
+        self.checked.extend(comment_ids)
+        return list(comment_ids)
+
+    async def record_replies(self, account_id, media_id, replies):
+        return None
+
+
+class _SlowClient:
+    """Records fetch order; media ids starting with 'slow' take long to answer."""
+
+    calls = []
+
+    def load_session_bytes(self, b):
+        return None
+
+    async def get_new_comments(self, media_id, since_id=None):
+        _SlowClient.calls.append(("start", media_id))
+        await asyncio.sleep(0.5 if media_id.startswith("slow") else 0.01)
+        _SlowClient.calls.append(("end", media_id))
+        return []
+
+
+class _BlockingClient:
+    """Sync client like InstaClientRealWrapper: every call blocks its thread."""
+
+    calls = []
+
+    def load_session_bytes(self, b):
+        time.sleep(0.05)
+
+    def get_new_comments(self, media_id, since_id=None):
+        _BlockingClient.calls.append(("start", media_id))
+        time.sleep(0.5 if media_id.startswith("slow") else 0.2)
+        _BlockingClient.calls.append(("end", media_id))
+        return []
+
+
+def _rule(i, account_id, media_id, condition="{}", replies=()):
+    now = datetime.utcnow()
+    return RuleOut(id=str(i), account_id=account_id, name=f"r{i}", condition=condition, media_id=media_id,
+                   replies=list(replies), created_at=now, updated_at=now)
+
+
+def _processor(rules, client_pool=None, **kwargs):
+    return JobProcessor(
+        client_factory=None,
+        jobs_repo=_JobsRepo(),
+        rules_repo=_RulesRepo(rules),
+        rate_limiter=None,
+        reply_history=_ReplyHistory(),
+        client_pool=client_pool if client_pool is not None else ClientPool(factory=_SlowClient, max_size=8),
+        **kwargs,
+    )
+
+
+@pytest.mark.asyncio
+async def test_slow_account_does_not_stall_others_and_rules_stay_serialized():
+    _SlowClient.calls = []
+    rules = [_rule(1, "a", "slow_1"), _rule(2, "b", "fast_1"), _rule(3, "a", "fast_2")]
+    processor = _processor(rules, account_concurrency=4, account_timeout=5)
+
+    await processor._process_cycle()
+
+    calls = _SlowClient.calls
+    # account b finished while account a was still waiting on its slow media
+    assert calls.index(("end", "fast_1")) < calls.index(("end", "slow_1"))
+    # rules of account a ran one after another
+    assert calls.index(("end", "slow_1")) < calls.index(("start", "fast_2"))
+
+
+@pytest.mark.asyncio
+async def test_account_timeout_bounds_cycle_duration():
+    _SlowClient.calls = []
+    rules = [_rule(1, "a", "slow_1"), _rule(2, "a", "slow_2"), _rule(3, "b", "fast_1")]
+    processor = _processor(rules, account_concurrency=2, account_timeout=0.2)
+
+    started = time.perf_counter()
+    await processor._process_cycle()
+
+    assert time.perf_counter() - started < 0.5
+    assert ("end", "fast_1") in _SlowClient.calls
+    assert ("start", "slow_2") not in _SlowClient.calls
+
+
+@pytest.mark.asyncio
+async def test_blocking_client_calls_overlap_across_accounts_and_time_out():
+    _BlockingClient.calls = []
+    rules = [_rule(1, "a", "fast_1"), _rule(2, "b", "fast_2"), _rule(3, "c", "slow_1"), _rule(4, "c", "slow_2")]
+    pool = ClientPool(factory=_BlockingClient, max_size=8)
+    processor = _processor(rules, client_pool=pool, account_concurrency=3, account_timeout=0.3)
+
+    started = time.perf_counter()
+    await processor._process_cycle()
+    elapsed = time.perf_counter() - started
+
+    # run serially on the loop the two fast fetches alone would take 0.4s and the slow one could not be cut short
+    assert elapsed < 0.45
+    calls = _BlockingClient.calls
+    assert calls.index(("start", "fast_2")) < calls.index(("end", "fast_1"))
+    assert ("start", "slow_2") not in calls
+
+
+@pytest.mark.asyncio
+async def test_each_media_is_fetched_once_for_all_attached_rules():
+    _SlowClient.calls = []
+    rules = [_rule(1, "a", "fast_1"), _rule(2, "a", "fast_1"), _rule(3, "a", "fast_2"), _rule(4, "b", "fast_1")]
+    processor = _processor(rules)
+
+    plan = processor._plan_cycle(rules)
+    assert [r.id for r in plan["a"]["fast_1"]] == ["1", "2"]
+
+    await processor._process_cycle()
+
+    starts = [media for event, media in _SlowClient.calls if event == "start"]
+    assert sorted(starts) == ["fast_1", "fast_1", "fast_2"]
+
+
+class _MemoryCursors:
+    def __init__(self):
+        self.marks = {}
+
+    async def get(self, account_id, media_id):
+        return self.marks.get((account_id, media_id))
+
+    async def advance(self, account_id, media_id, comment_id):
+        self.marks[(account_id, media_id)] = comment_id
+        return True
+
+
+@pytest.mark.asyncio
+async def test_quiet_media_costs_no_work_after_mark_advances():
+    cursors = _MemoryCursors()
+    processor = _processor(
+        [_rule(1, "a", "m_1")],
+        client_pool=ClientPool(factory=MockInstaClientWrapper, max_size=8),
+        comment_cursors=cursors,
+    )
+
+    await processor._process_cycle()
+    assert cursors.marks[("a", "m_1")] == "5"
+    assert len(processor._reply_history.checked) == 5
+
+    await processor._process_cycle()
+    assert len(processor._reply_history.checked) == 5
+
+
+@pytest.mark.asyncio
+async def test_first_matching_rule_in_order_answers_each_comment():
+    rules = [
+        _rule(1, "a", "m_1", '{"in": ["comment 2", {"var": "text"}]}', replies=["two"]),
+        _rule(2, "a", "m_1", '{"and": [{"in": ["on m_1", {"var": "text"}]}, {"!=": [{"var": "username"}, "user_4"]}]}', replies=["hi"]),
+        _rule(3, "a", "m_1", '{"in": ["nowhere", {"var": "text"}]}', replies=["never"]),
+    ]
+    processor = _processor(rules, client_pool=ClientPool(factory=MockInstaClientWrapper, max_size=8))
+
+    await processor._process_cycle()
+
+    answered = {job.comment_id: (job.rule_id, job.payload["reply_text"]) for job in processor._jobs_repo.created}
+    assert answered == {"1": ("2", "hi"), "2": ("1", "two"), "3": ("2", "hi"), "5": ("2", "hi")}
+
+
+class _ScheduledLimiter:
+    """
+    Account 'slow' is eligible 0.2 s later; account 'never' only after the dispatch horizon;
+    account 'jittered' holds its slot but jitter puts it just past the horizon.
+    """
+
+    def __init__(self):
+        self.checked = []
+
+    async def check(self, job):
+        now = time.time()
+        self.checked.append(job.account_id)
+        if job.account_id == "slow":
+            return True, now + 0.2
+        if job.account_id == "jittered":
+            return True, now + 0.4
+        if job.account_id == "never":
+            return False, now + 3600
+        return True, now
+
+
+class _ReplyClient:
+    sent = []
+
+    def load_session_bytes(self, b):
+        return None
+
+    async def reply_to_comment(self, media_id, comment_id, text):
+        _ReplyClient.sent.append(comment_id)
+
+
+@pytest.mark.asyncio
+async def test_pending_jobs_dispatch_in_eligible_order_without_blocking():
+    from app.schemas.job_schema import JobItem, JobStatus
+
+    jobs = [
+        JobItem(id=acct, type="reply", status=JobStatus.PENDING, rule_id="r", media_id="m", target_user_id="u",
+                comment_id=acct, payload={"reply_text": "hi"}, account_id=acct)
+        for acct in ("slow", "never", "fast_1", "fast_2", "jittered")
+    ]
+    processor = _processor([], client_pool=ClientPool(factory=_ReplyClient, max_size=8))
+    processor._rate_limiter = limiter = _ScheduledLimiter()
+    processor._dispatch_horizon = 0.3
+    processor._jobs_repo.pending = jobs
+    _ReplyClient.sent = []
+
+    started = time.perf_counter()
+    await processor._process_pending_jobs()
+
+    assert _ReplyClient.sent == ["fast_1", "fast_2", "slow", "jittered"]
+    # a reserved job past the horizon is run, not released to reserve a second slot next cycle
+    assert limiter.checked.count("jittered") == 1
+    assert time.perf_counter() - started < 1
+    assert all(job.status == JobStatus.COMPLETED for job in processor._jobs_repo.updated)
+    # not eligible within this cycle: handed back instead of held
+    assert processor._jobs_repo.released == [jobs[1]]
+
@@ -0,0 +1,209 @@
+"""
+Persian:
+    تست JobsRepository: claim اتمیک jobها بین چند worker و آزادسازی leaseهای منقضی،
+    فهرست فیلترشده با keyset و شمارنده‌های تقریبی وضعیت.
+
+English:
+    JobsRepository tests: atomic job claims across workers and release of expired leases,
+    filtered keyset listing and the approximate per-status counters.
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+from sqlmodel import SQLModel
+from app.database.jobs_repository import JobsRepository
+from app.models.job_model import Job, JobArchive
+from app.schemas.job_schema import JobItem, JobStatus
+from app.services.job_counters import JobCounters
+
+
+async def _repo(counters=None):
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    return JobsRepository(async_sessionmaker(engine, expire_on_commit=False), counters=counters)
+
+
+async def _add_jobs(repo, n):
+    for i in range(n):
+        await repo.create_job(JobItem(
+            id=f"j{i}", type="reply", status=JobStatus.PENDING, rule_id="r", media_id="m",
+            target_user_id="u", comment_id=str(i), payload={"reply_text": "hi"}, account_id="a",
+            created_at=datetime.utcnow() + timedelta(seconds=i)
+        ))
+
+
+@pytest.mark.asyncio
+async def test_claims_are_disjoint_and_released_jobs_come_back():
+    repo = await _repo()
+    await _add_jobs(repo, 5)
+
+    first = await repo.claim_jobs("w1", n=3, lease_seconds=60)
+    second = await repo.claim_jobs("w2", n=3, lease_seconds=60)
+    assert [j.id for j in first] == ["j0", "j1", "j2"]
+    assert [j.id for j in second] == ["j3", "j4"]
+    assert first[0].payload == {"reply_text": "hi"} and first[0].attempts == 1
+    assert await repo.claim_jobs("w3") == []
+
+    await repo.release_job(second[0])
+    again = await repo.claim_jobs("w3")
+    assert [(j.id, j.attempts) for j in again] == [("j3", 1)]
+
+
+@pytest.mark.asyncio
+async def test_reaper_returns_expired_leases_to_pending():
+    repo = await _repo()
+    await _add_jobs(repo, 2)
+    claimed = await repo.claim_jobs("crashed", lease_seconds=60)
+    assert len(claimed) == 2
+
+    done = claimed[0]
+    done.status = JobStatus.COMPLETED
+    await repo.update_job(done)
+    async with repo.session() as db:
+        await db.execute(update(Job).where(Job.job_id == "j1").values(lease_expires_at=datetime.utcnow() - timedelta(seconds=1)))
+        await db.commit()
+
+    assert await repo.reap_expired_leases() == 1
+    assert [j.id for j in await repo.claim_jobs("w2")] == ["j1"]
+
+
+@pytest.mark.asyncio
+async def test_worker_that_lost_its_lease_cannot_record_a_result():
+    repo = await _repo()
+    await _add_jobs(repo, 1)
+    [stale] = await repo.claim_jobs("w1", lease_seconds=-1)
+    assert await repo.reap_expired_leases() == 1
+    [fresh] = await repo.claim_jobs("w2")
+
+    stale.status = JobStatus.COMPLETED
+    assert await repo.renew_lease(stale.id, "w1", 60) is False
+    assert await repo.update_job(stale, "w1") is False
+    await repo.release_job(stale, "w1")
+    assert await repo.renew_lease(fresh.id, "w2", 60) is True
+    fresh.status = JobStatus.COMPLETED
+    assert await repo.update_job(fresh, "w2") is True
+
+
+@pytest.mark.asyncio
+async def test_job_whose_lease_expires_on_every_attempt_fails():
+    repo = await _repo()
+    await _add_jobs(repo, 1)
+    for _ in range(JobsRepository.MAX_ATTEMPTS):
+        assert len(await repo.claim_jobs("crashing", lease_seconds=-1)) == 1
+        assert await repo.reap_expired_leases() == 1
+
+    job = await repo.get_job("j0")
+    assert (job.status, job.attempts) == (JobStatus.FAILED, JobsRepository.MAX_ATTEMPTS)
+    assert await repo.claim_jobs("w2") == []
+
+
+@pytest.mark.asyncio
+async def test_bulk_insert_skips_existing_idempotency_keys():
+    repo = await _repo()
+
+    def job(i):
+        return JobItem(type="reply", status=JobStatus.PENDING, rule_id="r", media_id="m", target_user_id="u",
+                       comment_id=str(i), payload={}, account_id="a", idempotency_key=f"reply:a:{i}")
+
+    first = await repo.create_jobs_bulk([job(i) for i in range(1200)])
+    assert len(first) == 1200
+    again = await repo.create_jobs_bulk([job(i) for i in range(1195, 1205)])
+    assert len(again) == 5
+    async with repo.session() as db:
+        assert await db.scalar(select(func.count()).select_from(Job)) == 1205
+
+
+@pytest.mark.asyncio
+async def test_finished_jobs_move_to_archive():
+    repo = await _repo()
+    await _add_jobs(repo, 4)
+    claimed = await repo.claim_jobs("w1", n=2)
+    for job in claimed:
+        job.status = JobStatus.COMPLETED
+        await repo.update_job(job)
+
+    assert await repo.archive_finished_jobs(timedelta(hours=1)) == 0
+    assert await repo.archive_finished_jobs(timedelta(seconds=-1), batch_size=1) == 2
+
+    async with repo.session() as db:
+        archived = (await db.execute(select(JobArchive.job_id).order_by(JobArchive.id))).scalars().all()
+        assert archived == ["j0", "j1"]
+        assert await db.scalar(select(func.count()).select_from(Job)) == 2
+    assert await repo.purge_archive(timedelta(seconds=-60)) == 2
+
+
+@pytest.mark.asyncio
+async def test_list_jobs_filters_and_seeks_without_gaps():
+    repo = await _repo()
+    await _add_jobs(repo, 7)
+    await repo.create_job(JobItem(
+        id="other", type="dm", status=JobStatus.PENDING, rule_id="r", media_id="m",
+        target_user_id="u", payload={}, account_id="b"
+    ))
+
+    seen, after = [], None
+    while True:
+        items, after = await repo.list_jobs(account_id="a", job_type="reply", limit=3, after=after)
+        seen.extend(j.id for j in items)
+        if after is None:
+            break
+    assert seen == [f"j{i}" for i in range(6, -1, -1)]
+
+    items, _ = await repo.list_jobs(status="pending", account_id="b")
+    assert [j.id for j in items] == ["other"]
+    created = {j.id: j.created_at for j in (await repo.list_jobs(limit=10))[0]}
+    items, _ = await repo.list_jobs(created_from=created["j4"], created_to=created["j6"])
+    assert [j.id for j in items] == ["j5", "j4"]
+
+
+@pytest.mark.asyncio
+async def test_counters_follow_transitions_and_rebuild_from_table(redis_client, redis_url):
+    counters = JobCounters(redis_url)
+    repo = await _repo(counters)
+    await _add_jobs(repo, 5)
+    claimed = await repo.claim_jobs("w1", n=3)
+    claimed[0].status = JobStatus.COMPLETED
+    await repo.update_job(claimed[0])
+    await repo.release_job(claimed[1])
+
+    assert await counters.estimate() == 5
+    assert await counters.estimate(status="pending") == 3
+    assert await counters.estimate(status="in_progress", account_id="a") == 1
+    assert await counters.estimate(status="completed", job_type="reply") == 1
+    assert await counters.estimate(job_type="dm") == 0
+
+    redis_client.hincrby("job_counts", "s:pending", 40)  # drift, e.g. a lost update
+    await repo.refresh_counters()
+    assert await counters.estimate(status="pending") == 3
+
+
+@pytest.mark.asyncio
+async def test_jobs_are_stamped_when_created_not_at_import():
+    repo = await _repo()
+    for i in range(2):
+        await repo.create_job(JobItem(id=f"j{i}", type="reply", status=JobStatus.PENDING, rule_id="r",
+                                      media_id="m", target_user_id="u", payload={}))
+        await asyncio.sleep(0.01)
+
+    items, _ = await repo.list_jobs()
+    assert [j.id for j in items] == ["j1", "j0"]
+    assert items[0].created_at > items[1].created_at
+
+
+@pytest.mark.asyncio
+async def test_archived_idempotency_keys_are_not_accepted_again():
+    repo = await _repo()
+
+    def item(i):
+        return JobItem(id=f"j{i}", type="reply", status=JobStatus.COMPLETED, rule_id="r", media_id="m",
+                       target_user_id="u", payload={}, idempotency_key="reply:a:c1")
+    assert await repo.create_jobs_bulk([item(0)]) == ["j0"]
+    assert await repo.archive_finished_jobs(timedelta(seconds=-1)) == 1
+
+    assert await repo.create_jobs_bulk([item(1)]) == []
@@ -0,0 +1,74 @@
+"""
+Persian:
+    تست LogsRepository: صفحه‌بندی keyset بدون تکرار یا جاافتادگی حتی با درج هم‌زمان و استفاده از ایندکس ترکیبی.
+
+English:
+    LogsRepository tests: keyset pages have no duplicates or gaps even with concurrent inserts, and use the composite index.
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+from sqlmodel import SQLModel
+from app.database.logs_repository import LogsRepository
+from app.models.log_model import EventLog
+
+
+async def _repo():
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    return LogsRepository(async_sessionmaker(engine, expire_on_commit=False)), engine
+
+
+async def _add_logs(repo, rows):
+    async with repo.session() as db:
+        db.add_all(rows)
+        await db.commit()
+
+
+async def _all_pages(repo, limit, on_page=None, **filters):
+    seen, after = [], None
+    while True:
+        rows = await repo.list_logs(limit=limit, after=after, **filters)
+        seen.extend(r.id for r in rows)
+        if on_page:
+            await on_page()
+        if len(rows) < limit:
+            return seen
+        after = (rows[-1].created_at, rows[-1].id)
+
+
+@pytest.mark.asyncio
+async def test_pages_cover_every_row_once_despite_ties_and_new_inserts():
+    repo, _ = await _repo()
+    base = datetime(2024, 1, 1)
+    # pairs of rows share a timestamp so the id tie-breaker matters
+    await _add_logs(repo, [
+        EventLog(account_id="a", level="INFO", message_en=f"m{i}", created_at=base + timedelta(seconds=i // 2))
+        for i in range(25)
+    ])
+
+    async def insert_newer():
+        await _add_logs(repo, [EventLog(account_id="a", level="INFO", message_en="new", created_at=base + timedelta(days=1))])
+
+    seen = await _all_pages(repo, limit=7, on_page=insert_newer, account_id="a", level="INFO")
+
+    assert len(seen) == len(set(seen)) == 25
+    assert set(seen) == set(range(1, 26))
+
+
+@pytest.mark.asyncio
+async def test_filtered_listing_seeks_the_composite_index():
+    repo, engine = await _repo()
+    async with engine.connect() as conn:
+        plan = (await conn.execute(text(
+            "EXPLAIN QUERY PLAN SELECT * FROM eventlog WHERE account_id = 'a' AND level = 'INFO' "
+            "AND (created_at, id) < ('2024-01-01', 5) ORDER BY created_at DESC, id DESC LIMIT 50"
+        ))).all()
+    details = " ".join(str(row[-1]) for row in plan)
+    assert "ix_eventlog_account_level_created_id" in details
+    assert "TEMP B-TREE" not in details
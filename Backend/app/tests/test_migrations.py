@@ -0,0 +1,39 @@
+"""
+Persian:
+    تست مهاجرت سبک: جدول job قدیمی ستون‌ها و ایندکس‌های جدید را دریافت می‌کند.
+
+English:
+    Lightweight migration test: an old job table gains the new columns and indexes.
+"""
+
+from sqlalchemy import create_engine, inspect, text
+from app.database.migrations import upgrade
+
+
+def test_upgrade_adds_columns_and_indexes_to_old_job_table(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE job (id INTEGER PRIMARY KEY, job_id VARCHAR, idempotency_key VARCHAR, job_type VARCHAR NOT NULL, "
+            "payload VARCHAR, status VARCHAR NOT NULL, attempts INTEGER NOT NULL, last_error VARCHAR, "
+            "created_at DATETIME NOT NULL, updated_at DATETIME NOT NULL)"
+        ))
+        conn.execute(text("CREATE INDEX ix_job_idempotency_key ON job (idempotency_key)"))
+        for i, key in enumerate(["k1", "k1", "k2", None, "k1"]):
+            conn.execute(text(
+                "INSERT INTO job (id, idempotency_key, job_type, status, attempts, created_at, updated_at) "
+                "VALUES (:id, :key, 'send', 'done', 0, '2025-01-01', '2025-01-01')"
+            ), {"id": i + 1, "key": key})
+
+    upgrade(engine)
+    upgrade(engine)  # idempotent
+
+    inspector = inspect(engine)
+    columns = {c["name"] for c in inspector.get_columns("job")}
+    assert {"account_id", "claimed_by", "lease_expires_at", "completed_at"} <= columns
+    indexes = {i["name"]: i for i in inspector.get_indexes("job")}
+    assert {"ix_job_status_created_at", "ix_job_account_id_status", "ix_job_pending_created_at"} <= set(indexes)
+    assert indexes["ix_job_idempotency_key"]["unique"]
+    with engine.connect() as conn:
+        keys = conn.execute(text("SELECT id, idempotency_key FROM job ORDER BY id")).all()
+    assert keys == [(1, "k1"), (2, None), (3, "k2"), (4, None), (5, None)]
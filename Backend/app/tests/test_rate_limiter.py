@@ -0,0 +1,108 @@
+"""
+Persian:
+    تست RateLimiter: محدودیت‌ها به ازای (حساب، عملیات) و مشترک بین چند پردازه از طریق Redis.
+
+English:
+    RateLimiter tests: limits are per (account, operation) and shared between processes through Redis.
+"""
+
+import pytest
+from app.schemas.job_schema import JobItem, JobStatus
+from app.services.rate_limiter import RateLimiter, RedisRateLimitBackend, MemoryRateLimitBackend
+
+
+class _Settings:
+    reply_delay = 0
+    dm_delay = 3600
+    like_delay = 0
+    hourly_limit = 2
+    daily_limit = 3
+    random_jitter = False
+    jitter_min = 0
+    jitter_max = 0
+
+
+class _SettingsRepo:
+    async def get_account_settings(self, account_id):
+        return _Settings()
+
+
+def _job(account_id, type_="reply"):
+    return JobItem(type=type_, status=JobStatus.PENDING, rule_id="r", media_id="m",
+                   target_user_id="u", payload={}, account_id=account_id)
+
+
+@pytest.mark.asyncio
+async def test_redis_limits_are_shared_between_processes(redis_client, redis_url):
+    # two limiters with their own clients stand in for two workers
+    worker_a = RateLimiter(_SettingsRepo(), backend=RedisRateLimitBackend(redis_url))
+    worker_b = RateLimiter(_SettingsRepo(), backend=RedisRateLimitBackend(redis_url))
+
+    assert await worker_a.can_execute(_job("acct1")) is True
+    assert await worker_b.can_execute(_job("acct1")) is True
+    # hourly limit of 2 reached across both workers
+    assert await worker_a.can_execute(_job("acct1")) is False
+    assert await worker_b.can_execute(_job("acct1")) is False
+    # other accounts keep their own budget
+    assert await worker_b.can_execute(_job("acct2")) is True
+
+
+@pytest.mark.asyncio
+async def test_redis_min_delay_reports_retry_after(redis_client, redis_url):
+    backend = RedisRateLimitBackend(redis_url)
+    assert (await backend.acquire("acct", "dm", 3600, 10, 10))[0] is True
+    allowed, retry_after = await backend.acquire("acct", "dm", 3600, 10, 10)
+    assert allowed is False
+    assert 3590 < retry_after <= 3600
+
+
+@pytest.mark.asyncio
+async def test_memory_backend_keys_by_account_and_operation():
+    limiter = RateLimiter(_SettingsRepo(), backend=MemoryRateLimitBackend())
+    assert await limiter.can_execute(_job("acct1", "dm")) is True
+    assert await limiter.can_execute(_job("acct1", "dm")) is False
+    assert await limiter.can_execute(_job("acct1", "reply")) is True
+    assert await limiter.can_execute(_job("acct2", "dm")) is True
+
+
+def test_memory_backend_hourly_and_daily_windows_are_independent():
+    now = [0.0]
+    backend = MemoryRateLimitBackend(clock=lambda: now[0])
+
+    for _ in range(2):
+        assert backend.acquire_now("acct", "reply", 0, 2, 3)[0] is True
+    allowed, retry_after = backend.acquire_now("acct", "reply", 0, 2, 3)
+    assert allowed is False and retry_after == 3600
+
+    # an hour later the hourly window is empty but the daily one still holds both operations
+    now[0] = 3601.0
+    assert backend.acquire_now("acct", "reply", 0, 2, 3)[0] is True
+    allowed, retry_after = backend.acquire_now("acct", "reply", 0, 2, 3)
+    assert allowed is False and retry_after == 86400 - 3601
+
+    now[0] = 86401.0
+    assert backend.acquire_now("acct", "reply", 0, 2, 3)[0] is True
+
+
+def test_token_bucket_allows_burst_then_refills():
+    now = [0.0]
+    backend = MemoryRateLimitBackend(clock=lambda: now[0])
+
+    for _ in range(3):
+        assert backend.acquire_now("acct", "reply", 10, 100, 100, burst=3)[0] is True
+    allowed, retry_after = backend.acquire_now("acct", "reply", 10, 100, 100, burst=3)
+    assert allowed is False and retry_after == 10
+
+    now[0] = 10.0
+    assert backend.acquire_now("acct", "reply", 10, 100, 100, burst=3)[0] is True
+    assert backend.acquire_now("acct", "reply", 10, 100, 100, burst=3)[0] is False
+
+
+@pytest.mark.asyncio
+async def test_zero_limit_blocks_the_operation_in_both_backends(redis_client, redis_url):
+    for backend in (MemoryRateLimitBackend(), RedisRateLimitBackend(redis_url)):
+        assert await backend.acquire("acct", "dm", 0, 0, 10) == (False, 3600)
+        assert await backend.acquire("acct", "dm", 0, 10, 0) == (False, 86400)
+        # a paused operation is not counted against the account
+        assert (await backend.acquire("acct", "dm", 0, 1, 1))[0] is True
+
@@ -0,0 +1,85 @@
+"""
+Persian:
+    تست فیلتر Bloom تاریخچهٔ پاسخ: نبود false negative، ذخیره/بارگذاری از Redis، بازسازی در پس‌زمینه از مجموعه‌های دقیق و همگام‌سازی دوره‌ای.
+
+English:
+    Reply-history Bloom filter tests: no false negatives, Redis persistence round-trip, background rebuild
+    from exact sets and the timed sync with other processes.
+"""
+
+import asyncio
+import pytest
+from app.services.reply_bloom import BloomFilter
+from app.services.reply_history import ReplyHistoryService
+
+
+def test_bloom_filter_has_no_false_negatives_and_bounded_fp_rate():
+    bloom = BloomFilter(capacity=5000, error_rate=0.01)
+    for i in range(5000):
+        bloom.add(f"m:{i}")
+    assert all(f"m:{i}" in bloom for i in range(5000))
+
+    false_positives = sum(f"other:{i}" in bloom for i in range(20000))
+    assert false_positives / 20000 < 0.03
+    assert bloom.estimated_fp_rate == pytest.approx(0.01, rel=0.5)
+
+    copy = BloomFilter(capacity=5000, error_rate=0.01, bits=bytes(bloom.bits))
+    assert "m:42" in copy
+
+
+@pytest.mark.asyncio
+async def test_history_with_bloom_persists_and_rebuilds(redis_client, redis_url):
+    svc = ReplyHistoryService(redis_url, bloom_enabled=True)
+    await svc.record_replies("acct", "m1", [{"comment_id": "c1", "rule_id": "r1", "reply_text": "hi"}])
+    await svc.bloom.load("acct")
+    assert await svc.filter_unreplied("acct", "m1", ["c1", "c2"]) == ["c2"]
+    await svc.bloom.persist_all()
+
+    # a fresh process loads the persisted bitmap
+    other = ReplyHistoryService(redis_url, bloom_enabled=True)
+    assert "m1:c1" in await other.bloom.load("acct")
+
+    # an account without a bitmap is seeded from its exact sets
+    redis_client.sadd("reply_history:acct2:m9", "c7")
+    fresh = ReplyHistoryService(redis_url, bloom_enabled=True)
+    assert "m9:c7" in await fresh.bloom.load("acct2")
+    assert await fresh.has_replied("acct2", "m9", "c7") is True
+    assert await fresh.has_replied("acct2", "m9", "c8") is False
+
+
+@pytest.mark.asyncio
+async def test_unloaded_filter_falls_back_to_the_exact_set_and_negatives_skip_redis(redis_client, redis_url, monkeypatch):
+    redis_client.sadd("reply_history:acct:m1", "c1")
+    svc = ReplyHistoryService(redis_url, bloom_enabled=True)
+    lookups = []
+    smismember = svc.redis.smismember
+
+    async def counting_smismember(key, members):
+        lookups.append(list(members))
+        return await smismember(key, members)
+    monkeypatch.setattr(svc.redis, "smismember", counting_smismember)
+
+    # the seed runs in the background; meanwhile the exact set answers
+    assert await svc.filter_unreplied("acct", "m1", ["c1", "c2"]) == ["c2"]
+    assert lookups == [["c1", "c2"]]
+    await svc.bloom.load("acct")
+
+    assert await svc.filter_unreplied("acct", "m1", ["c2", "c3"]) == ["c2", "c3"]
+    assert await svc.filter_unreplied("acct", "m1", ["c1", "c2"]) == ["c2"]
+    assert lookups == [["c1", "c2"], ["c1"]]
+
+
+@pytest.mark.asyncio
+async def test_other_processes_replies_arrive_with_the_timed_sync(redis_client, redis_url):
+    a = ReplyHistoryService(redis_url, bloom_enabled=True)
+    b = ReplyHistoryService(redis_url, bloom_enabled=True)
+    await a.bloom.load("acct")
+    await b.bloom.load("acct")
+    a.bloom._persist_interval = 0
+
+    await b.record_replies("acct", "m1", [{"comment_id": "c1", "rule_id": "r1", "reply_text": "hi"}])
+    await a.filter_unreplied("acct", "m1", ["c1"])  # due: merges the shared bitmap in the background
+    await asyncio.gather(*a.bloom._tasks.values())
+
+    assert "m1:c1" in await a.bloom.load("acct")
+    assert await a.filter_unreplied("acct", "m1", ["c1", "c2"]) == ["c2"]
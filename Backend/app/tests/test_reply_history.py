@@ -0,0 +1,107 @@
+"""
+Persian:
+    تست ReplyHistoryService روی Redis: بررسی گروهی کامنت‌ها و ثبت گروهی پاسخ‌ها.
+
+English:
+    ReplyHistoryService tests against Redis: bulk duplicate check and bulk reply recording.
+"""
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from app.deps import get_reply_history
+from app.routers import reply_router
+from app.services.reply_history import ReplyHistoryService
+
+
+@pytest.mark.asyncio
+async def test_filter_unreplied_and_record_replies(redis_client, redis_url):
+    svc = ReplyHistoryService(redis_url)
+    ids = ["c1", "c2", "c3"]
+    assert await svc.filter_unreplied("acct", "m1", ids) == ids
+
+    await svc.record_replies("acct", "m1", [
+        {"comment_id": "c1", "rule_id": "r1", "reply_text": "hi"},
+        {"comment_id": "c3", "rule_id": "r2", "reply_text": "thanks"},
+    ])
+
+    assert await svc.filter_unreplied("acct", "m1", ids) == ["c2"]
+    assert await svc.has_replied("acct", "m1", "c3") is True
+    assert await svc.filter_unreplied("acct", "m1", []) == []
+
+    history = await svc.get_reply_history("acct", "m1")
+    assert {h["comment_id"] for h in history} == {"c1", "c3"}
+
+
+@pytest.mark.asyncio
+async def test_reply_history_pages_newest_first_with_cursor(redis_client, redis_url):
+    svc = ReplyHistoryService(redis_url)
+    # one batch shares a timestamp, so paging must also walk through ties
+    await svc.record_replies("acct", "m2", [
+        {"comment_id": f"c{i:02d}", "rule_id": "r1", "reply_text": "hi"} for i in range(5)
+    ])
+    await svc.record_replies("acct", "m2", [{"comment_id": "late", "rule_id": "r2", "reply_text": "yo"}])
+
+    seen = []
+    items, cursor = await svc.get_reply_history_page("acct", "m2", limit=2)
+    seen += [i["comment_id"] for i in items]
+    while cursor:
+        items, cursor = await svc.get_reply_history_page("acct", "m2", limit=2, cursor=cursor)
+        seen += [i["comment_id"] for i in items]
+
+    assert seen[0] == "late"
+    assert sorted(seen) == sorted(["late"] + [f"c{i:02d}" for i in range(5)])
+    assert len(seen) == len(set(seen))
+
+
+@pytest.mark.asyncio
+async def test_reply_history_reads_legacy_detail_keys(redis_client, redis_url):
+    redis_client.sadd("reply_history:acct:old", "c1")
+    redis_client.set("reply_history:acct:old:detail:c1", '{"rule_id": "r", "reply_text": "t", "timestamp": "2025-01-01T00:00:00"}')
+    svc = ReplyHistoryService(redis_url)
+    history = await svc.get_reply_history("acct", "old")
+    assert history[0]["comment_id"] == "c1"
+
+
+@pytest.mark.asyncio
+async def test_background_purge_unlinks_all_account_keys(redis_client, redis_url):
+    svc = ReplyHistoryService(redis_url)
+    for m in range(30):
+        await svc.record_replies("acct", f"m{m}", [{"comment_id": "c1", "rule_id": "r", "reply_text": "hi"}])
+    redis_client.set("reply_history:acct:old:detail:c1", "{}")
+    await svc.record_replies("other", "m0", [{"comment_id": "c1", "rule_id": "r", "reply_text": "hi"}])
+
+    purge_id = await svc.start_purge("acct")
+    await svc._purges[purge_id]
+
+    status = await svc.get_purge_status(purge_id)
+    assert status["status"] == "done"
+    assert status["deleted"] == 30 * 3 + 1
+    assert not redis_client.keys("reply_history:acct:*")
+    assert await svc.has_replied("other", "m0", "c1") is True
+    assert await svc.get_purge_status("missing") is None
+
+
+@pytest.mark.asyncio
+async def test_purge_endpoints(redis_client, redis_url):
+    svc = ReplyHistoryService(redis_url)
+    await svc.record_replies("acct", "m1", [{"comment_id": "c1", "rule_id": "r", "reply_text": "hi"}])
+    await svc.record_replies("acct", "m2", [{"comment_id": "c1", "rule_id": "r", "reply_text": "hi"}])
+    redis_client.set("reply_history:acct:m1:detail:c1", "{}")
+    app = FastAPI()
+    app.include_router(reply_router.router)
+    app.dependency_overrides[get_reply_history] = lambda: svc
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        r = await ac.delete("/api/reply/history/acct", params={"media_id": "m1"})
+        assert (r.status_code, r.json()) == (202, {"status": "done", "deleted": 4})
+        assert redis_client.keys("reply_history:acct:m1*") == []
+
+        r = await ac.delete("/api/reply/history/acct")
+        assert r.status_code == 202 and r.json()["status"] == "running"
+        purge_id = r.json()["purge_id"]
+        if purge_id in svc._purges:
+            await svc._purges[purge_id]
+        r = await ac.get(f"/api/reply/history/purges/{purge_id}")
+        assert (r.json()["status"], r.json()["deleted"]) == ("done", 3)
+        assert (await ac.get("/api/reply/history/purges/missing")).status_code == 404
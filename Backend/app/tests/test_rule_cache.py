@@ -0,0 +1,135 @@
+"""
+Persian:
+    تست کامپایل json-logic به closure و کش قوانین کامپایل‌شدهٔ هر حساب در RulesRepository.
+
+English:
+    Tests for json-logic closure compilation and the per-account compiled rule cache in RulesRepository.
+"""
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+from sqlmodel import SQLModel
+from app import deps
+from app.database.rules_repository import RulesRepository
+from app.routers import inbound_router
+from app.schemas.rule_schema import RuleIn, RuleUpdate
+from app.services import rules_engine
+from app.utils.logic_compiler import compile_logic, compile_predicate
+
+
+@pytest.mark.parametrize("expression, data, expected", [
+    ({"in": ["promo", {"var": "text"}]}, {"text": "big promo today"}, True),
+    ({"in": ["promo", {"var": "text"}]}, {}, False),
+    ({"and": [{"==": [{"var": "user.lang"}, "fa"]}, {">": [{"var": "likes"}, 2]}]}, {"user": {"lang": "fa"}, "likes": 3}, True),
+    ({"or": [{"!": {"var": "text"}}, {"in": [{"var": "user"}, ["a", "b"]]}]}, {"text": "x", "user": "b"}, True),
+    ({"<": [1, {"var": "n"}, 5]}, {"n": 7}, False),
+    ({"if": [{"missing": ["text"]}, "empty", "full"]}, {"text": "hi"}, "full"),
+    ({"cat": ["a", {"var": "n"}, {"substr": ["hello", 1, 3]}]}, {"n": 1}, "a1ell"),
+    ({"var": ["missing.path", "fallback"]}, {}, "fallback"),
+    ({"+": [1, {"var": "n"}, "2"]}, {"n": 3}, 6.0),
+])
+def test_compiled_expressions_follow_json_logic(expression, data, expected):
+    assert compile_logic(expression)(data) == expected
+
+
+def test_unknown_operator_fails_at_compile_time_and_bad_data_does_not_match():
+    with pytest.raises(ValueError):
+        compile_logic({"nope": [1]})
+    assert compile_predicate({">": [{"var": "n"}, 2]})({"n": "x"}) is False
+    # an empty object is truthy, so "{}" matches everything
+    assert compile_predicate({})({}) is True
+
+
+class _CountingRulesRepository(RulesRepository):
+    loads = 0
+
+    async def get_active_rules(self, account_id=None):
+        self.loads += 1
+        return await super().get_active_rules(account_id)
+
+
+async def _repo():
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    return _CountingRulesRepository(async_sessionmaker(engine, expire_on_commit=False))
+
+
+@pytest.mark.asyncio
+async def test_compiled_rules_are_cached_until_a_rule_changes():
+    repo = await _repo()
+    promo = await repo.create_rule(RuleIn(account_id="a", name="promo", condition='{"in": ["promo", {"var": "text"}]}'))
+    await repo.create_rule(RuleIn(account_id="a", name="broken", condition="not json"))
+
+    for _ in range(3):
+        compiled = await repo.get_compiled_rules("a")
+    assert repo.loads == 1
+    assert [c.rule.name for c in compiled] == ["promo"]
+
+    await repo.update_rule(int(promo.id), RuleUpdate(enabled=False))
+    assert await repo.get_compiled_rules("a") == []
+    assert repo.loads == 2
+
+
+@pytest.mark.asyncio
+async def test_event_evaluation_uses_cache_and_enqueues_matches(monkeypatch):
+    repo = await _repo()
+    sent = []
+    monkeypatch.setattr(rules_engine, "enqueue_send_many", sent.extend)
+    for i in range(500):
+        await repo.create_rule(RuleIn(account_id="a", name=f"r{i}", condition=f'{{"in": ["<w{i}>", {{"var": "text"}}]}}'))
+    by_name = {c.rule.name: c.rule.id for c in await repo.get_compiled_rules("a")}
+
+    event = {"account_id": "a", "session_id": "s", "text": "has <w7> and <w42>"}
+    matched = await rules_engine.evaluate_rules_for_event(event, rules_repo=repo)
+    await rules_engine.run_rules_for_account("a", event, rules_repo=repo)
+
+    assert repo.loads == 1
+    assert sorted(matched) == sorted([by_name["r7"], by_name["r42"]])
+    assert [action["rule_id"] for action in sent] == matched + matched
+
+
+@pytest.mark.asyncio
+async def test_batch_evaluation_matches_every_event_and_enqueues_once(monkeypatch):
+    repo = await _repo()
+    calls = []
+    monkeypatch.setattr(rules_engine, "enqueue_send_many", calls.append)
+    for i in range(50):
+        await repo.create_rule(RuleIn(account_id="a", name=f"r{i}", condition=f'{{"in": ["<w{i}>", {{"var": "text"}}]}}'))
+    by_name = {c.rule.name: c.rule.id for c in await repo.get_compiled_rules("a")}
+
+    events = [{"account_id": "a", "session_id": "s", "text": f"<w{i % 60}>"} for i in range(1000)]
+    matches = await rules_engine.evaluate_rules_batch("a", events, rules_repo=repo)
+
+    assert repo.loads == 1
+    assert matches == [[by_name[f"r{i % 60}"]] if i % 60 < 50 else [] for i in range(1000)]
+    assert len(calls) == 1
+    assert [(a["event"], a["rule_id"]) for a in calls[0]] == [(e, m[0]) for e, m in zip(events, matches) if m]
+    assert await rules_engine.evaluate_rules_batch("a", [], rules_repo=repo) == []
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_batch_endpoint_enqueues_all_accounts_matches_once(monkeypatch):
+    repo = await _repo()
+    calls = []
+    monkeypatch.setattr(rules_engine, "enqueue_send_many", calls.append)
+    monkeypatch.setattr(deps, "_rules_repo", repo)
+    for account in ("a", "b"):
+        await repo.create_rule(RuleIn(account_id=account, name=f"{account}-promo", condition='{"in": ["promo", {"var": "text"}]}'))
+    app = FastAPI()
+    app.include_router(inbound_router.router)
+    events = [{"text": "promo"}, {"account_id": "b", "text": "promo"}, {"text": "hello"}, "not an event"]
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        r = await ac.post("/api/inbound/events:batch", json={"account_id": "a", "events": events})
+        assert (await ac.post("/api/inbound/events:batch", json={"events": {}})).status_code == 400
+
+    body = r.json()
+    assert (r.status_code, body["accepted"], body["rejected"]) == (200, 3, [{"index": 3, "error": "missing_account_id"}])
+    assert [m["index"] for m in body["matched"]] == [0, 1]
+    assert len(calls) == 1
+    assert sorted(action["event"]["account_id"] for action in calls[0]) == ["a", "b"]
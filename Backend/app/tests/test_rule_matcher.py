@@ -0,0 +1,76 @@
+"""
+Persian:
+    تست RuleMatcher: استخراج عبارت‌ها از شرط‌ها، Aho–Corasick با عبارت‌های هم‌پوشان و برابری نتیجه با ارزیابی همهٔ قوانین.
+
+English:
+    RuleMatcher tests: term extraction from conditions, Aho–Corasick with overlapping terms and
+    results identical to evaluating every rule.
+"""
+
+import json
+import random
+from datetime import datetime
+
+from app.database.rules_repository import RulesRepository
+from app.schemas.rule_schema import RuleOut
+from app.services.rule_matcher import RuleMatcher, required_terms
+
+
+def _text_in(term):
+    return {"in": [term, {"var": "text"}]}
+
+
+def test_required_terms_cover_in_equality_and_boolean_combinations():
+    assert required_terms(_text_in("promo")) == [("in", "text", "promo")]
+    assert required_terms({"==": ["exact", {"var": "text"}]}) == [("==", "text", "exact")]
+    assert required_terms({"or": [_text_in("a"), {"==": [{"var": "username"}, "bob"]}]}) == [("in", "text", "a"), ("==", "username", "bob")]
+    # any conjunct is necessary; an exact lookup beats a substring
+    assert required_terms({"and": [_text_in("sale"), {"==": [{"var": "lang"}, "fa"]}]}) == [("==", "lang", "fa")]
+    assert required_terms({"and": [{">": [{"var": "likes"}, 1]}, _text_in("sale"), {"or": [_text_in("x"), _text_in("y")]}]}) == [("in", "text", "sale")]
+    # not a necessary condition: always a candidate
+    assert required_terms({"or": [_text_in("a"), {"var": "vip"}]}) is None
+    assert required_terms({"!": _text_in("spam")}) is None
+    assert required_terms({"in": ["a", {"var": ["text", "a"]}]}) is None
+    assert required_terms({"in": ["a", {"var": "username"}]}) is None
+    assert required_terms({"==": [{"var": "user.lang"}, "fa"]}) is None
+
+
+def _rules(conditions):
+    now = datetime.utcnow()
+    return RulesRepository.compile_rules([
+        RuleOut(id=str(i), account_id="a", name=f"r{i}", condition=json.dumps(c), created_at=now, updated_at=now)
+        for i, c in enumerate(conditions)
+    ])
+
+
+def test_overlapping_terms_are_all_found():
+    matcher = RuleMatcher(_rules([_text_in("he"), _text_in("she"), _text_in("his"), _text_in("hers")]))
+    assert [c.rule.id for c in matcher.match({"text": "ushers"})] == ["0", "1", "3"]
+    assert matcher.match({"text": ""}) == [] and matcher.match({}) == []
+
+
+def test_matches_equal_brute_force_on_random_rules():
+    rng = random.Random(7)
+    words = [f"w{i}" for i in range(60)] + ["ab", "abc", "bca"]
+    conditions = []
+    for _ in range(300):
+        kind = rng.random()
+        if kind < 0.5:
+            conditions.append(_text_in(rng.choice(words)))
+        elif kind < 0.7:
+            conditions.append({"or": [_text_in(rng.choice(words)), _text_in(rng.choice(words))]})
+        elif kind < 0.8:
+            conditions.append({"and": [_text_in(rng.choice(words)), {">": [{"var": "likes"}, rng.randint(0, 5)]}]})
+        elif kind < 0.9:
+            conditions.append({"==": [{"var": "likes"}, rng.randint(0, 6)]})
+        else:
+            conditions.append({"<": [{"var": "likes"}, 2]})
+    compiled = _rules(conditions)
+    matcher = RuleMatcher(compiled)
+    assert 0 < matcher.indexed_count < len(compiled)
+
+    for _ in range(300):
+        comment = {"text": " ".join(rng.choice(words) for _ in range(rng.randint(0, 6))), "likes": rng.randint(0, 6)}
+        assert matcher.match(comment) == [c for c in compiled if c.test(comment)]
+    # non-string text cannot be searched: every rule is evaluated
+    assert matcher.match({"text": ["w1"], "likes": 9}) == [c for c in compiled if c.test({"text": ["w1"], "likes": 9})]
@@ -0,0 +1,100 @@
+"""
+Persian:
+    تست خط‌های هر حساب در صف ارسال: نوبت‌دهی منصفانه، ترتیب هر حساب، توقف/ادامهٔ خط و بازیابی idهای in-flight.
+
+English:
+    Tests for per-account sender lanes: fair round-robin, per-account order, pausing and resuming
+    lanes, and recovering in-flight ids.
+"""
+
+import pytest
+from app.services import sender_queue
+from app.services.async_sender_worker import AsyncSenderWorker
+from app.services.sender_lanes import SenderLanes
+
+INFLIGHT = "sender:lanes:inflight:t"
+
+
+@pytest.fixture
+def lanes(redis_client):
+    import redis
+    return SenderLanes(redis.from_url("redis://localhost", decode_responses=True))
+
+
+def _taken(lanes, quantum=1):
+    return [SenderLanes.job_id(e) for e in lanes.take(INFLIGHT, quantum)]
+
+
+def test_hot_account_gets_one_turn_per_round(lanes):
+    lanes.push([("hot", f"h{i}") for i in range(100)] + [("q1", "a"), ("q2", "b")])
+
+    assert [_taken(lanes) for _ in range(4)] == [["h0"], ["a"], ["b"], []]
+    # the hot lane only rejoins the ring when its send is done, then quantum sets the turn size
+    lanes.done(INFLIGHT, "h0 hot")
+    assert _taken(lanes, quantum=3) == ["h1", "h2", "h3"]
+    # q1 still has "a" in flight, so its next send waits for it
+    lanes.push([("q1", "c")])
+    assert _taken(lanes) == []
+    lanes.done(INFLIGHT, "a q1")
+    assert _taken(lanes) == ["c"]
+
+
+def test_requeued_send_keeps_its_place_while_the_lane_is_paused(lanes):
+    lanes.push([("a", "1"), ("a", "2"), ("b", "3")])
+    [entry] = lanes.take(INFLIGHT)
+
+    lanes.requeue(INFLIGHT, entry, delay=60)
+    assert _taken(lanes) == ["3"]
+    assert _taken(lanes) == []
+
+    lanes.resume("a")
+    assert _taken(lanes) == ["1"]
+    lanes.pause("b", 60)
+    lanes.push([("b", "4")])
+    assert _taken(lanes) == []
+
+
+def test_recover_returns_in_flight_ids_to_the_head_of_their_lanes(lanes):
+    lanes.push([("a", "1"), ("a", "2"), ("a", "3")])
+    assert _taken(lanes, quantum=2) == ["1", "2"]
+
+    assert lanes.recover(INFLIGHT) == 2
+    assert _taken(lanes, quantum=3) == ["1", "2", "3"]
+
+
+@pytest.mark.asyncio
+async def test_worker_serves_lanes_in_order_and_pauses_throttled_accounts(sender_jobs, send_client, monkeypatch, redis_client):
+    monkeypatch.setattr(sender_queue, "SENDER_QUEUE_BACKEND", "lanes")
+
+    accounts = ["hot"] * 20 + ["quiet", "throttled"]
+    sender_queue.enqueue_send_many([
+        {"session_id": "s", "event": {"account_id": a, "message": {"account_id": a, "n": i}}} for i, a in enumerate(accounts)
+    ])
+    client = send_client(throttled={"throttled"})
+    worker = sender_jobs.worker(client, concurrency=8, backend="lanes", lane_pause=60)
+
+    await worker.drain()
+
+    assert client.sent.index(("quiet", 20)) < 3
+    assert [n for a, n in client.sent if a == "hot"] == list(range(20))
+    assert redis_client.lrange("rq:queue:sender", 0, -1) == []
+    jobs = {job.account_id: job for job in sender_jobs.jobs().values()}
+    assert (jobs["throttled"].status, jobs["throttled"].attempts) == ("queued", 0)
+    assert redis_client.zscore("sender:lanes:paused", "throttled") is not None
+    assert redis_client.lrange("sender:lane:throttled", 0, -1) == [jobs["throttled"].job_id.encode()]
+    assert redis_client.llen(INFLIGHT) == 0
+
+
+@pytest.mark.asyncio
+async def test_live_worker_frees_the_lanes_of_a_dead_worker(lanes, redis_url):
+    lanes.push([("a", "1"), ("a", "2")])
+    # w1 takes a's first send and dies; a stays busy, so nobody else gets a's next send
+    assert [SenderLanes.job_id(e) for e in lanes.take(lanes.inflight_key("w1"))] == ["1"]
+    lanes.redis.zadd(lanes.WORKERS_KEY, {"w1": 1})
+    w2 = AsyncSenderWorker(jobs_repo=object(), session_manager=object(), redis_url=redis_url,
+                           name="w2", backend="lanes", dead_after=60)
+    assert lanes.take(lanes.inflight_key("w2")) == []
+
+    assert await w2.heartbeat() == 1
+    assert lanes.redis.hgetall(lanes.BUSY_KEY) == {}
+    assert _taken(lanes, quantum=2) == ["1", "2"]
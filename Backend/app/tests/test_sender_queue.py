@@ -0,0 +1,116 @@
+"""
+Persian:
+    تست enqueue دسته‌ای صف ارسال: یک تراکنش برای jobها، یک کوئری برای کلیدهای idempotency و یک pipeline برای RQ.
+
+English:
+    Tests for bulk sender enqueue: one transaction for the Job rows, one idempotency lookup and one RQ pipeline.
+"""
+
+import json
+import pytest
+from rq import Queue
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, select
+from app.models.job_model import Job, JobArchive
+from app.services import sender_queue
+
+
+@pytest.fixture
+def sender(monkeypatch, redis_client):
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    SQLModel.metadata.create_all(engine)
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, sql, *a: statements.append(sql))
+    queue = Queue("sender", connection=redis_client)
+    monkeypatch.setattr(sender_queue, "engine", engine)
+    monkeypatch.setattr(sender_queue, "queue", queue)
+    return engine, queue, statements
+
+
+def test_enqueue_many_batches_db_and_redis_work(sender):
+    engine, queue, statements = sender
+    actions = [{"session_id": "s", "rule_id": i} for i in range(200)]
+    keys = [f"k{i}" if i % 2 else None for i in range(200)]
+
+    results = sender_queue.enqueue_send_many(actions, keys)
+
+    assert [r["reused"] for r in results] == [False] * 200
+    assert queue.count == 200
+    assert sorted(queue.job_ids) == sorted(r["job_id"] for r in results)
+    assert queue.fetch_job(results[7]["job_id"]).args == (actions[7],)
+    assert sum(sql.lstrip().upper().startswith("SELECT") for sql in statements) == 1
+    with Session(engine) as db:
+        jobs = db.exec(select(Job)).all()
+    assert len(jobs) == 200
+    assert {j.job_id: json.loads(j.payload) for j in jobs}[results[3]["job_id"]] == actions[3]
+
+
+def test_enqueue_many_reuses_known_and_repeated_keys(sender):
+    engine, queue, _ = sender
+    first = sender_queue.enqueue_send({"rule_id": 1}, "dup")
+
+    results = sender_queue.enqueue_send_many([{"rule_id": 1}, {"rule_id": 2}, {"rule_id": 2}], ["dup", "new", "new"])
+
+    assert results[0] == {"ok": True, "job_id": first["job_id"], "reused": True, "status": "queued"}
+    assert results[1]["reused"] is False
+    assert results[2]["job_id"] == results[1]["job_id"] and results[2]["reused"] is True
+    assert queue.count == 2
+    assert sender_queue.enqueue_send_many([]) == []
+
+
+def test_enqueue_failure_marks_new_jobs_failed(sender, monkeypatch):
+    engine, queue, _ = sender
+
+    def broken(*args, **kwargs):
+        raise ConnectionError("redis down")
+    monkeypatch.setattr(queue, "enqueue_many", broken)
+
+    with pytest.raises(ConnectionError):
+        sender_queue.enqueue_send_many([{"rule_id": 1}, {"rule_id": 2}])
+    with Session(engine) as db:
+        assert {j.status for j in db.exec(select(Job)).all()} == {"failed"}
+
+
+def test_status_changes_keep_job_counters_in_step(sender, redis_client):
+    results = sender_queue.enqueue_send_many([{"account_id": "a", "n": i} for i in range(3)])
+    sender_queue.mark_job_processing(results[0]["job_id"])
+    sender_queue.mark_job_done(results[0]["job_id"])
+    sender_queue.mark_job_failed(results[1]["job_id"], "boom")
+
+    counts = {k.decode(): int(v) for k, v in redis_client.hgetall("job_counts:a").items()}
+    assert {k: v for k, v in counts.items() if v} == {
+        "s:queued": 1, "s:done": 1, "s:failed": 1, "t:send:queued": 1, "t:send:done": 1, "t:send:failed": 1
+    }
+
+
+def test_key_inserted_concurrently_is_reused_without_failing_the_batch(sender, monkeypatch):
+    engine, queue, _ = sender
+    first = sender_queue.enqueue_send({"rule_id": 1}, "dup")
+    real_lookup, lookups = sender_queue._existing_jobs, []
+
+    def stale_lookup(db, keys):
+        # the first lookup runs before the other call commits "dup"
+        lookups.append(keys)
+        return {} if len(lookups) == 1 else real_lookup(db, keys)
+    monkeypatch.setattr(sender_queue, "_existing_jobs", stale_lookup)
+
+    results = sender_queue.enqueue_send_many([{"rule_id": 1}, {"rule_id": 2}, {"rule_id": 1}], ["dup", "new", "dup"])
+
+    assert results[0] == results[2] == {"ok": True, "job_id": first["job_id"], "reused": True, "status": "queued"}
+    assert results[1]["reused"] is False
+    assert sorted(queue.job_ids) == sorted([first["job_id"], results[1]["job_id"]])
+    with Session(engine) as db:
+        assert len(db.exec(select(Job)).all()) == 2
+
+
+def test_keys_of_archived_jobs_are_reused(sender):
+    engine, queue, _ = sender
+    with Session(engine) as db:
+        db.add(JobArchive(id=1, job_id="old", idempotency_key="dup", job_type="send", status="done"))
+        db.commit()
+
+    [result] = sender_queue.enqueue_send_many([{"rule_id": 1}], ["dup"])
+
+    assert result == {"ok": True, "job_id": "old", "reused": True, "status": "done"}
+    assert queue.count == 0
@@ -0,0 +1,121 @@
+"""
+Persian:
+    تست backend استریم صف ارسال: خواندن دسته‌ای با consumer group، ack، retry با تحویل دوباره،
+    بازپس‌گیری ورودی‌های worker مرده و dead-letter بر اساس تعداد تحویل.
+
+English:
+    Tests for the Redis Streams sender backend: batched consumer-group reads, acks, retries as new
+    deliveries, reclaiming a dead worker's entries and dead-lettering by delivery count.
+"""
+
+import asyncio
+import json
+import pytest
+from app.services import sender_queue
+from app.services.async_sender_worker import StreamSource
+
+STREAM, GROUP, DEAD = "sender:stream", "sender-workers", "sender:stream:dead"
+
+
+@pytest.fixture
+def setup(sender_jobs, monkeypatch):
+    monkeypatch.setattr(sender_queue, "SENDER_QUEUE_BACKEND", "streams")
+
+    def worker(client, max_attempts=3, claim_idle=0.2):
+        w = sender_jobs.worker(client, concurrency=4, backend="streams", max_attempts=max_attempts, backoff_max=0)
+        w._source = StreamSource(w.redis, "t", batch=4, claim_idle=claim_idle, claim_interval=0)
+        return w
+
+    return worker, sender_jobs.jobs
+
+
+def _enqueue(n):
+    return sender_queue.enqueue_send_many([
+        {"session_id": "s", "event": {"account_id": f"a{i % 2}", "message": {"account_id": f"a{i % 2}", "n": i}}} for i in range(n)
+    ])
+
+
+@pytest.mark.asyncio
+async def test_stream_entries_are_processed_acked_and_deleted(setup, send_client, redis_client):
+    worker, jobs = setup
+    _enqueue(10)
+    client = send_client()
+
+    await worker(client).drain()
+
+    assert sorted(n for _, n in client.sent) == list(range(10))
+    assert {job.status for job in jobs().values()} == {"done"}
+    assert redis_client.xlen(STREAM) == 0
+    assert redis_client.xpending(STREAM, GROUP)["pending"] == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_send_is_redelivered_then_dead_lettered(setup, send_client, redis_client):
+    worker, jobs = setup
+    [result] = _enqueue(1)
+
+    await worker(send_client(failures=5), max_attempts=2).drain()
+
+    job = jobs()[result["job_id"]]
+    assert (job.status, job.attempts) == ("dead", 2)
+    [(_, fields)] = redis_client.xrange(DEAD)
+    assert json.loads(fields[b"payload"])["job_id"] == result["job_id"]
+    assert redis_client.xlen(STREAM) == 0
+
+
+@pytest.mark.asyncio
+async def test_dead_consumers_entries_are_reclaimed_and_poison_entries_buried(setup, send_client, redis_client):
+    worker, jobs = setup
+    results = _enqueue(2)
+    redis_client.xgroup_create(STREAM, GROUP, id="0")
+    redis_client.xreadgroup(GROUP, "ghost", {STREAM: ">"}, count=1)
+    await asyncio.sleep(0.1)
+
+    client = send_client()
+    await worker(client, claim_idle=0.05).drain()
+    assert sorted(n for _, n in client.sent) == [0, 1]
+
+    # an entry that keeps killing its worker is delivered again and again; past max_attempts it is buried
+    [poison] = _enqueue(1)
+    redis_client.xreadgroup(GROUP, "ghost1", {STREAM: ">"})
+    redis_client.xautoclaim(STREAM, GROUP, "ghost2", 0, "0-0")
+    await asyncio.sleep(0.1)
+    client = send_client()
+    await worker(client, max_attempts=2, claim_idle=0.05).drain()
+
+    assert client.sent == []
+    assert jobs()[poison["job_id"]].status == "dead"
+    assert jobs()[results[0]["job_id"]].status == "done"
+    assert redis_client.xlen(DEAD) == 1
+
+
+@pytest.mark.asyncio
+async def test_restarted_worker_finishes_its_own_pending_entries(setup, send_client, redis_client):
+    worker, jobs = setup
+    _enqueue(3)
+    redis_client.xgroup_create(STREAM, GROUP, id="0")
+    redis_client.xreadgroup(GROUP, "t", {STREAM: ">"}, count=2)
+
+    w = worker(send_client())
+    assert await w.recover() == 2
+    await w.drain()
+
+    assert {job.status for job in jobs().values()} == {"done"}
+
+
+@pytest.mark.asyncio
+async def test_dead_consumer_is_dropped_only_once_its_entries_are_reclaimed(setup, send_client, redis_client):
+    worker, _ = setup
+    _enqueue(1)
+    redis_client.xgroup_create(STREAM, GROUP, id="0")
+    redis_client.xreadgroup(GROUP, "ghost", {STREAM: ">"})
+    redis_client.zadd("sender:stream:workers", {"ghost": 1})
+    w = worker(send_client(), claim_idle=60)
+
+    await w.heartbeat()
+    assert redis_client.zscore("sender:stream:workers", "ghost") is not None
+
+    redis_client.xautoclaim(STREAM, GROUP, "t", 0, "0-0")
+    await w.heartbeat()
+    assert redis_client.zscore("sender:stream:workers", "ghost") is None
+    assert [c["name"] for c in redis_client.xinfo_consumers(STREAM, GROUP)] == [b"t"]
@@ -0,0 +1,65 @@
+"""
+Persian:
+    تست SettingsRepository: کش تنظیمات حساب با TTL، باطل شدن آن هنگام نوشتن و اعتبارسنجی به‌روزرسانی.
+
+English:
+    SettingsRepository tests: TTL'd account settings cache, invalidation on write and update validation.
+"""
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+from sqlmodel import SQLModel
+from pydantic import ValidationError
+from app.database.settings_repository import SettingsRepository
+from app.schemas.settings_schema import SettingsUpdate
+
+
+class _CountingSession(AsyncSession):
+    gets = 0
+
+    async def get(self, *args, **kwargs):
+        _CountingSession.gets += 1
+        return await super().get(*args, **kwargs)
+
+
+async def _repo():
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    _CountingSession.gets = 0
+    return SettingsRepository(async_sessionmaker(engine, class_=_CountingSession, expire_on_commit=False), cache_ttl=60)
+
+
+@pytest.mark.asyncio
+async def test_settings_are_cached_and_invalidated_on_write():
+    repo = await _repo()
+    defaults = await repo.get_account_settings("acct")
+    assert defaults.daily_limit == 1000
+    await repo.get_account_settings("acct")
+    assert _CountingSession.gets == 1
+
+    await repo.update_account_settings("acct", {"daily_limit": 5, "reply_burst": 3})
+    settings = await repo.get_account_settings("acct")
+    assert (settings.daily_limit, settings.reply_burst) == (5, 3)
+    await repo.get_account_settings("acct")
+    # one read before the write, one inside it and one after the invalidation
+    assert _CountingSession.gets == 3
+
+
+@pytest.mark.asyncio
+async def test_invalid_settings_are_rejected():
+    for bad in ({"comment_delay_sec": -1}, {"daily_limit": -5}, {"dm_burst": 0},
+                {"jitter_min_sec": 10, "jitter_max_sec": 5}):
+        with pytest.raises(ValidationError):
+            SettingsUpdate(**bad)
+    assert SettingsUpdate(jitter_min_sec=2, jitter_max_sec=5).jitter_max_sec == 5
+
+    # a partial update is checked against the stored other end of the jitter range
+    repo = await _repo()
+    await repo.update_account_settings("acct", {"jitter_min": 2, "jitter_max": 5})
+    with pytest.raises(ValueError):
+        await repo.update_account_settings("acct", {"jitter_min": 8})
+    settings = await repo.get_account_settings("acct")
+    assert (settings.jitter_min, settings.jitter_max) == (2, 5)
+
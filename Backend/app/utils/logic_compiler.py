@@ -0,0 +1,284 @@
+"""
+Persian:
+    کامپایلر json-logic به closureهای پایتون: درخت عبارت یک بار پیمایش می‌شود و هر گره به تابعی
+    تبدیل می‌شود که فقط داده را می‌گیرد، پس ارزیابی هر رویداد تفسیر دوباره یا json.loads ندارد.
+
+English:
+    json-logic to Python closure compiler: the expression tree is walked once and every node becomes
+    a function of the data only, so evaluating an event re-parses and re-dispatches nothing.
+    Covers the json-logic-js operators used by rules (var, missing, if, comparisons, and/or, in, cat,
+    substr, arithmetic, min/max, merge). Unknown operators fail at compile time with ValueError.
+"""
+
+import operator
+from functools import reduce
+from typing import Any, Callable, Dict, List
+
+Predicate = Callable[[Dict[str, Any]], Any]
+
+
+def _truthy(value: Any) -> bool:
+    # json-logic (JavaScript) truthiness: empty arrays are falsy, objects are always truthy
+    if isinstance(value, (list, tuple)):
+        return len(value) > 0
+    if isinstance(value, dict):
+        return True
+    return bool(value)
+
+
+def _get_var(data: Any, path: Any, default: Any = None) -> Any:
+    if path is None or path == "":
+        return data
+    return _get_path(data, str(path).split("."), default)
+
+
+def _get_path(data: Any, keys: List[str], default: Any = None) -> Any:
+    for key in keys:
+        if isinstance(data, dict):
+            if key not in data:
+                return default
+            data = data[key]
+        elif isinstance(data, (list, tuple)) and key.lstrip("-").isdigit():
+            try:
+                data = data[int(key)]
+            except IndexError:
+                return default
+        else:
+            return default
+    return data
+
+
+def _num(value: Any) -> float:
+    return float(value)
+
+
+def _const(value: Any) -> Predicate:
+    fn = lambda data: value  # noqa: E731
+    # builders read .constant to fold literal operands into their closures
+    fn.constant = value
+    return fn
+
+
+def _is_const(fn: Predicate) -> bool:
+    return hasattr(fn, "constant")
+
+
+def _compare(op: Callable[[Any, Any], bool]) -> Callable[[List[Predicate]], Predicate]:
+    """Comparison builder; operands of incompatible types compare as False instead of raising"""
+    def build(args: List[Predicate]) -> Predicate:
+        if len(args) == 3:  # between: {"<": [a, b, c]}
+            a, b, c = args
+
+            def between(data):
+                try:
+                    middle = b(data)
+                    return op(a(data), middle) and op(middle, c(data))
+                except TypeError:
+                    return False
+            return between
+        a, b = args
+        if _is_const(b):
+            right = b.constant
+
+            def compare_const(data):
+                try:
+                    return op(a(data), right)
+                except TypeError:
+                    return False
+            return compare_const
+
+        def compare(data):
+            try:
+                return op(a(data), b(data))
+            except TypeError:
+                return False
+        return compare
+    return build
+
+
+def _strict_eq(a: Any, b: Any) -> bool:
+    return type(a) is type(b) and a == b
+
+
+def _in(needle: Any, haystack: Any) -> bool:
+    if isinstance(haystack, str):
+        return isinstance(needle, str) and needle in haystack
+    if isinstance(haystack, (list, tuple, dict, set)):
+        return needle in haystack
+    return False
+
+
+def _build_var(args: List[Predicate]) -> Predicate:
+    path = args[0] if args else _const(None)
+    default = args[1] if len(args) > 1 else _const(None)
+    if not (_is_const(path) and _is_const(default)):
+        return lambda data: _get_var(data, path(data), default(data))
+
+    # literal path (the usual case): split it once, and read single keys straight from the dict
+    fallback = default.constant
+    if path.constant is None or path.constant == "":
+        return lambda data: data
+    keys = str(path.constant).split(".")
+    if len(keys) > 1:
+        return lambda data: _get_path(data, keys, fallback)
+    key = keys[0]
+
+    def var(data):
+        if type(data) is dict:
+            return data.get(key, fallback)
+        return _get_path(data, keys, fallback)
+    return var
+
+
+def _build_missing(args: List[Predicate]) -> Predicate:
+    def missing(data):
+        keys = [a(data) for a in args]
+        if len(keys) == 1 and isinstance(keys[0], list):
+            keys = keys[0]
+        return [k for k in keys if _get_var(data, k) in (None, "")]
+    return missing
+
+
+def _build_missing_some(args: List[Predicate]) -> Predicate:
+    need, keys = args
+
+    def missing_some(data):
+        names = keys(data)
+        missing = [k for k in names if _get_var(data, k) in (None, "")]
+        return [] if len(names) - len(missing) >= need(data) else missing
+    return missing_some
+
+
+def _build_if(args: List[Predicate]) -> Predicate:
+    # {"if": [c1, v1, c2, v2, ..., else]}
+    pairs = [(args[i], args[i + 1]) for i in range(0, len(args) - 1, 2)]
+    otherwise = args[-1] if len(args) % 2 else _const(None)
+
+    def branch(data):
+        for cond, value in pairs:
+            if _truthy(cond(data)):
+                return value(data)
+        return otherwise(data)
+    return branch
+
+
+def _build_and(args: List[Predicate]) -> Predicate:
+    def all_of(data):
+        value = True
+        for arg in args:
+            value = arg(data)
+            if not _truthy(value):
+                return value
+        return value
+    return all_of
+
+
+def _build_or(args: List[Predicate]) -> Predicate:
+    def any_of(data):
+        value = False
+        for arg in args:
+            value = arg(data)
+            if _truthy(value):
+                return value
+        return value
+    return any_of
+
+
+def _build_substr(args: List[Predicate]) -> Predicate:
+    source, start = args[0], args[1]
+    length = args[2] if len(args) > 2 else None
+
+    def substr(data):
+        tail = str(source(data))[int(start(data)):]
+        # a negative length drops that many characters from the end, like json-logic-js
+        return tail if length is None else tail[:int(length(data))]
+    return substr
+
+
+def _build_minus(args: List[Predicate]) -> Predicate:
+    if len(args) == 1:
+        return lambda data: -_num(args[0](data))
+    a, b = args
+    return lambda data: _num(a(data)) - _num(b(data))
+
+
+def _build_merge(args: List[Predicate]) -> Predicate:
+    def merge(data):
+        out = []
+        for arg in args:
+            value = arg(data)
+            out.extend(value if isinstance(value, (list, tuple)) else [value])
+        return out
+    return merge
+
+
+def _variadic(fn: Callable[[List[Any]], Any]) -> Callable[[List[Predicate]], Predicate]:
+    return lambda args: (lambda data: fn([a(data) for a in args]))
+
+
+_BUILDERS: Dict[str, Callable[[List[Predicate]], Predicate]] = {
+    "var": _build_var,
+    "missing": _build_missing,
+    "missing_some": _build_missing_some,
+    "if": _build_if,
+    "?:": _build_if,
+    "and": _build_and,
+    "or": _build_or,
+    "!": lambda args: (lambda data: not _truthy(args[0](data))),
+    "!!": lambda args: (lambda data: _truthy(args[0](data))),
+    "==": _compare(operator.eq),
+    "===": _compare(_strict_eq),
+    "!=": _compare(operator.ne),
+    "!==": _compare(lambda a, b: not _strict_eq(a, b)),
+    ">": _compare(operator.gt),
+    ">=": _compare(operator.ge),
+    "<": _compare(operator.lt),
+    "<=": _compare(operator.le),
+    "in": lambda args: (lambda data: _in(args[0](data), args[1](data))),
+    "cat": _variadic(lambda values: "".join("" if v is None else str(v) for v in values)),
+    "substr": _build_substr,
+    "+": _variadic(lambda values: sum(_num(v) for v in values)),
+    "*": _variadic(lambda values: reduce(lambda total, v: total * _num(v), values, 1.0)),
+    "-": _build_minus,
+    "/": lambda args: (lambda data: _num(args[0](data)) / _num(args[1](data))),
+    "%": lambda args: (lambda data: _num(args[0](data)) % _num(args[1](data))),
+    "min": _variadic(lambda values: min(_num(v) for v in values) if values else None),
+    "max": _variadic(lambda values: max(_num(v) for v in values) if values else None),
+    "merge": _build_merge,
+}
+
+
+def compile_logic(expression: Any) -> Predicate:
+    """
+    Persian:
+        عبارت json-logic (ساختار پایتونی، نه رشته) را به تابع data -> value کامپایل می‌کند.
+
+    English:
+        Compile a json-logic expression (already parsed, not a string) into a data -> value function.
+    """
+    if isinstance(expression, list):
+        items = [compile_logic(e) for e in expression]
+        return lambda data: [item(data) for item in items]
+    if not isinstance(expression, dict) or len(expression) != 1:
+        return _const(expression)
+
+    (op, values), = expression.items()
+    builder = _BUILDERS.get(op)
+    if builder is None:
+        raise ValueError(f"Unrecognized json-logic operation {op!r}")
+    if not isinstance(values, (list, tuple)):
+        values = [values]
+    return builder([compile_logic(v) for v in values])
+
+
+def compile_predicate(expression: Any) -> Callable[[Dict[str, Any]], bool]:
+    """Compile expression into a boolean test; evaluation errors count as no match"""
+    fn = compile_logic(expression)
+
+    def test(data: Dict[str, Any]) -> bool:
+        try:
+            value = fn(data)
+        except Exception:
+            return False
+        return value if value is True or value is False else _truthy(value)
+    return test
@@ -23,10 +23,11 @@ def sign(payload: dict) -> str:
 
 def verify(token: str) -> dict:
     raw = base64.urlsafe_b64decode(token.encode())
-    try:
-        data, sig = raw.rsplit(b".", 1)
-    except Exception:
+    # the signature is raw bytes and may itself contain "."; split at its fixed length instead
+    sig_len = hashes.SHA256.digest_size
+    if len(raw) <= sig_len or raw[-sig_len - 1:-sig_len] != b".":
         raise ValueError("invalid token")
+    data, sig = raw[:-sig_len - 1], raw[-sig_len:]
     h = hmac.HMAC(SECRET, hashes.SHA256())
     h.update(data)
     h.verify(sig)
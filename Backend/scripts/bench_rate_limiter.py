@@ -0,0 +1,70 @@
+"""
+Persian:
+    بنچمارک تعداد بررسی در ثانیهٔ MemoryRateLimitBackend در مقایسه با روش قبلی (بازسازی لیست datetime در هر بررسی).
+
+English:
+    Benchmark checks per second of MemoryRateLimitBackend against the previous approach
+    (rebuilding datetime lists on every check).
+
+Usage:
+    python scripts/bench_rate_limiter.py --checks 100000 --accounts 100
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("CURSOR_SECRET", "bench-cursor-secret")
+if not os.getenv("FERNET_KEY"):
+    from cryptography.fernet import Fernet
+    os.environ["FERNET_KEY"] = Fernet.generate_key().decode()
+
+from app.services.rate_limiter import MemoryRateLimitBackend  # noqa: E402
+
+
+class _ListBackend:
+    """Reproduces the old accounting: filter the whole datetime list twice per check."""
+
+    def __init__(self):
+        self._ops = {}
+
+    def acquire_now(self, account_id, operation_type, min_delay, hourly_limit, daily_limit):
+        key = (account_id, operation_type)
+        now = datetime.utcnow()
+        ops = [t for t in self._ops.get(key, []) if (now - t) <= timedelta(hours=1)]
+        hourly_ok = len(ops) < hourly_limit
+        ops = [t for t in self._ops.get(key, []) if (now - t) <= timedelta(days=1)]
+        if hourly_ok and len(ops) < daily_limit:
+            ops.append(now)
+        self._ops[key] = ops
+        return hourly_ok, 0.0
+
+
+def _run(backend, checks: int, accounts: int) -> float:
+    keys = [(f"acct_{i}", op) for i in range(accounts) for op in ("reply", "dm")]
+    start = time.perf_counter()
+    for i in range(checks):
+        account_id, op = keys[i % len(keys)]
+        backend.acquire_now(account_id, op, 0, 1000, 5000)
+    return checks / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--checks", type=int, default=100_000)
+    parser.add_argument("--accounts", type=int, default=100)
+    args = parser.parse_args()
+
+    old = _run(_ListBackend(), args.checks, args.accounts)
+    new = _run(MemoryRateLimitBackend(), args.checks, args.accounts)
+
+    print(f"checks={args.checks} accounts={args.accounts}")
+    print(f"datetime lists : {old:12,.0f} checks/s")
+    print(f"deque windows  : {new:12,.0f} checks/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Persian:
+    بنچمارک توان enqueue/dequeue صف ارسال: RQ (enqueue_many در pipeline و dequeue_any) در مقایسه با
+    Redis Streams (XADD در pipeline، XREADGROUP دسته‌ای و XACK/XDEL).
+
+English:
+    Benchmark sender queue enqueue/dequeue throughput: RQ (enqueue_many in a pipeline, dequeue_any
+    like an RQ worker) against Redis Streams (pipelined XADD, batched XREADGROUP, XACK + XDEL).
+    Only bench-namespaced keys (queue "bench-sender", stream "bench:sender:stream") are written and
+    deleted, so it is safe to point at a Redis that holds real data.
+
+Usage:
+    python scripts/bench_sender_queue.py --jobs 20000 --batch 32 --redis-url redis://localhost:6379/15
+    python scripts/bench_sender_queue.py --jobs 20000 --fakeredis
+"""
+
+import argparse
+import os
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("CURSOR_SECRET", "bench-cursor-secret")
+if not os.getenv("FERNET_KEY"):
+    from cryptography.fernet import Fernet
+    os.environ["FERNET_KEY"] = Fernet.generate_key().decode()
+
+import redis  # noqa: E402
+from rq import Queue, Retry  # noqa: E402
+from app.services.sender_queue import SEND_FUNC  # noqa: E402
+from app.services.sender_streams import SenderStream  # noqa: E402
+
+BENCH_QUEUE = "bench-sender"
+BENCH_STREAM = "bench:sender:stream"
+
+
+def _actions(n: int, accounts: int):
+    return [
+        (f"acct_{i % accounts}", uuid.uuid4().hex,
+         {"session_id": "s", "event": {"account_id": f"acct_{i % accounts}", "message": {"text": f"hi {i}"}}})
+        for i in range(n)
+    ]
+
+
+def _cleanup_rq(client, queue, actions, chunk: int):
+    """Delete the bench queue and the job hashes it created, nothing else"""
+    queue.delete(delete_jobs=False)
+    for i in range(0, len(actions), chunk):
+        client.delete(*[Queue.job_class.key_for(job_id) for _, job_id, _ in actions[i:i + chunk]])
+
+
+def _bench_rq(client, actions, chunk: int):
+    queue = Queue(BENCH_QUEUE, connection=client)
+    _cleanup_rq(client, queue, actions, chunk)
+    start = time.perf_counter()
+    for i in range(0, len(actions), chunk):
+        data = [
+            Queue.prepare_data(SEND_FUNC, (action,), job_id=job_id, retry=Retry(max=3))
+            for _, job_id, action in actions[i:i + chunk]
+        ]
+        with client.pipeline() as pipe:
+            queue.enqueue_many(data, pipeline=pipe)
+            pipe.execute()
+    enqueued = time.perf_counter() - start
+
+    start = time.perf_counter()
+    taken = 0
+    while Queue.dequeue_any([queue], None, connection=client):
+        taken += 1
+    dequeued = time.perf_counter() - start
+    assert taken == len(actions), taken
+    _cleanup_rq(client, queue, actions, chunk)
+    return enqueued, dequeued
+
+
+def _bench_streams(client, actions, chunk: int, batch: int):
+    stream = SenderStream(client)
+    stream.STREAM_KEY, stream.GROUP = BENCH_STREAM, "bench-workers"
+    client.delete(stream.STREAM_KEY)
+    start = time.perf_counter()
+    for i in range(0, len(actions), chunk):
+        stream.push([(lane, job_id) for lane, job_id, _ in actions[i:i + chunk]])
+    enqueued = time.perf_counter() - start
+
+    client.xgroup_create(stream.STREAM_KEY, stream.GROUP, id="0")
+    start = time.perf_counter()
+    taken = 0
+    while True:
+        response = client.xreadgroup(stream.GROUP, "bench", {stream.STREAM_KEY: ">"}, count=batch)
+        entries = response[0][1] if response else []
+        if not entries:
+            break
+        ids = [entry_id for entry_id, _ in entries]
+        with client.pipeline(transaction=True) as pipe:
+            pipe.xack(stream.STREAM_KEY, stream.GROUP, *ids)
+            pipe.xdel(stream.STREAM_KEY, *ids)
+            pipe.execute()
+        taken += len(ids)
+    dequeued = time.perf_counter() - start
+    assert taken == len(actions), taken
+    client.delete(stream.STREAM_KEY)
+    return enqueued, dequeued
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--jobs", type=int, default=20000)
+    parser.add_argument("--accounts", type=int, default=100)
+    parser.add_argument("--chunk", type=int, default=500, help="jobs per enqueue round-trip")
+    parser.add_argument("--batch", type=int, default=32, help="entries per XREADGROUP")
+    parser.add_argument("--redis-url", default="redis://localhost:6379/15")
+    parser.add_argument("--fakeredis", action="store_true", help="use an in-process fakeredis server")
+    args = parser.parse_args()
+
+    if args.fakeredis:
+        import fakeredis
+        client = fakeredis.FakeRedis()
+    else:
+        client = redis.Redis.from_url(args.redis_url)
+    actions = _actions(args.jobs, args.accounts)
+
+    rq_times = _bench_rq(client, actions, args.chunk)
+    stream_times = _bench_streams(client, actions, args.chunk, args.batch)
+
+    print(f"jobs={args.jobs} chunk={args.chunk} batch={args.batch} {'fakeredis' if args.fakeredis else args.redis_url}")
+    for label, (enqueued, dequeued) in (("rq     ", rq_times), ("streams", stream_times)):
+        print(f"{label}: enqueue {args.jobs / enqueued:10.0f} jobs/s   dequeue {args.jobs / dequeued:10.0f} jobs/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Persian:
+    تست بار ساده برای /api/medias و /api/logs: درخواست‌های هم‌زمان به یک سرور در حال اجرا و گزارش توان عملیاتی و تأخیر.
+
+English:
+    Simple load test for /api/medias and /api/logs: concurrent requests against a running server,
+    reporting throughput and latency percentiles per endpoint.
+
+Usage:
+    uvicorn app.main:app --workers 1 &
+    python scripts/load_test_api.py --base-url http://127.0.0.1:8000 --session-id <id> --concurrency 50 --requests 2000
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+async def _hammer(client: httpx.AsyncClient, path: str, params: dict, total: int, concurrency: int):
+    latencies = []
+    errors = 0
+    remaining = iter(range(total))
+
+    async def _worker():
+        nonlocal errors
+        for _ in remaining:
+            started = time.perf_counter()
+            try:
+                resp = await client.get(path, params=params)
+                if resp.status_code >= 500:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(_worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return elapsed, latencies, errors
+
+
+def _report(name: str, total: int, elapsed: float, latencies, errors: int):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1] if latencies else 0
+    print(f"{name:12} {total / elapsed:10.1f} req/s  p50 {statistics.median(latencies) * 1000:7.1f} ms  "
+          f"p95 {p95 * 1000:7.1f} ms  errors {errors}")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--session-id", default=None, help="session for /api/medias (skipped if omitted)")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=30) as client:
+        print(f"concurrency={args.concurrency} requests={args.requests}")
+        result = await _hammer(client, "/api/logs", {"limit": 50}, args.requests, args.concurrency)
+        _report("/api/logs", args.requests, *result)
+        if args.session_id:
+            result = await _hammer(client, "/api/medias", {"session_id": args.session_id, "limit": 20},
+                                   args.requests, args.concurrency)
+            _report("/api/medias", args.requests, *result)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())